@@ -1,54 +1,76 @@
 import os
 import fitz
-import docx
-from pdfplumber import open as open_pdf
 from concurrent.futures import ThreadPoolExecutor
-import easyocr
 import openai
 import json
-from datetime import date
 from dotenv import load_dotenv
+from extracao_local import pre_extrair_campos, validar_dados_extraidos
+from metricas import medir, uso_resposta
+from camada_texto import estimar_tokens_texto
+from agendador import obter_agendador
+from documentos_word import extrair_texto_doc, extrair_texto_docx
+from servico_ocr import obter_servico_ocr
+from extracao_texto import extrair_texto_pdf, extrair_textos
+from esquema_curriculo import GRUPOS_CAMPOS, montar_perguntas, esquema_resposta, decodificar_resposta
 
 def extract_text_from_pdf(pdf_path):
-    """Extrai texto de um arquivo PDF."""
+    """Extrai texto de um arquivo PDF (PyMuPDF; pdfplumber só nas páginas sensíveis ao layout)."""
     all_text = ""
     try:
-        with open_pdf(pdf_path) as pdf:
-            for page in pdf.pages:
-                all_text += page.extract_text() or ""  
+        all_text = extrair_texto_pdf(pdf_path)["texto"]
     except Exception as e:
         print(f"Erro ao processar PDF {pdf_path}: {e}")
     return all_text
 
 
 def extract_text_from_docx(docx_path):
+    """Texto do .docx com tabelas, caixas de texto, cabeçalhos e rodapés."""
     all_text = ""
     try:
-        doc = docx.Document(docx_path)
-        all_text = "\n".join([para.text for para in doc.paragraphs])
+        all_text = extrair_texto_docx(docx_path)
     except Exception as e:
         print(f"Erro ao processar DOCX {docx_path}: {e}")
     return all_text
 
 
-def extract_text_from_image(image_path):
+def extract_text_from_doc(doc_path):
+    """Texto do .doc (Word 97-2003), lido direto do arquivo OLE."""
     all_text = ""
     try:
-        reader = easyocr.Reader(['pt'])
-        result = reader.readtext(image_path)
-        all_text = " ".join([res[1] for res in result])
+        all_text = extrair_texto_doc(doc_path)
     except Exception as e:
-        print(f"Erro ao processar imagem {image_path}: {e}")
+        print(f"Erro ao processar DOC {doc_path}: {e}")
     return all_text
 
 
+EXTENSOES_IMAGEM = (".jpg", ".jpeg", ".png", ".bmp", ".tiff")
+
+
+def extract_text_from_images(image_paths):
+    """OCR das imagens em lote no serviço de OCR (leitor EasyOCR carregado uma vez por processo)."""
+    texts = {}
+    for result in obter_servico_ocr().ler(image_paths):
+        if "erro" in result:
+            print(f"Erro ao processar imagem {result['imagem']}: {result['erro']}")
+        else:
+            print(f"OCR de {result['imagem']}: {result['tempo_ms']:.0f} ms (lote de {result['lote']})")
+        texts[result["imagem"]] = result["texto"]
+    return texts
+
+
+def extract_text_from_image(image_path):
+    return extract_text_from_images([image_path])[image_path]
+
+
 def extract_text(file_path):
     file_extension = os.path.splitext(file_path)[1].lower()
     if file_extension == ".pdf":
         return extract_text_from_pdf(file_path)
     elif file_extension == ".docx":
         return extract_text_from_docx(file_path)
-    elif file_extension in [".jpg", ".jpeg", ".png", ".bmp", ".tiff"]:
+    elif file_extension == ".doc":
+        return extract_text_from_doc(file_path)
+    elif file_extension in EXTENSOES_IMAGEM:
         return extract_text_from_image(file_path)
     else:
         print(f"Formato não suportado: {file_extension}")
@@ -57,87 +79,141 @@ def extract_text(file_path):
 
 def process_files_in_folder(input_folder):
     files = [os.path.join(input_folder, f) for f in os.listdir(input_folder)
-             if os.path.isfile(os.path.join(input_folder, f)) and f.lower().endswith(('.pdf', '.docx', '.jpg', '.png', '.bmp', '.tiff'))]
+             if os.path.isfile(os.path.join(input_folder, f)) and f.lower().endswith(('.pdf', '.doc', '.docx') + EXTENSOES_IMAGEM)]
+    images = [f for f in files if f.lower().endswith(EXTENSOES_IMAGEM)]
+    documents = [f for f in files if f not in images]
     
     extracted_texts = {}
     
-    def process_file(file_path):
-        base_filename = os.path.splitext(os.path.basename(file_path))[0]
-        extracted_texts[base_filename] = extract_text(file_path)
+    # Documentos vão ao pool de processos de extração; os resultados chegam conforme ficam prontos
+    for result in extrair_textos(documents):
+        if "erro" in result:
+            print(f"Erro ao processar {result['arquivo']}: {result['erro']}")
+        extracted_texts[os.path.splitext(os.path.basename(result["arquivo"]))[0]] = result["texto"]
     
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        executor.map(process_file, files)
+    # Imagens vão todas de uma vez ao serviço de OCR, que as distribui em lotes pelos processos
+    if images:
+        for image_path, text in extract_text_from_images(images).items():
+            extracted_texts[os.path.splitext(os.path.basename(image_path))[0]] = text
     
     return extracted_texts
 
 # Diretório de entrada
 diretorio_origem = "diretorio_destino/curriculos_ia"
 
-document_texts = process_files_in_folder(diretorio_origem)
-
-# Agora os textos extraídos estão armazenados no dicionário document_texts
-
-# Carregar chave da API
-load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
-questions = {
-    "nome": "Qual é o nome completo do candidato?",
-    "email": "Qual é o email válido do candidato? (Exemplo: exemplo@dominio.com)",
-    "cpf": "Qual é o CPF válido do candidato? Formato esperado: 123.456.789-00.",
-    "celular": "Qual é o número de celular válido do candidato? Formato esperado: (XX)XXXXX-XXXX.",
-    "telefone": "Qual é o número de telefone fixo válido do candidato? Formato esperado: (XX)XXXX-XXXX.",
-    "idade": f"Qual é a idade do candidato? Se houver apenas a data de nascimento, faça a diferença com a data: {date.today()}. Formato esperado: XX Anos",
-    "pis": "Qual é o número do PIS do candidato? Deve ser um número válido com 11 dígitos.",
-    "rg": "Qual é o número do RG do candidato?",
-    "ctps": "Qual é o número da Carteira de Trabalho do candidato?",
-    "habilitacao": "Qual é a categoria da habilitação do candidato? (Exemplo: A, B, AB, C, etc.)",
-    "estado_civil": "Qual é o estado civil do candidato? (Exemplo: solteiro(a), casado(a), etc.)",
-    "sexo": "Qual é o sexo do candidato? (Masculino ou Feminino)",
-    "objetivos_profissionais": "Quais são os objetivos profissionais do candidato? Forneça um resumo objetivo.",
-    "resumo_profissional": "Qual é o resumo profissional do candidato? Inclua habilidades e experiências relevantes.",
-    "pretensao_salarial": "Qual é a pretensão salarial do candidato? Informe o valor em moeda.",
-    "uf": "Qual é o estado de residência do candidato? (Exemplo: SP, RJ, MG, etc.)",
-    "cidade": "Qual é a cidade de residência do candidato?",
-    "cep": "Qual é o CEP do endereço do candidato? Formato esperado: XXXXX-XXX.",
-    "logradouro": "Qual é o logradouro do endereço do candidato? (Exemplo: Rua, Avenida, etc.)",
-    "numero": "Qual é o número do imóvel do candidato? Apenas números.",
-    "complemento": "Qual é o complemento do endereço do candidato? (Exemplo: apartamento, bloco, etc.)",
-    "nivel_ensino": "Qual é o nível de ensino do candidato? (Exemplo: médio completo, superior completo, etc.)",
-    "situacao": "Qual é a situação atual do nível de ensino do candidato? (Exemplo: cursando, concluído, etc.)",
-    "curso": "Qual é o nome do curso realizado pelo candidato?",
-    "serie": "Qual é a série ou etapa de ensino do candidato? (Exemplo: 1º ano, 2º semestre, etc.)",
-    "inicio_mes": "Qual é o mês de início do curso do candidato? (Exemplo: janeiro, fevereiro, etc.)",
-    "inicio_ano": "Qual é o ano de início do curso do candidato?",
-    "fim_mes": "Qual é o mês de término do curso do candidato? (Exemplo: dezembro, junho, etc.)",
-    "fim_ano": "Qual é o ano de término do curso do candidato?",
-    "instituicao": "Qual é o nome da instituição de ensino frequentada pelo candidato?",
-    "carga_horaria": "Qual é a carga horária total do curso do candidato? Informe em horas.",
-}
+questions = montar_perguntas()
+
+# Tokens de saída reservados no agendador por campo perguntado (as respostas são curtas)
+TOKENS_SAIDA_POR_CAMPO = 50
+
+def criar_resposta(corpo, tokens_saida):
+    """Chat completion pelo agendador do modelo (limites por minuto e retentativas)."""
+    tokens = tokens_saida + sum(estimar_tokens_texto(mensagem["content"]) for mensagem in corpo["messages"])
+    response, _ = obter_agendador(corpo["model"]).executar(
+        lambda: openai.chat.completions.create(**corpo),
+        tokens,
+        tokens_usados=lambda response: response.usage.total_tokens if response.usage else None
+    )
+    return response
 
 def ask_chatgpt(question, text):
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
+    response = criar_resposta({
+        "model": "gpt-4o-mini",
+        "messages": [
             {"role": "system", "content": "Você é um assistente que extrai informações específicas do texto. Só traga a informação; se não houver, imprima 'null'."},
             {"role": "user", "content": f"{question}\n\nTexto:\n{text}"}
         ]
-    )
+    }, TOKENS_SAIDA_POR_CAMPO)
     answer = response.choices[0].message.content
     return answer.strip() if answer.strip() else None
 
-diretorio_destino = "resposta_gpt"
-os.makedirs(diretorio_destino, exist_ok=True)
+# Acima deste tamanho de texto a extração é feita por grupo de campos
+LIMITE_CARACTERES_DOCUMENTO = 20000
+
+def ask_chatgpt_campos(campos, text):
+    """Pergunta todos os campos informados em uma única chamada, com resposta no JSON Schema dos campos."""
+    perguntas = "\n".join(f'- "{key}": {questions[key]}' for key in campos)
+    with medir("chamada_llm", modelo="gpt-4o-mini", campos=len(campos)) as info:
+        response = criar_resposta({
+            "model": "gpt-4o-mini",
+            "response_format": esquema_resposta(campos, permitir_nulo=True),
+            "messages": [
+                {"role": "system", "content": "Você é um assistente que extrai informações específicas do texto. Responda apenas com um objeto JSON contendo exatamente as chaves pedidas; só traga a informação e, se não houver, use null."},
+                {"role": "user", "content": f"Responda, para cada chave, à pergunta correspondente:\n{perguntas}\n\nTexto:\n{text}"}
+            ]
+        }, TOKENS_SAIDA_POR_CAMPO * len(campos))
+        info.update(uso_resposta("gpt-4o-mini", response.usage))
+    try:
+        answers = decodificar_resposta(response.choices[0].message.content, campos, valor_ausente=None)
+    except ValueError as e:
+        print(f"Erro ao decodificar JSON da resposta: {e}")
+        answers = {}
+
+    result = {}
+    for key in campos:
+        value = answers.get(key)
+        if isinstance(value, str):
+            value = value.strip()
+            if value.lower() in ("", "null", "none"):
+                value = None
+        result[key] = value if value else None
+    return result
+
+def extract_fields(text, agrupar=None):
+    """
+    Extrai todos os campos de `questions` de um documento.
+
+    CPF, PIS, e-mail, celular, telefone e CEP são extraídos localmente
+    (regex + dígitos verificadores) e só os demais campos vão para o modelo.
+
+    Por padrão faz uma única chamada com todos os campos restantes; documentos
+    maiores que LIMITE_CARACTERES_DOCUMENTO (ou com agrupar=True) são extraídos
+    por grupo de campos (GRUPOS_CAMPOS), com os grupos consultados em paralelo.
+    """
+    locais = pre_extrair_campos(text)
+    if agrupar is None:
+        agrupar = len(text) > LIMITE_CARACTERES_DOCUMENTO
+
+    if not agrupar:
+        result = ask_chatgpt_campos([key for key in questions if key not in locais], text)
+    else:
+        grupos = [[key for key in campos if key not in locais] for campos in GRUPOS_CAMPOS.values()]
+        grupos = [campos for campos in grupos if campos]
+        result = {}
+        with ThreadPoolExecutor(max_workers=len(grupos)) as executor:
+            for answers in executor.map(lambda campos: ask_chatgpt_campos(campos, text), grupos):
+                result.update(answers)
 
-results = {}
+    result = validar_dados_extraidos(result, valor_ausente=None)
+    result.update(locais)
+    return {key: result.get(key) for key in questions}
 
-for filename, text_content in document_texts.items():
-    print(f"Processando o arquivo: {filename}")
-    answers = {key: ask_chatgpt(question, text_content) for key, question in questions.items()}
-    results[filename] = {key: value if value else None for key, value in answers.items()}
-    
-    json_filename = os.path.join(diretorio_destino, f"{filename}.json")
-    with open(json_filename, 'w', encoding='utf-8') as json_file:
-        json.dump(results[filename], json_file, indent=4, ensure_ascii=False)
-    
-    print(f"Respostas salvas em {json_filename}")
\ No newline at end of file
+diretorio_destino = "resposta_gpt"
+
+def main():
+    # Os pools de processos (extração e OCR) reimportam este módulo nos
+    # processos filhos quando o início é por spawn; por isso o script só
+    # roda sob o __main__
+    document_texts = process_files_in_folder(diretorio_origem)
+
+    # Carregar chave da API
+    load_dotenv()
+    openai.api_key = os.getenv("OPENAI_API_KEY")
+    openai.max_retries = 0  # Retentativas ficam com o agendador
+
+    os.makedirs(diretorio_destino, exist_ok=True)
+
+    results = {}
+
+    for filename, text_content in document_texts.items():
+        print(f"Processando o arquivo: {filename}")
+        results[filename] = extract_fields(text_content)
+        
+        json_filename = os.path.join(diretorio_destino, f"{filename}.json")
+        with open(json_filename, 'w', encoding='utf-8') as json_file:
+            json.dump(results[filename], json_file, indent=4, ensure_ascii=False)
+        
+        print(f"Respostas salvas em {json_filename}")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
 import os 
 from dotenv import load_dotenv 
 from pathlib import Path
-from datetime import date
 import json
 import re
 import requests
 from typing import Dict, Any
 from openai import OpenAI
+from esquema_curriculo import CAMPOS_JSON, GRUPOS_CAMPOS, esquema_resposta, decodificar_resposta
 
 # Carrega as variáveis de ambiente
 dotenv_path = Path(__file__).resolve().parent / '.env'
@@ -52,39 +52,7 @@ def extrair_dados_curriculo(imagem_url: str) -> Dict[str, Any]:
         validar_url_imagem(imagem_url)
         
         # Estrutura de dados esperada
-        campos_json = {
-            "nome": "Nome completo",
-            "email": "Email válido",
-            "cpf": "CPF no formato 123.456.789-00",
-            "celular": "Celular no formato (XX)XXXXX-XXXX",
-            "telefone": "Telefone fixo no formato (XX)XXXX-XXXX",
-            "idade": "Idade em anos",
-            "pis": "Número do PIS",
-            "rg": "Número do RG",
-            "ctps": "Número da Carteira de Trabalho",
-            "habilitacao": "Categoria da habilitação",
-            "estado_civil": "Estado civil",
-            "sexo": "Sexo",
-            "objetivos_profissionais": "Objetivos profissionais",
-            "resumo_profissional": "Resumo profissional",
-            "pretensao_salarial": "Pretensão salarial",
-            "uf": "Estado (sigla)",
-            "cidade": "Cidade",
-            "cep": "CEP no formato XXXXX-XXX",
-            "logradouro": "Logradouro",
-            "numero": "Número do endereço",
-            "complemento": "Complemento do endereço",
-            "nivel_ensino": "Nível de ensino",
-            "situacao": "Situação do ensino",
-            "curso": "Nome do curso",
-            "serie": "Série ou etapa",
-            "inicio_mes": "Mês de início",
-            "inicio_ano": "Ano de início",
-            "fim_mes": "Mês de término",
-            "fim_ano": "Ano de término",
-            "instituicao": "Nome da instituição",
-            "carga_horaria": "Carga horária"
-        }
+        campos_json = {campo: info["descricao"] for campo, info in CAMPOS_JSON.items()}
         
         # Cria o prompt estruturado
         prompt = f"""
@@ -127,6 +95,7 @@ def extrair_dados_curriculo(imagem_url: str) -> Dict[str, Any]:
                     ]
                 }
             ],
+            response_format=esquema_resposta(),
             max_tokens=4000,
             temperature=0
         )
@@ -135,31 +104,10 @@ def extrair_dados_curriculo(imagem_url: str) -> Dict[str, Any]:
         resultado = response.choices[0].message.content
         print(f"Resposta bruta recebida: {resultado[:200]}...")
         
-        # Tenta extrair o JSON da resposta
+        # A resposta segue o JSON Schema dos campos (structured outputs)
         try:
-            # Remove possíveis marcadores de código
-            resultado_limpo = resultado.replace('```json', '').replace('```', '').strip()
-            
-            # Se a resposta começar com '{', assume que é JSON
-            if resultado_limpo.startswith('{'):
-                dados_extraidos = json.loads(resultado_limpo)
-            else:
-                # Se não, procura por JSON na resposta
-                import re
-                json_match = re.search(r'\{.*\}', resultado_limpo, re.DOTALL)
-                if json_match:
-                    dados_extraidos = json.loads(json_match.group())
-                else:
-                    raise ValueError("Nenhum JSON encontrado na resposta")
-            
-            # Garante que todas as chaves estão presentes
-            for chave in campos_json.keys():
-                if chave not in dados_extraidos:
-                    dados_extraidos[chave] = "Não informado"
-            
-            return dados_extraidos
-            
-        except (json.JSONDecodeError, ValueError) as e:
+            return decodificar_resposta(resultado)
+        except ValueError as e:
             print(f"Erro ao decodificar JSON: {e}")
             print(f"Resposta completa recebida: {resultado}")
             return {"erro": "Resposta não está em formato JSON válido", "resposta_bruta": resultado}
@@ -180,10 +128,10 @@ def exibir_resultados(dados: Dict[str, Any]) -> None:
     print("\n=== DADOS EXTRAÍDOS DO CURRÍCULO ===\n")
     
     categorias = {
-        "DADOS PESSOAIS": ["nome", "email", "cpf", "celular", "telefone", "idade", "pis", "rg", "ctps", "habilitacao", "estado_civil", "sexo"],
-        "OBJETIVOS E RESUMO": ["objetivos_profissionais", "resumo_profissional", "pretensao_salarial"],
-        "ENDEREÇO": ["uf", "cidade", "cep", "logradouro", "numero", "complemento"],
-        "FORMAÇÃO": ["nivel_ensino", "situacao", "curso", "serie", "inicio_mes", "inicio_ano", "fim_mes", "fim_ano", "instituicao", "carga_horaria"]
+        "DADOS PESSOAIS": GRUPOS_CAMPOS["pessoais"],
+        "OBJETIVOS E RESUMO": GRUPOS_CAMPOS["perfil"],
+        "ENDEREÇO": GRUPOS_CAMPOS["endereco"],
+        "FORMAÇÃO": GRUPOS_CAMPOS["formacao"]
     }
     
     for categoria, campos in categorias.items():
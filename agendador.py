@@ -0,0 +1,283 @@
+"""
+Agendador das chamadas aos modelos: limites de requisições e de tokens por
+minuto (balde de fichas) e retentativas com espera exponencial.
+
+Todas as threads do processo que chamam o mesmo modelo passam pelo mesmo
+agendador: cada chamada reserva 1 requisição e os tokens estimados (prompt,
+imagens e máximo de saída) e espera na fila, em ordem de chegada, até haver
+saldo. Depois da resposta a reserva é acertada com o uso real. Erros
+retentáveis (429, 5xx, conexão, timeout) são repetidos com espera exponencial
+aleatória ("full jitter"), respeitando o Retry-After; um 429 pausa o modelo
+para todas as threads.
+
+    agendador = obter_agendador("gpt-4o")
+    resposta, retentativas = agendador.executar(lambda: client.chat.completions.create(**corpo), tokens_estimados)
+"""
+import time
+import random
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from openai import APIConnectionError, APITimeoutError
+
+from metricas import metricas
+
+# Limites por modelo (requisições/min, tokens/min): ajuste à cota da conta
+LIMITES_MODELOS = {
+    "gpt-4o": (5000, 450_000),
+    "gpt-4o-mini": (5000, 2_000_000),
+    "gpt-4.1": (5000, 450_000),
+    "gpt-4.1-mini": (5000, 2_000_000),
+    "claude-3-7-sonnet": (250, 1_000_000),
+}
+LIMITES_PADRAO = (500, 200_000)  # Modelos sem limite cadastrado
+
+# Retentativas
+MAX_TENTATIVAS = 5
+ESPERA_INICIAL_SEGUNDOS = 1
+ESPERA_MAXIMA_SEGUNDOS = 60
+
+# Status HTTP e códigos de erro (Bedrock) que valem nova tentativa
+STATUS_RETENTAVEIS = (408, 409, 429, 500, 502, 503, 504)
+CODIGOS_RETENTAVEIS = (
+    "ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException",
+    "ModelNotReadyException", "ModelTimeoutException", "InternalServerException"
+)
+
+def status_erro(erro: Exception) -> Optional[int]:
+    """Status HTTP de um erro da SDK da OpenAI (httpx) ou do boto3."""
+    status = getattr(erro, "status_code", None)
+    if status is None and isinstance(getattr(erro, "response", None), dict):
+        status = erro.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return status
+
+def erro_retentavel(erro: Exception) -> bool:
+    if getattr(erro, "code", None) == "insufficient_quota":
+        # 429 por falta de crédito: repetir não adianta
+        return False
+    if isinstance(erro, (APIConnectionError, APITimeoutError)):
+        return True
+    resposta = getattr(erro, "response", None)
+    if isinstance(resposta, dict) and resposta.get("Error", {}).get("Code") in CODIGOS_RETENTAVEIS:
+        return True
+    return status_erro(erro) in STATUS_RETENTAVEIS
+
+def espera_retry_after(erro: Exception) -> Optional[float]:
+    """Segundos pedidos pelo servidor (Retry-After / retry-after-ms), se houver."""
+    resposta = getattr(erro, "response", None)
+    if isinstance(resposta, dict):
+        cabecalhos = resposta.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+    else:
+        cabecalhos = getattr(resposta, "headers", None) or {}
+
+    valor_ms = cabecalhos.get("retry-after-ms")
+    if valor_ms:
+        try:
+            return float(valor_ms) / 1000
+        except ValueError:
+            pass
+    valor = cabecalhos.get("retry-after")
+    if not valor:
+        return None
+    try:
+        return float(valor)
+    except ValueError:
+        try:
+            # Formato de data HTTP
+            return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+class BaldeFichas:
+    """Balde de fichas com reposição contínua: `capacidade` fichas por minuto."""
+
+    def __init__(self, capacidade: float):
+        self.capacidade = capacidade
+        self.por_segundo = capacidade / 60
+        self.disponivel = capacidade
+        self.atualizado = time.monotonic()
+
+    def repor(self, agora: float) -> None:
+        self.disponivel = min(self.capacidade, self.disponivel + (agora - self.atualizado) * self.por_segundo)
+        self.atualizado = agora
+
+    def espera(self, quantidade: float, agora: float) -> float:
+        """Segundos até haver `quantidade` fichas."""
+        self.repor(agora)
+        return max(0.0, (quantidade - self.disponivel) / self.por_segundo)
+
+    def consumir(self, quantidade: float) -> None:
+        # Pode ficar negativo quando o uso real passa da estimativa
+        self.disponivel = min(self.capacidade, self.disponivel - quantidade)
+
+class Agendador:
+    """
+    Limites de requisições e tokens por minuto de um modelo, com fila em ordem
+    de chegada (seguro entre threads).
+    """
+
+    def __init__(
+        self,
+        modelo: str,
+        requisicoes_por_minuto: int,
+        tokens_por_minuto: int,
+        max_tentativas: int = MAX_TENTATIVAS,
+        espera_inicial: float = ESPERA_INICIAL_SEGUNDOS,
+        espera_maxima: float = ESPERA_MAXIMA_SEGUNDOS
+    ):
+        self.modelo = modelo
+        self.max_tentativas = max_tentativas
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self._cond = threading.Condition()
+        self._requisicoes = BaldeFichas(requisicoes_por_minuto)
+        self._tokens = BaldeFichas(tokens_por_minuto)
+        self._fila = deque()
+        self._pausado_ate = 0.0
+
+    def profundidade(self) -> int:
+        """Chamadas esperando saldo (ou o fim de uma pausa por 429)."""
+        with self._cond:
+            return len(self._fila)
+
+    def reservar(self, tokens: int) -> int:
+        """Espera a vez e o saldo e reserva 1 requisição e `tokens`; retorna os tokens reservados."""
+        tokens = min(tokens, self._tokens.capacidade)
+        vez = object()
+        inicio = time.monotonic()
+        with self._cond:
+            self._fila.append(vez)
+            try:
+                while True:
+                    if self._fila[0] is vez:
+                        agora = time.monotonic()
+                        espera = max(
+                            self._pausado_ate - agora,
+                            self._requisicoes.espera(1, agora),
+                            self._tokens.espera(tokens, agora)
+                        )
+                        if espera <= 0:
+                            self._requisicoes.consumir(1)
+                            self._tokens.consumir(tokens)
+                            break
+                        self._cond.wait(espera)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._fila.remove(vez)
+                self._cond.notify_all()
+        metricas.observar("agendador.espera.ms", (time.monotonic() - inicio) * 1000)
+        return tokens
+
+    def acertar(self, reservados: int, usados: int) -> None:
+        """Troca a reserva pelo uso real (devolve a sobra ou desconta o excesso)."""
+        with self._cond:
+            self._tokens.repor(time.monotonic())
+            self._tokens.consumir(usados - reservados)
+            self._cond.notify_all()
+
+    def pausar(self, segundos: float) -> None:
+        """Suspende as chamadas ao modelo (todas as threads) por `segundos`."""
+        with self._cond:
+            self._pausado_ate = max(self._pausado_ate, time.monotonic() + segundos)
+            self._cond.notify_all()
+
+    def executar(
+        self,
+        funcao: Callable[[], Any],
+        tokens_estimados: int,
+        tokens_usados: Callable[[Any], Optional[int]] = None
+    ) -> Tuple[Any, int]:
+        """
+        Executa `funcao` dentro dos limites, repetindo em erros retentáveis.
+
+        Args:
+            funcao: A chamada ao modelo
+            tokens_estimados: Tokens de entrada estimados mais o máximo de saída
+            tokens_usados: Extrai do resultado o total real de tokens (None se
+                ainda não conhecido, como em streams); sem isso a estimativa fica
+
+        Returns:
+            Tupla contendo: (resultado de `funcao`, número de retentativas)
+        """
+        for tentativa in range(self.max_tentativas):
+            reservados = self.reservar(tokens_estimados)
+            try:
+                resultado = funcao()
+            except Exception as e:
+                # Requisição recusada não consome tokens
+                self.acertar(reservados, 0)
+                if tentativa == self.max_tentativas - 1 or not erro_retentavel(e):
+                    raise
+                espera = espera_retry_after(e)
+                if espera is None:
+                    espera = random.uniform(0, min(self.espera_maxima, self.espera_inicial * 2 ** tentativa))
+                metricas.contar("agendador.retentativas")
+                print(f"Erro transitório na API ({type(e).__name__}), nova tentativa em {espera:.1f}s...")
+                if status_erro(e) == 429:
+                    # Limite de taxa: a pausa vale para todas as chamadas ao modelo
+                    self.pausar(espera)
+                else:
+                    time.sleep(espera)
+                continue
+
+            usados = tokens_usados(resultado) if tokens_usados else None
+            if usados is not None:
+                self.acertar(reservados, usados)
+            return resultado, tentativa
+
+    def estado(self) -> Dict[str, Any]:
+        with self._cond:
+            agora = time.monotonic()
+            self._requisicoes.repor(agora)
+            self._tokens.repor(agora)
+            return {
+                "fila": len(self._fila),
+                "requisicoes_disponiveis": round(self._requisicoes.disponivel, 1),
+                "tokens_disponiveis": round(self._tokens.disponivel),
+                "pausado_segundos": round(max(0.0, self._pausado_ate - agora), 1)
+            }
+
+_agendadores: Dict[str, Agendador] = {}
+_agendadores_lock = threading.Lock()
+
+def nome_limite(modelo: str) -> str:
+    """Nome do limite cadastrado que vale para o modelo (aceita nomes com versão e ARNs)."""
+    for nome in sorted(LIMITES_MODELOS, key=len, reverse=True):
+        if nome in modelo:
+            return nome
+    return modelo
+
+def obter_agendador(modelo: str) -> Agendador:
+    """Agendador do processo para o modelo (compartilhado por todas as threads)."""
+    nome = nome_limite(modelo)
+    with _agendadores_lock:
+        if nome not in _agendadores:
+            _agendadores[nome] = Agendador(nome, *LIMITES_MODELOS.get(nome, LIMITES_PADRAO))
+        return _agendadores[nome]
+
+def definir_limites(modelo: str, requisicoes_por_minuto: int, tokens_por_minuto: int) -> None:
+    """Cadastra os limites da conta para um modelo (vale para os próximos `obter_agendador`)."""
+    with _agendadores_lock:
+        LIMITES_MODELOS[modelo] = (requisicoes_por_minuto, tokens_por_minuto)
+        _agendadores.pop(modelo, None)
+
+def dividir_limites(processos: int) -> None:
+    """
+    Divide os limites entre `processos` processos que usam a mesma conta: cada
+    processo tem seus próprios agendadores e não vê o consumo dos outros.
+    """
+    global LIMITES_PADRAO
+    with _agendadores_lock:
+        for nome, (requisicoes, tokens) in LIMITES_MODELOS.items():
+            LIMITES_MODELOS[nome] = (max(1, requisicoes // processos), max(1, tokens // processos))
+        LIMITES_PADRAO = (max(1, LIMITES_PADRAO[0] // processos), max(1, LIMITES_PADRAO[1] // processos))
+        _agendadores.clear()
+
+def resumo() -> Dict[str, Dict[str, Any]]:
+    """Estado de cada agendador: fila, saldo de requisições e tokens, pausa."""
+    with _agendadores_lock:
+        agendadores = dict(_agendadores)
+    return {nome: agendador.estado() for nome, agendador in agendadores.items()}
@@ -1,122 +1,291 @@
-import streamlit as st
-import fitz  # PyMuPDF
-from PIL import Image
 import io
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-import pickle
-import os
-import tempfile
+import time
+import uuid
+import streamlit as st
 import pandas as pd
-from modelo_curriculo import analisar_curriculo_por_links
-
-# Configurações Google Drive
-SCOPES = ['https://www.googleapis.com/auth/drive.file']
-FOLDER_ID = "1kvWh4CxWZsmovOBZat7QzgY9kw26o7RE"  # Sua pasta
-
-def authenticate():
-    creds = None
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
-    return creds
-
-def upload_image_and_get_public_link(path_image, folder_id, return_id=False):
-    creds = authenticate()
-    service = build('drive', 'v3', credentials=creds)
-
-    file_metadata = {
-        'name': os.path.basename(path_image),
-        'parents': [folder_id]
-    }
-    media = MediaFileUpload(path_image, mimetype='image/png')
-    file = service.files().create(body=file_metadata, media_body=media, fields='id').execute()
-    file_id = file.get('id')
-
-    # Torna o arquivo público
-    permission = {
-        'type': 'anyone',
-        'role': 'reader'
-    }
-    service.permissions().create(fileId=file_id, body=permission).execute()
+from modelo_curriculo import LIMITE_PAGINAS_REQUISICAO_UNICA
+from cache_extracao import CacheExtracao
+from esquema_curriculo import CAMPOS_JSON, LAYOUTS_TABELAS
+from camada_texto import resumir_plano, tokens_enviados
+from fila_trabalhos import FilaTrabalhos, PENDENTE, PROCESSANDO, CONCLUIDO
+
+# Intervalo entre consultas ao status do trabalho enquanto ele é processado
+INTERVALO_ATUALIZACAO_SEGUNDOS = 1.0
+
+# Trabalho pendente há mais tempo que isso sem nenhum em processamento: provavelmente não há trabalhadores
+ESPERA_AVISO_TRABALHADORES_SEGUNDOS = 15
+
+# Cache em memória do Streamlit dos trabalhos finalizados (compartilhado entre as sessões do servidor)
+TTL_CACHE_SEGUNDOS = 60 * 60
+MAX_ENTRADAS_CACHE_RESULTADOS = 256
+
+ETAPAS_TRABALHO = {
+    "renderizacao": "Preparando as páginas do documento",
+    "upload": "Enviando imagens ao Google Drive",
+    "analise": "Analisando o currículo com IA",
+    "limpeza": "Removendo as imagens temporárias"
+}
 
-    # Gera o link público
-    public_url = f"https://drive.google.com/uc?id={file_id}"
-    if return_id:
-        return public_url, file_id
-    return public_url
+@st.cache_resource
+def obter_fila():
+    """Fila de trabalhos (SQLite) onde o app enfileira os PDFs e consulta o status."""
+    return FilaTrabalhos()
+
+@st.cache_resource
+def obter_cache_extracao():
+    """Cache local de resultados, aberto só para exibir as estatísticas (quem grava são os trabalhadores)."""
+    return CacheExtracao()
+
+class TrabalhoEmAndamento(Exception):
+    """Trabalho ainda não finalizado: levantado para que o st.cache_data não o guarde."""
+
+    def __init__(self, trabalho):
+        super().__init__(trabalho["id"])
+        self.trabalho = trabalho
+
+@st.cache_data(ttl=TTL_CACHE_SEGUNDOS, max_entries=MAX_ENTRADAS_CACHE_RESULTADOS, show_spinner=False)
+def obter_trabalho_finalizado(id_trabalho):
+    """
+    Trabalho finalizado (concluído ou com erro), memorizado: o resultado não
+    muda mais, então as interações com os widgets não voltam a consultar o
+    SQLite. O mesmo arquivo com as mesmas opções (hash do PDF) é enfileirado
+    sempre no mesmo trabalho, então reenvios também reaproveitam a memória.
+    """
+    trabalho = obter_fila().obter(id_trabalho)
+    if trabalho is not None and trabalho["status"] in (PENDENTE, PROCESSANDO):
+        raise TrabalhoEmAndamento(trabalho)
+    return trabalho
+
+def obter_trabalho(id_trabalho):
+    """Trabalho da fila: da memória, se já finalizado; senão, o status atual do SQLite."""
+    try:
+        return obter_trabalho_finalizado(id_trabalho)
+    except TrabalhoEmAndamento as e:
+        return e.trabalho
+
+def formatar_valor(valor):
+    """Formata valores vazios ou 'Não informado' para '-'"""
+    if valor == 'Não informado' or not valor or str(valor).strip() == '':
+        return '-'
+    return valor
 
 def formatar_dados_para_tabela(dados_curriculo):
     """Converte os dados do currículo em formato tabular para exibição"""
     if "erro" in dados_curriculo:
         return None, None, None
     
-    def formatar_valor(valor):
-        """Formata valores vazios ou 'Não informado' para '-'"""
-        if valor == 'Não informado' or not valor or str(valor).strip() == '':
-            return '-'
-        return valor
+    # Dados pessoais, endereço e formação, no layout definido pelo esquema dos campos
+    tabelas = []
+    for grupo in ("pessoais", "endereco", "formacao"):
+        campos, rotulos = LAYOUTS_TABELAS[grupo]
+        tabelas.append(pd.DataFrame({
+            'Campo': list(rotulos),
+            'Valor': [formatar_valor(dados_curriculo.get(campo)) for campo in campos]
+        }))
     
-    # Dados pessoais
-    dados_pessoais = {
-        'Campo': ['Nome', 'Email', 'CPF', 'Celular', 'Telefone', 'Idade', 'PIS', 'RG', 'CTPS', 'Habilitação', 'Estado Civil', 'Sexo'],
-        'Valor': [
-            formatar_valor(dados_curriculo.get('nome')),
-            formatar_valor(dados_curriculo.get('email')),
-            formatar_valor(dados_curriculo.get('cpf')),
-            formatar_valor(dados_curriculo.get('celular')),
-            formatar_valor(dados_curriculo.get('telefone')),
-            formatar_valor(dados_curriculo.get('idade')),
-            formatar_valor(dados_curriculo.get('pis')),
-            formatar_valor(dados_curriculo.get('rg')),
-            formatar_valor(dados_curriculo.get('ctps')),
-            formatar_valor(dados_curriculo.get('habilitacao')),
-            formatar_valor(dados_curriculo.get('estado_civil')),
-            formatar_valor(dados_curriculo.get('sexo'))
-        ]
-    }
+    return tuple(tabelas)
+
+def formatar_dados_para_linha(dados_curriculo):
+    """Uma linha da tabela consolidada: os mesmos campos das tabelas de detalhe, rótulo → valor"""
+    linha = {}
+    for grupo in ("pessoais", "endereco", "formacao"):
+        campos, rotulos = LAYOUTS_TABELAS[grupo]
+        for campo, rotulo in zip(campos, rotulos):
+            linha[rotulo] = formatar_valor(dados_curriculo.get(campo))
+    return linha
+
+def exportar_excel(df):
+    """Planilha .xlsx em memória"""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as planilha:
+        df.to_excel(planilha, index=False, sheet_name="Candidatos")
+    return buffer.getvalue()
+
+def exibir_campos_parciais(area, dados_parciais):
+    """Cards e tabelas com os campos já recebidos (redesenhados a cada campo do streaming)."""
+    def formatar_valor(campo):
+        if campo not in dados_parciais:
+            return '⏳'
+        valor = dados_parciais[campo]
+        return '-' if valor == 'Não informado' or not valor else valor
     
-    # Endereço
-    endereco = {
-        'Campo': ['UF', 'Cidade', 'CEP', 'Logradouro', 'Número', 'Complemento'],
-        'Valor': [
-            formatar_valor(dados_curriculo.get('uf')),
-            formatar_valor(dados_curriculo.get('cidade')),
-            formatar_valor(dados_curriculo.get('cep')),
-            formatar_valor(dados_curriculo.get('logradouro')),
-            formatar_valor(dados_curriculo.get('numero')),
-            formatar_valor(dados_curriculo.get('complemento'))
-        ]
-    }
+    with area.container():
+        st.caption(f"📡 Recebendo dados do modelo... {len(dados_parciais)}/{len(CAMPOS_JSON)} campos")
+        colunas = st.columns(4)
+        for coluna, (campo, rotulo) in zip(colunas, (("nome", "👤 Nome"), ("idade", "🎂 Idade"), ("nivel_ensino", "🎓 Escolaridade"), ("email", "📧 E-mail"))):
+            coluna.metric(label=rotulo, value=formatar_valor(campo))
+        
+        colunas = st.columns(3)
+        for coluna, grupo in zip(colunas, ("pessoais", "endereco", "formacao")):
+            campos, rotulos = LAYOUTS_TABELAS[grupo]
+            coluna.dataframe(pd.DataFrame({
+                'Campo': list(rotulos),
+                'Valor': [formatar_valor(campo) for campo in campos]
+            }), use_container_width=True, hide_index=True)
+
+def exibir_andamento(trabalho, estatisticas_fila):
+    """Status de um trabalho pendente ou em processamento, com os campos já recebidos"""
+    if trabalho["status"] == PENDENTE:
+        st.info(f"⏳ {trabalho['nome_arquivo']}: aguardando na fila (posição {trabalho['posicao']})...")
+        if (estatisticas_fila["processando"] == 0
+                and time.time() - trabalho["criado_em"] > ESPERA_AVISO_TRABALHADORES_SEGUNDOS):
+            st.warning("Nenhum trabalho em processamento. Verifique se os trabalhadores estão rodando: `python fila_trabalhos.py`")
+    else:
+        etapa = ETAPAS_TRABALHO.get(trabalho["etapa"], "Preparando")
+        st.info(f"🔄 {trabalho['nome_arquivo']}: {etapa}... ({time.time() - trabalho['criado_em']:.0f} s)")
     
-    # Formação
-    formacao = {
-        'Campo': ['Nível de Ensino', 'Situação', 'Curso', 'Série', 'Início (Mês)', 'Início (Ano)', 'Fim (Mês)', 'Fim (Ano)', 'Instituição', 'Carga Horária'],
-        'Valor': [
-            formatar_valor(dados_curriculo.get('nivel_ensino')),
-            formatar_valor(dados_curriculo.get('situacao')),
-            formatar_valor(dados_curriculo.get('curso')),
-            formatar_valor(dados_curriculo.get('serie')),
-            formatar_valor(dados_curriculo.get('inicio_mes')),
-            formatar_valor(dados_curriculo.get('inicio_ano')),
-            formatar_valor(dados_curriculo.get('fim_mes')),
-            formatar_valor(dados_curriculo.get('fim_ano')),
-            formatar_valor(dados_curriculo.get('instituicao')),
-            formatar_valor(dados_curriculo.get('carga_horaria'))
-        ]
+    if trabalho["dados_parciais"]:
+        exibir_campos_parciais(st.empty(), trabalho["dados_parciais"])
+
+def exibir_resultado(trabalho):
+    """Resultado completo de um trabalho finalizado (concluído ou com erro)"""
+    resultado = trabalho["resultado"] or {
+        "dados": {"erro": trabalho["erro"]}, "total_tokens": 0, "preco_total": 0.0,
+        "plano": None, "falhas_limpeza": [], "do_cache": False
     }
+    dados_curriculo = resultado["dados"]
+    total_tokens = resultado["total_tokens"]
+    preco_total = resultado["preco_total"]
+    plano = resultado["plano"]
+    tempo_total = trabalho["concluido_em"] - trabalho["criado_em"]
+    st.caption(f"📄 {trabalho['nome_arquivo']}")
+    if resultado["do_cache"]:
+        st.info("⚡ Currículo já analisado anteriormente: resultado recuperado do cache.")
     
-    return pd.DataFrame(dados_pessoais), pd.DataFrame(endereco), pd.DataFrame(formacao)
+    if "erro" not in dados_curriculo:
+        st.success("✅ Processamento concluído!")
+
+        # --- CARDS DE RESUMO ---
+        st.subheader("👤 Resumo do Candidato")
+        
+        # Nome
+        nome = dados_curriculo.get('nome', '-')
+        nome_display = nome if nome != 'Não informado' else '-'
+        st.metric(
+            label="👤 Nome",
+            value=nome_display
+        )
+        
+        # Idade
+        idade = dados_curriculo.get('idade', '-')
+        idade_display = f"{idade} anos" if idade != 'Não informado' and idade != '-' else '-'
+        st.metric(
+            label="🎂 Idade",
+            value=idade_display
+        )
+        
+        # Escolaridade
+        nivel_ensino = dados_curriculo.get('nivel_ensino', '-')
+        nivel_display = nivel_ensino if nivel_ensino != 'Não informado' else '-'
+        st.metric(
+            label="🎓 Escolaridade",
+            value=nivel_display
+        )
+        
+        # E-mail
+        email = dados_curriculo.get('email', '-')
+        email_display = email if email != 'Não informado' else '-'
+        st.metric(
+            label="📧 E-mail",
+            value=email_display
+        )
+
+        # --- OBJETIVOS E RESUMO PROFISSIONAL ---
+        st.markdown("---")
+        st.subheader("💼 Perfil Profissional")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("**🎯 Objetivos Profissionais:**")
+            objetivos = dados_curriculo.get('objetivos_profissionais', '-')
+            objetivos_display = objetivos if objetivos != 'Não informado' else '-'
+            st.write(objetivos_display)
+        
+        with col2:
+            st.markdown("**📝 Resumo Profissional:**")
+            resumo = dados_curriculo.get('resumo_profissional', '-')
+            resumo_display = resumo if resumo != 'Não informado' else '-'
+            st.write(resumo_display)
+        
+        # Pretensão salarial
+        pretensao = dados_curriculo.get('pretensao_salarial', '-')
+        if pretensao != 'Não informado' and pretensao != '-':
+            st.markdown(f"**💰 Pretensão Salarial:** {pretensao}")
+
+        # --- TABELAS DETALHADAS ---
+        st.markdown("---")
+        st.subheader("📊 Dados Detalhados")
+
+        df_pessoais, df_endereco, df_formacao = formatar_dados_para_tabela(dados_curriculo)
+        
+        # Abas para organizar as informações
+        tab1, tab2, tab3 = st.tabs(["👤 Dados Pessoais", "📍 Endereço", "🎓 Formação"])
+        
+        with tab1:
+            if df_pessoais is not None:
+                st.dataframe(df_pessoais, use_container_width=True, hide_index=True)
+        
+        with tab2:
+            if df_endereco is not None:
+                st.dataframe(df_endereco, use_container_width=True, hide_index=True)
+        
+        with tab3:
+            if df_formacao is not None:
+                st.dataframe(df_formacao, use_container_width=True, hide_index=True)
+
+        # --- ESTRATÉGIA POR PÁGINA ---
+        if plano:
+            resumo_plano = resumir_plano(plano)
+            with st.expander(
+                f"📑 Estratégia por página: {resumo_plano['paginas_texto']} por texto, "
+                f"{resumo_plano['paginas_imagem']} por imagem "
+                f"(~{resumo_plano['tokens_economizados']:,} tokens de entrada economizados)"
+            ):
+                st.dataframe(pd.DataFrame({
+                    'Página': [d['pagina'] for d in plano],
+                    'Estratégia': ['Texto' if d['usar_texto'] else f"Imagem ({d.get('detail', 'high')})" for d in plano],
+                    'Motivo': [d['motivo'] for d in plano],
+                    'Caracteres': [d['caracteres'] for d in plano],
+                    'Tokens (imagem)': [d['tokens_imagem'] for d in plano],
+                    'Tokens (enviado)': [tokens_enviados(d) for d in plano]
+                }), use_container_width=True, hide_index=True)
+
+        # --- INFORMAÇÕES DO PROCESSAMENTO ---
+        st.markdown("---")
+        st.subheader("💡 Informações do Processamento")
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("📄 Páginas Processadas", len(plano) if plano else "-")
+        with col2:
+            st.metric("🔢 Tokens Utilizados", f"{total_tokens:,.0f}")
+        with col3:
+            st.metric("💵 Custo", f"${preco_total:.4f}")
+        with col4:
+            st.metric("⏱️ Tempo Total", f"{tempo_total:.1f} s")
+
+        # Agregados do trabalhador que processou o currículo (todas as análises desde que ele subiu)
+        histogramas = resultado.get("metricas")
+        if histogramas:
+            with st.expander("⏱️ Tempo por etapa (acumulado do trabalhador)"):
+                st.dataframe(pd.DataFrame({
+                    'Etapa': [nome.removesuffix('.ms') for nome in histogramas],
+                    'Execuções': [h['n'] for h in histogramas.values()],
+                    'Média (ms)': [round(h['media'], 1) for h in histogramas.values()],
+                    'p50 (ms)': [round(h['p50'], 1) for h in histogramas.values()],
+                    'p95 (ms)': [round(h['p95'], 1) for h in histogramas.values()],
+                    'Máx. (ms)': [round(h['max'], 1) for h in histogramas.values()]
+                }), use_container_width=True, hide_index=True)
+
+    else:
+        st.error(f"❌ Erro no processamento: {dados_curriculo['erro']}")
+        if "resposta_bruta" in dados_curriculo:
+            with st.expander("Ver resposta bruta para debug"):
+                st.text(dados_curriculo['resposta_bruta'])
+
+    # --- FALHAS NA LIMPEZA DAS IMAGENS DO GOOGLE DRIVE ---
+    for falha in resultado["falhas_limpeza"]:
+        st.warning(falha)
 
 # --- INTERFACE PRINCIPAL ---
 st.set_page_config(page_title="Análise de Currículos", page_icon="📄", layout="wide")
@@ -126,7 +295,7 @@ st.title("📄 Análise Inteligente de Currículos")
 with st.sidebar:
     st.header("ℹ️ Informações")
     st.info("""
-    Esta ferramenta analisa currículos em PDF e extrai:
+    Esta ferramenta analisa currículos em PDF ou Word (.doc/.docx) e extrai:
     - 👤 Dados pessoais
     - 📍 Informações de endereço
     - 🎓 Dados de formação
@@ -135,154 +304,147 @@ with st.sidebar:
 
     st.header("📋 Como usar")
     st.markdown("""
-    1. Faça upload do arquivo PDF do currículo
-    2. Clique em "Processar Currículo com IA"
+    1. Faça upload de um ou mais currículos (PDF, DOC ou DOCX)
+    2. Clique em "Processar Currículos com IA"
     3. Aguarde o processamento
-    4. Veja os dados extraídos organizados
+    4. Veja os dados extraídos organizados e exporte a tabela de candidatos
     """)
 
-st.markdown("Faça upload de um PDF de currículo e extraia automaticamente todas as informações estruturadas.")
-
-uploaded_file = st.file_uploader("Selecione o PDF do Currículo", type=['pdf'])
-
-if uploaded_file is not None:
-    st.success(f"Arquivo carregado: {uploaded_file.name}")
-
-    if st.button("🚀 Processar Currículo com IA"):
-        with st.spinner("🔄 Convertendo PDF, enviando imagens e analisando currículo... Isso pode levar alguns minutos."):
-            # 1. Converter PDF em imagens
-            pdf_bytes = uploaded_file.read()
-            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-            imagens = []
-            for page_num in range(len(pdf_document)):
-                page = pdf_document.load_page(page_num)
-                pix = page.get_pixmap()
-                img_bytes = pix.tobytes("png")
-                img = Image.open(io.BytesIO(img_bytes))
-                imagens.append(img)
-                
-            links_publicos = []
-            file_ids = []
-            
-            for i, img in enumerate(imagens):
-                with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-                    img.save(tmp.name, format="PNG")
-                    tmp.flush()
-                    link, file_id = upload_image_and_get_public_link(tmp.name, FOLDER_ID, return_id=True)
-                    links_publicos.append(link)
-                    file_ids.append(file_id)
-                os.unlink(tmp.name)
-            
-            # 2. Analisar currículo com IA
-            dados_curriculo, total_tokens, preco_total = analisar_curriculo_por_links(links_publicos)
-        
-        if "erro" not in dados_curriculo:
-            st.success("✅ Processamento concluído!")
-
-            # --- CARDS DE RESUMO ---
-            st.subheader("👤 Resumo do Candidato")
-            
-            # Nome
-            nome = dados_curriculo.get('nome', '-')
-            nome_display = nome if nome != 'Não informado' else '-'
-            st.metric(
-                label="👤 Nome",
-                value=nome_display
-            )
-            
-            # Idade
-            idade = dados_curriculo.get('idade', '-')
-            idade_display = f"{idade} anos" if idade != 'Não informado' and idade != '-' else '-'
-            st.metric(
-                label="🎂 Idade",
-                value=idade_display
-            )
-            
-            # Escolaridade
-            nivel_ensino = dados_curriculo.get('nivel_ensino', '-')
-            nivel_display = nivel_ensino if nivel_ensino != 'Não informado' else '-'
-            st.metric(
-                label="🎓 Escolaridade",
-                value=nivel_display
-            )
-            
-            # E-mail
-            email = dados_curriculo.get('email', '-')
-            email_display = email if email != 'Não informado' else '-'
-            st.metric(
-                label="📧 E-mail",
-                value=email_display
-            )
-
-            # --- OBJETIVOS E RESUMO PROFISSIONAL ---
-            st.markdown("---")
-            st.subheader("💼 Perfil Profissional")
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown("**🎯 Objetivos Profissionais:**")
-                objetivos = dados_curriculo.get('objetivos_profissionais', '-')
-                objetivos_display = objetivos if objetivos != 'Não informado' else '-'
-                st.write(objetivos_display)
-            
-            with col2:
-                st.markdown("**📝 Resumo Profissional:**")
-                resumo = dados_curriculo.get('resumo_profissional', '-')
-                resumo_display = resumo if resumo != 'Não informado' else '-'
-                st.write(resumo_display)
-            
-            # Pretensão salarial
-            pretensao = dados_curriculo.get('pretensao_salarial', '-')
-            if pretensao != 'Não informado' and pretensao != '-':
-                st.markdown(f"**💰 Pretensão Salarial:** {pretensao}")
-
-            # --- TABELAS DETALHADAS ---
-            st.markdown("---")
-            st.subheader("📊 Dados Detalhados")
-
-            df_pessoais, df_endereco, df_formacao = formatar_dados_para_tabela(dados_curriculo)
-            
-            # Abas para organizar as informações
-            tab1, tab2, tab3 = st.tabs(["👤 Dados Pessoais", "📍 Endereço", "🎓 Formação"])
-            
-            with tab1:
-                if df_pessoais is not None:
-                    st.dataframe(df_pessoais, use_container_width=True, hide_index=True)
-            
-            with tab2:
-                if df_endereco is not None:
-                    st.dataframe(df_endereco, use_container_width=True, hide_index=True)
-            
-            with tab3:
-                if df_formacao is not None:
-                    st.dataframe(df_formacao, use_container_width=True, hide_index=True)
-
-            # # --- INFORMAÇÕES DO PROCESSAMENTO ---
-            # st.markdown("---")
-            # st.subheader("💡 Informações do Processamento")
-
-            # col1, col2, col3 = st.columns(3)
-            # with col1:
-            #     st.metric("📄 Páginas Processadas", len(imagens))
-            # with col2:
-            #     st.metric("🔢 Tokens Utilizados", f"{total_tokens:,.0f}")
-            # with col3:
-            #     st.metric("💵 Custo Estimado", f"${preco_total:.4f}")
-
-        else:
-            st.error(f"❌ Erro no processamento: {dados_curriculo['erro']}")
-            if "resposta_bruta" in dados_curriculo:
-                with st.expander("Ver resposta bruta para debug"):
-                    st.text(dados_curriculo['resposta_bruta'])
-
-        # --- DELETA AS IMAGENS DO GOOGLE DRIVE ---
-        try:
-            creds = authenticate()
-            service = build('drive', 'v3', credentials=creds)
-            for file_id in file_ids:
-                try:
-                    service.files().delete(fileId=file_id).execute()
-                except Exception as e:
-                    st.warning(f"Não foi possível deletar o arquivo {file_id}: {e}")
-        except Exception as e:
-            st.warning(f"Erro ao limpar arquivos temporários: {e}")
\ No newline at end of file
+    st.header("⚙️ Configurações")
+    usar_google_drive = st.checkbox(
+        "Enviar imagens via Google Drive",
+        value=False,
+        help="Por padrão as páginas são enviadas diretamente ao modelo (base64), sem upload para o Drive."
+    )
+    requisicao_unica = st.checkbox(
+        "Analisar todas as páginas em uma única requisição",
+        value=True,
+        help=f"Envia o currículo inteiro em uma só chamada ao modelo (até {LIMITE_PAGINAS_REQUISICAO_UNICA} páginas); documentos maiores são analisados página a página."
+    )
+    incremental = st.checkbox(
+        "Pedir às páginas seguintes só os campos faltantes",
+        value=False,
+        help="Nas análises página a página, cada página recebe só os campos ainda não encontrados, e a análise para quando os campos obrigatórios estiverem preenchidos."
+    )
+    usar_camada_texto = st.checkbox(
+        "Usar a camada de texto de PDFs digitais",
+        value=True,
+        help="Páginas com texto selecionável são enviadas como texto (muito menos tokens); só as digitalizadas viram imagem."
+    )
+    max_paralelo = st.slider(
+        "Currículos processados em paralelo",
+        min_value=1,
+        max_value=16,
+        value=4,
+        help="Limite de currículos deste envio analisados ao mesmo tempo pelos trabalhadores (também limitado pelo número de trabalhadores)."
+    )
+    exibir_ao_vivo = st.checkbox(
+        "Mostrar os campos à medida que chegam",
+        value=True,
+        help="Recebe a resposta do modelo em streaming e preenche os cards e tabelas campo a campo (requisição única, currículo de uma página ou só campos faltantes)."
+    )
+
+    estatisticas_cache = obter_cache_extracao().estatisticas()
+    st.caption(
+        f"🗄️ Cache: {estatisticas_cache['entradas']} currículos · "
+        f"{estatisticas_cache['acertos']} acertos / {estatisticas_cache['falhas']} falhas"
+    )
+    estatisticas_fila = obter_fila().estatisticas()
+    st.caption(
+        f"📬 Fila: {estatisticas_fila['pendente']} aguardando · "
+        f"{estatisticas_fila['processando']} em processamento"
+    )
+
+st.markdown("Faça upload de um ou mais currículos (PDF, DOC ou DOCX) e extraia automaticamente todas as informações estruturadas.")
+
+uploaded_files = st.file_uploader("Selecione os Currículos", type=['pdf', 'doc', 'docx'], accept_multiple_files=True)
+
+if uploaded_files:
+    st.success(f"{len(uploaded_files)} arquivo(s) carregado(s)")
+
+    if st.button("🚀 Processar Currículos com IA"):
+        opcoes = {
+            "usar_google_drive": usar_google_drive,
+            "requisicao_unica": requisicao_unica,
+            "usar_camada_texto": usar_camada_texto,
+            "incremental": incremental,
+            "ao_vivo": exibir_ao_vivo
+        }
+        # O processamento roda nos trabalhadores (fila_trabalhos.py); o app só acompanha o status.
+        # Os arquivos do envio formam um lote, limitado a `max_paralelo` trabalhos simultâneos
+        lote = uuid.uuid4().hex
+        ids_trabalhos = [
+            obter_fila().enfileirar(arquivo.getvalue(), arquivo.name, opcoes, lote=lote, max_paralelo=max_paralelo)
+            for arquivo in uploaded_files
+        ]
+        st.session_state["trabalhos"] = ids_trabalhos
+        st.query_params["trabalho"] = ids_trabalhos
+
+# Trabalhos acompanhados: da sessão ou da URL (sobrevivem a um refresh da página)
+ids_trabalhos = st.session_state.get("trabalhos") or st.query_params.get_all("trabalho")
+trabalhos = [trabalho for trabalho in map(obter_trabalho, ids_trabalhos) if trabalho is not None]
+em_andamento = any(trabalho["status"] in (PENDENTE, PROCESSANDO) for trabalho in trabalhos)
+
+if len(trabalhos) == 1:
+    if em_andamento:
+        exibir_andamento(trabalhos[0], estatisticas_fila)
+    else:
+        exibir_resultado(trabalhos[0])
+
+elif trabalhos:
+    finalizados = [trabalho for trabalho in trabalhos if trabalho["status"] not in (PENDENTE, PROCESSANDO)]
+    st.progress(len(finalizados) / len(trabalhos), text=f"{len(finalizados)}/{len(trabalhos)} currículos finalizados")
+
+    # --- ANDAMENTO POR ARQUIVO ---
+    def descrever_status(trabalho):
+        if trabalho["status"] == PENDENTE:
+            return f"⏳ Na fila (posição {trabalho['posicao']})"
+        if trabalho["status"] == PROCESSANDO:
+            return f"🔄 {ETAPAS_TRABALHO.get(trabalho['etapa'], 'Preparando')}"
+        if trabalho["status"] == CONCLUIDO:
+            return "✅ Concluído"
+        return f"❌ {trabalho['erro']}"
+
+    with st.expander("📋 Andamento por arquivo", expanded=em_andamento):
+        st.dataframe(pd.DataFrame({
+            'Arquivo': [t['nome_arquivo'] for t in trabalhos],
+            'Status': [descrever_status(t) for t in trabalhos],
+            'Campos recebidos': [len(t['dados_parciais'] or {}) for t in trabalhos],
+            'Tempo (s)': [round((t['concluido_em'] or time.time()) - t['criado_em'], 1) for t in trabalhos]
+        }), use_container_width=True, hide_index=True)
+
+    # --- TABELA CONSOLIDADA ---
+    concluidos = [trabalho for trabalho in finalizados if trabalho["status"] == CONCLUIDO]
+    if concluidos:
+        st.subheader("📊 Candidatos")
+        df_candidatos = pd.DataFrame([
+            {'Arquivo': t['nome_arquivo'], **formatar_dados_para_linha(t['resultado']['dados'])}
+            for t in concluidos
+        ])
+        st.dataframe(df_candidatos, use_container_width=True, hide_index=True)
+
+        total_tokens = sum(t['resultado']['total_tokens'] for t in concluidos)
+        preco_total = sum(t['resultado']['preco_total'] for t in concluidos)
+        st.caption(f"🔢 {total_tokens:,.0f} tokens · 💵 ${preco_total:.4f}")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("⬇️ Baixar CSV", df_candidatos.to_csv(index=False).encode("utf-8-sig"),
+                               file_name="candidatos.csv", mime="text/csv")
+        with col2:
+            st.download_button("⬇️ Baixar Excel", exportar_excel(df_candidatos), file_name="candidatos.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+    # --- DETALHES DE UM CANDIDATO ---
+    if finalizados:
+        st.markdown("---")
+        indice = st.selectbox(
+            "🔎 Ver detalhes de",
+            range(len(finalizados)),
+            format_func=lambda i: finalizados[i]['nome_arquivo']
+        )
+        exibir_resultado(finalizados[indice])
+
+if em_andamento:
+    time.sleep(INTERVALO_ATUALIZACAO_SEGUNDOS)
+    st.rerun()
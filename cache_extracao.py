@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+# Arquivo SQLite local onde os resultados de extração ficam armazenados
+CAMINHO_CACHE_PADRAO = "cache_extracao.sqlite3"
+
+# Limites de retenção: número de entradas, tamanho total e idade máxima
+MAX_ENTRADAS_PADRAO = 5000
+MAX_BYTES_PADRAO = 200 * 1024 * 1024  # 200 MB
+MAX_IDADE_SEGUNDOS_PADRAO = 30 * 24 * 3600  # 30 dias
+
+def _hash_partes(partes: List[bytes]) -> str:
+    """Gera um SHA-256 estável para uma sequência de partes (cada parte é resumida antes, sem ambiguidade de concatenação)."""
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(hashlib.sha256(parte).digest())
+    return h.hexdigest()
+
+def chave_documento(pdf_bytes: bytes, modelo: str, versao_prompt: str, opcoes: str = "") -> str:
+    """Chave do cache para um documento inteiro, a partir dos bytes do arquivo."""
+    return chave_documento_sha256(hashlib.sha256(pdf_bytes).hexdigest(), modelo, versao_prompt, opcoes)
+
+def chave_documento_sha256(sha256: str, modelo: str, versao_prompt: str, opcoes: str = "") -> str:
+    """Mesma chave de `chave_documento`, a partir do SHA-256 (hex) do arquivo já calculado."""
+    h = hashlib.sha256()
+    h.update(bytes.fromhex(sha256))
+    for parte in (modelo.encode(), versao_prompt.encode(), opcoes.encode()):
+        h.update(hashlib.sha256(parte).digest())
+    return "doc:" + h.hexdigest()
+
+def chave_paginas(imagens: List[bytes], modelo: str, versao_prompt: str, opcoes: str = "") -> str:
+    """Chave do cache a partir do hash de cada página renderizada (na ordem)."""
+    hashes_paginas = [hashlib.sha256(imagem).digest() for imagem in imagens]
+    return "pag:" + _hash_partes(hashes_paginas + [modelo.encode(), versao_prompt.encode(), opcoes.encode()])
+
+class CacheExtracao:
+    """
+    Cache persistente (SQLite) de resultados de extração de currículos.
+
+    Cada entrada guarda (dados_curriculo, total_tokens, preco_total). Entradas
+    antigas são removidas por idade, e as menos usadas recentemente quando o
+    número de entradas ou o tamanho total ultrapassam os limites. Os contadores
+    de acertos/falhas ficam no próprio banco, compartilhados entre processos.
+
+    Falhas do cache nunca interrompem a extração: são apenas registradas no log.
+    """
+
+    def __init__(
+        self,
+        caminho: str = CAMINHO_CACHE_PADRAO,
+        max_entradas: int = MAX_ENTRADAS_PADRAO,
+        max_bytes: int = MAX_BYTES_PADRAO,
+        max_idade_segundos: float = MAX_IDADE_SEGUNDOS_PADRAO
+    ):
+        self.caminho = caminho
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.max_idade_segundos = max_idade_segundos
+
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+        with self._conectar() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extracoes (
+                    chave TEXT PRIMARY KEY,
+                    dados TEXT NOT NULL,
+                    total_tokens INTEGER NOT NULL,
+                    preco_total REAL NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    criado_em REAL NOT NULL,
+                    ultimo_acesso REAL NOT NULL,
+                    acessos INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_extracoes_acesso ON extracoes (ultimo_acesso)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS contadores (
+                    nome TEXT PRIMARY KEY,
+                    valor INTEGER NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _conectar(self):
+        # Uma conexão por operação: seguro entre threads e processos
+        conn = sqlite3.connect(self.caminho, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _incrementar(self, conn: sqlite3.Connection, nome: str) -> None:
+        conn.execute(
+            "INSERT INTO contadores (nome, valor) VALUES (?, 1) "
+            "ON CONFLICT(nome) DO UPDATE SET valor = valor + 1",
+            (nome,)
+        )
+
+    def obter(self, chave: str) -> Optional[Tuple[Dict[str, Any], int, float]]:
+        """Retorna (dados_curriculo, total_tokens, preco_total) ou None se não houver entrada válida."""
+        try:
+            agora = time.time()
+            with self._conectar() as conn:
+                linha = conn.execute(
+                    "SELECT dados, total_tokens, preco_total, criado_em FROM extracoes WHERE chave = ?",
+                    (chave,)
+                ).fetchone()
+
+                if linha is None or agora - linha[3] > self.max_idade_segundos:
+                    if linha is not None:
+                        conn.execute("DELETE FROM extracoes WHERE chave = ?", (chave,))
+                    self._incrementar(conn, "falhas")
+                    return None
+
+                conn.execute(
+                    "UPDATE extracoes SET ultimo_acesso = ?, acessos = acessos + 1 WHERE chave = ?",
+                    (agora, chave)
+                )
+                self._incrementar(conn, "acertos")
+                return json.loads(linha[0]), linha[1], linha[2]
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            print(f"Aviso: Falha ao consultar o cache de extração: {e}")
+            return None
+
+    def salvar(self, chave: str, dados_curriculo: Dict[str, Any], total_tokens: int, preco_total: float) -> None:
+        """Armazena um resultado de extração. Resultados com erro não são armazenados."""
+        if "erro" in dados_curriculo:
+            return
+
+        try:
+            dados = json.dumps(dados_curriculo, ensure_ascii=False)
+            agora = time.time()
+            with self._conectar() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO extracoes "
+                    "(chave, dados, total_tokens, preco_total, tamanho, criado_em, ultimo_acesso, acessos) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                    (chave, dados, total_tokens, preco_total, len(dados.encode("utf-8")), agora, agora)
+                )
+                self._remover_excedentes(conn, agora)
+        except sqlite3.Error as e:
+            print(f"Aviso: Falha ao gravar no cache de extração: {e}")
+
+    def _remover_excedentes(self, conn: sqlite3.Connection, agora: float) -> None:
+        """Remove entradas expiradas e, se necessário, as menos usadas recentemente."""
+        removidas = conn.execute(
+            "DELETE FROM extracoes WHERE criado_em < ?",
+            (agora - self.max_idade_segundos,)
+        ).rowcount
+
+        total_entradas, total_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM extracoes"
+        ).fetchone()
+
+        if total_entradas > self.max_entradas or total_bytes > self.max_bytes:
+            # Percorre da entrada menos usada recentemente até voltar aos limites
+            chaves_remover = []
+            for chave, tamanho in conn.execute("SELECT chave, tamanho FROM extracoes ORDER BY ultimo_acesso ASC").fetchall():
+                if total_entradas <= self.max_entradas and total_bytes <= self.max_bytes:
+                    break
+                chaves_remover.append((chave,))
+                total_entradas -= 1
+                total_bytes -= tamanho
+
+            conn.executemany("DELETE FROM extracoes WHERE chave = ?", chaves_remover)
+            removidas += len(chaves_remover)
+
+        if removidas:
+            conn.execute(
+                "INSERT INTO contadores (nome, valor) VALUES ('remocoes', ?) "
+                "ON CONFLICT(nome) DO UPDATE SET valor = valor + ?",
+                (removidas, removidas)
+            )
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna contadores de acertos, falhas, remoções, entradas e tamanho total."""
+        try:
+            with self._conectar() as conn:
+                contadores = dict(conn.execute("SELECT nome, valor FROM contadores").fetchall())
+                entradas, total_bytes = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM extracoes"
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Aviso: Falha ao ler estatísticas do cache: {e}")
+            contadores, entradas, total_bytes = {}, 0, 0
+
+        acertos = contadores.get("acertos", 0)
+        falhas = contadores.get("falhas", 0)
+        consultas = acertos + falhas
+        return {
+            "acertos": acertos,
+            "falhas": falhas,
+            "taxa_acerto": acertos / consultas if consultas else 0.0,
+            "remocoes": contadores.get("remocoes", 0),
+            "entradas": entradas,
+            "tamanho_bytes": total_bytes
+        }
+
+    def limpar(self) -> None:
+        """Remove todas as entradas e zera os contadores."""
+        with self._conectar() as conn:
+            conn.execute("DELETE FROM extracoes")
+            conn.execute("DELETE FROM contadores")
@@ -0,0 +1,113 @@
+import math
+from typing import Dict, Any, List
+
+# Critérios para considerar que uma página tem camada de texto utilizável
+MIN_CARACTERES_PAGINA = 200  # Páginas com menos texto que isso são rasterizadas
+MIN_PROPORCAO_LEGIVEL = 0.85  # Fração mínima de caracteres legíveis (letras, dígitos, pontuação, espaços)
+MAX_PROPORCAO_AREA_IMAGENS = 0.5  # Páginas com texto escasso e imagens grandes indicam digitalização
+
+def estimar_tokens_texto(texto: str) -> int:
+    """Estimativa de tokens de um texto (aprox. 4 caracteres por token)."""
+    return math.ceil(len(texto) / 4)
+
+def estimar_tokens_imagem(largura: float, altura: float, detail: str = "high") -> int:
+    """
+    Estimativa de tokens de uma imagem no GPT-4o.
+
+    Em "high" a imagem é reduzida para caber em 2048x2048, depois o menor lado
+    para 768 px, e cada bloco de 512x512 custa 170 tokens (mais 85 fixos).
+    """
+    if detail == "low":
+        return 85
+
+    escala = min(1.0, 2048 / max(largura, altura))
+    largura, altura = largura * escala, altura * escala
+    escala = min(1.0, 768 / min(largura, altura))
+    largura, altura = largura * escala, altura * escala
+    blocos = math.ceil(largura / 512) * math.ceil(altura / 512)
+    return 85 + 170 * blocos
+
+def proporcao_legivel(texto: str) -> float:
+    """Fração de caracteres legíveis; fontes sem mapeamento Unicode geram lixo ou '�'."""
+    if not texto:
+        return 0.0
+    legiveis = sum(1 for c in texto if (c.isalnum() or c.isspace() or c in ".,;:!?()-/@%$ºª°'\"+*&#_•–—|") and c != "�")
+    return legiveis / len(texto)
+
+def avaliar_pagina(
+    page,
+    min_caracteres: int = MIN_CARACTERES_PAGINA,
+    min_proporcao_legivel: float = MIN_PROPORCAO_LEGIVEL
+) -> Dict[str, Any]:
+    """
+    Decide se uma página do PyMuPDF pode ser enviada como texto ou precisa de visão.
+
+    Returns:
+        Dicionário com: pagina, usar_texto, motivo, caracteres, proporcao_legivel,
+        proporcao_area_imagens, texto, tokens_imagem e tokens_texto (estimados)
+    """
+    texto = page.get_text().strip()
+    caracteres = len("".join(texto.split()))
+    legivel = proporcao_legivel(texto)
+
+    area_pagina = abs(page.rect) or 1.0
+    area_imagens = 0.0
+    for info in page.get_image_info():
+        x0, y0, x1, y1 = info["bbox"]
+        area_imagens += abs((x1 - x0) * (y1 - y0))
+    proporcao_area_imagens = min(1.0, area_imagens / area_pagina)
+
+    if caracteres < min_caracteres:
+        usar_texto, motivo = False, f"pouco texto ({caracteres} caracteres)"
+    elif legivel < min_proporcao_legivel:
+        usar_texto, motivo = False, f"texto ilegível ({legivel:.0%} legível)"
+    elif proporcao_area_imagens > MAX_PROPORCAO_AREA_IMAGENS and caracteres < 2 * min_caracteres:
+        usar_texto, motivo = False, f"provável digitalização ({proporcao_area_imagens:.0%} da página em imagens)"
+    else:
+        usar_texto, motivo = True, "camada de texto utilizável"
+
+    return {
+        "pagina": page.number + 1,
+        "usar_texto": usar_texto,
+        "motivo": motivo,
+        "caracteres": caracteres,
+        "proporcao_legivel": legivel,
+        "proporcao_area_imagens": proporcao_area_imagens,
+        "texto": texto if usar_texto else "",
+        "tokens_imagem": estimar_tokens_imagem(page.rect.width, page.rect.height),
+        "tokens_texto": estimar_tokens_texto(texto) if usar_texto else 0
+    }
+
+def planejar_paginas(
+    pdf_document,
+    min_caracteres: int = MIN_CARACTERES_PAGINA,
+    min_proporcao_legivel: float = MIN_PROPORCAO_LEGIVEL
+) -> List[Dict[str, Any]]:
+    """Avalia todas as páginas de um documento PyMuPDF (ver `avaliar_pagina`)."""
+    return [
+        avaliar_pagina(pdf_document.load_page(page_num), min_caracteres, min_proporcao_legivel)
+        for page_num in range(len(pdf_document))
+    ]
+
+def tokens_enviados(decisao: Dict[str, Any]) -> int:
+    """Tokens estimados da página como enviada: texto, ou imagem já recortada/ajustada se houver."""
+    if decisao["usar_texto"]:
+        return decisao["tokens_texto"]
+    return decisao.get("tokens_imagem_ajustado", decisao["tokens_imagem"])
+
+def resumir_plano(plano: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Totais do plano: páginas por estratégia e tokens de entrada estimados
+    enviando todas as páginas como imagem inteira e como planejado (camada de
+    texto, recorte de margens e detalhe por página).
+    """
+    paginas_texto = sum(1 for p in plano if p["usar_texto"])
+    tokens_somente_imagem = sum(p["tokens_imagem"] for p in plano)
+    tokens_plano = sum(tokens_enviados(p) for p in plano)
+    return {
+        "paginas_texto": paginas_texto,
+        "paginas_imagem": len(plano) - paginas_texto,
+        "tokens_somente_imagem": tokens_somente_imagem,
+        "tokens_plano": tokens_plano,
+        "tokens_economizados": tokens_somente_imagem - tokens_plano
+    }
@@ -0,0 +1,308 @@
+"""
+Extração de texto de documentos do Word (.docx e .doc) sem conversão para PDF
+nem renderização de imagens: o texto vai direto para a extração por texto.
+
+- .docx: python-docx; cabeçalhos e rodapés, parágrafos e tabelas na ordem do
+  documento (células mescladas aparecem uma vez).
+- .doc (Word 97-2003): leitor OLE (Compound File Binary) em Python puro; o
+  texto é montado pela tabela de peças (CLX) do stream WordDocument.
+
+    texto = extrair_texto_word(conteudo)  # bytes de um .doc ou .docx
+"""
+import io
+import re
+import struct
+from typing import Dict, List, Union
+
+import docx
+
+from camada_texto import estimar_tokens_texto
+
+EXTENSOES_WORD = (".doc", ".docx")
+
+ASSINATURA_OLE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ASSINATURA_ZIP = b"PK\x03\x04"
+
+# Setores especiais da FAT do arquivo OLE
+SETOR_LIVRE = 0xFFFFFFFF
+FIM_CADEIA = 0xFFFFFFFE
+SETOR_FAT = 0xFFFFFFFD
+SETOR_DIFAT = 0xFFFFFFFC
+
+# Identificador do FIB de documentos do Word 97 ou posterior
+IDENTIFICADOR_WORD = 0xA5EC
+NFIB_WORD97 = 0xC1
+
+def eh_documento_word(conteudo: bytes) -> bool:
+    """Indica se os bytes são de um .doc (OLE) ou de um .docx (zip com word/document.xml)."""
+    if conteudo.startswith(ASSINATURA_OLE):
+        return True
+    return conteudo.startswith(ASSINATURA_ZIP) and b"word/" in conteudo[:4096]
+
+def extrair_texto_word(conteudo: bytes) -> str:
+    """Texto de um .doc ou .docx, identificado pela assinatura do arquivo."""
+    if conteudo.startswith(ASSINATURA_OLE):
+        return extrair_texto_doc(conteudo)
+    if conteudo.startswith(ASSINATURA_ZIP):
+        return extrair_texto_docx(conteudo)
+    raise ValueError("Arquivo não é um documento do Word (.doc ou .docx)")
+
+def extrair_texto_arquivo_word(caminho: str) -> str:
+    with open(caminho, "rb") as f:
+        return extrair_texto_word(f.read())
+
+def planejar_documento_word(conteudo: bytes) -> List[Dict]:
+    """
+    Plano de páginas (formato de `camada_texto.planejar_paginas`) de um
+    documento do Word: uma única entrada com o texto do documento inteiro.
+    """
+    texto = extrair_texto_word(conteudo)
+    if not texto.strip():
+        raise ValueError("Documento do Word sem texto extraível")
+    tokens_texto = estimar_tokens_texto(texto)
+    return [{
+        "pagina": 1,
+        "usar_texto": True,
+        "motivo": "documento do Word (texto nativo)",
+        "caracteres": len(texto),
+        "proporcao_legivel": 1.0,
+        "proporcao_area_imagens": 0.0,
+        "texto": texto,
+        # Sem versão em imagem para comparar: não há economia a reportar
+        "tokens_imagem": tokens_texto,
+        "tokens_texto": tokens_texto
+    }]
+
+# === .docx ===
+
+def _nome_tag(elemento) -> str:
+    return elemento.tag.rsplit("}", 1)[-1] if isinstance(elemento.tag, str) else ""
+
+def _percorrer_paragrafo(elemento, texto: List[str], caixas: List[str]) -> None:
+    for filho in elemento:
+        tag = _nome_tag(filho)
+        if tag == "t":
+            texto.append(filho.text or "")
+        elif tag == "tab":
+            texto.append("\t")
+        elif tag in ("br", "cr"):
+            texto.append("\n")
+        elif tag == "txbxContent":
+            # Caixas de texto (comuns em modelos de currículo para nome e contato)
+            caixas.extend(_linhas_bloco(filho))
+        elif tag not in ("pPr", "rPr", "Fallback", "delText", "instrText"):
+            # Fallback repete em VML o conteúdo do mc:Choice
+            _percorrer_paragrafo(filho, texto, caixas)
+
+def _linhas_bloco(elemento) -> List[str]:
+    """Linhas de texto de um corpo (documento, cabeçalho, célula, caixa de texto), na ordem."""
+    linhas = []
+    for filho in elemento:
+        tag = _nome_tag(filho)
+        if tag == "p":
+            texto, caixas = [], []
+            _percorrer_paragrafo(filho, texto, caixas)
+            linhas.append("".join(texto))
+            linhas.extend(caixas)
+        elif tag == "tbl":
+            for linha in filho:
+                if _nome_tag(linha) != "tr":
+                    continue
+                celulas = [" ".join(l.strip() for l in _linhas_bloco(celula) if l.strip()) for celula in linha if _nome_tag(celula) == "tc"]
+                linhas.append(" | ".join(celula for celula in celulas if celula))
+        elif tag not in ("sectPr", "tblPr", "tblGrid"):
+            # Controles de conteúdo (sdt), inserções de revisão etc.
+            linhas.extend(_linhas_bloco(filho))
+    return linhas
+
+def extrair_texto_docx(origem: Union[str, bytes]) -> str:
+    """Texto de um .docx (caminho ou bytes): cabeçalhos, corpo com tabelas e caixas de texto, e rodapés."""
+    documento = docx.Document(io.BytesIO(origem) if isinstance(origem, bytes) else origem)
+
+    cabecalhos, rodapes = [], []
+    for secao in documento.sections:
+        partes = [(cabecalhos, secao.header), (rodapes, secao.footer)]
+        if secao.different_first_page_header_footer:
+            partes += [(cabecalhos, secao.first_page_header), (rodapes, secao.first_page_footer)]
+        for destino, parte in partes:
+            if not parte.is_linked_to_previous:
+                destino.extend(_linhas_bloco(parte._element))
+
+    linhas = []
+    vistas = set()
+    for linha in cabecalhos + _linhas_bloco(documento.element.body) + rodapes:
+        linha = re.sub(r"[ \t]+", " ", linha).strip()
+        # Cabeçalhos e rodapés repetidos entre seções aparecem uma vez
+        if linha and not (linha in vistas and (linha in cabecalhos or linha in rodapes)):
+            linhas.append(linha)
+            vistas.add(linha)
+    return "\n".join(linhas)
+
+# === .doc (OLE / Word 97-2003) ===
+
+class ArquivoOLE:
+    """Leitor mínimo de Compound File Binary (OLE2): lista e lê streams pelo nome."""
+
+    def __init__(self, conteudo: bytes):
+        if not conteudo.startswith(ASSINATURA_OLE) or len(conteudo) < 512:
+            raise ValueError("Arquivo não é um documento OLE")
+        self.conteudo = conteudo
+        deslocamento_setor, deslocamento_mini = struct.unpack_from("<HH", conteudo, 0x1E)
+        num_setores_fat, inicio_diretorio = struct.unpack_from("<II", conteudo, 0x2C)
+        (self.limite_mini, inicio_minifat, num_setores_minifat,
+         inicio_difat, num_setores_difat) = struct.unpack_from("<IIIII", conteudo, 0x38)
+        self.tamanho_setor = 1 << deslocamento_setor
+        self.tamanho_mini = 1 << deslocamento_mini
+
+        # DIFAT: 109 entradas no cabeçalho, o resto em setores encadeados
+        setores_fat = list(struct.unpack_from("<109I", conteudo, 0x4C))
+        setor = inicio_difat
+        for _ in range(num_setores_difat):
+            if setor >= SETOR_DIFAT:
+                break
+            entradas = struct.unpack_from(f"<{self.tamanho_setor // 4}I", self._setor(setor))
+            setores_fat.extend(entradas[:-1])
+            setor = entradas[-1]
+        setores_fat = [s for s in setores_fat[:num_setores_fat] if s < SETOR_DIFAT]
+
+        self.fat = []
+        for setor in setores_fat:
+            self.fat.extend(struct.unpack(f"<{self.tamanho_setor // 4}I", self._setor(setor)))
+
+        self.entradas = self._ler_diretorio(self._cadeia(inicio_diretorio))
+        raiz = self.entradas[0]
+        self.mini_stream = self._cadeia(raiz["inicio"])[:raiz["tamanho"]]
+        self.minifat = []
+        if num_setores_minifat:
+            dados = self._cadeia(inicio_minifat)
+            self.minifat = list(struct.unpack(f"<{len(dados) // 4}I", dados))
+
+    def _setor(self, numero: int) -> bytes:
+        inicio = (numero + 1) * self.tamanho_setor
+        return self.conteudo[inicio:inicio + self.tamanho_setor]
+
+    def _cadeia(self, inicio: int) -> bytes:
+        partes = []
+        setor = inicio
+        visitados = set()
+        while setor < SETOR_FAT and setor < len(self.fat):
+            if setor in visitados:
+                raise ValueError("Cadeia de setores circular no arquivo OLE")
+            visitados.add(setor)
+            partes.append(self._setor(setor))
+            setor = self.fat[setor]
+        return b"".join(partes)
+
+    def _cadeia_mini(self, inicio: int) -> bytes:
+        partes = []
+        setor = inicio
+        visitados = set()
+        while setor < SETOR_FAT and setor < len(self.minifat):
+            if setor in visitados:
+                raise ValueError("Cadeia de setores circular no arquivo OLE")
+            visitados.add(setor)
+            partes.append(self.mini_stream[setor * self.tamanho_mini:(setor + 1) * self.tamanho_mini])
+            setor = self.minifat[setor]
+        return b"".join(partes)
+
+    @staticmethod
+    def _ler_diretorio(dados: bytes) -> List[Dict]:
+        entradas = []
+        for inicio in range(0, len(dados) - 127, 128):
+            tamanho_nome, tipo = struct.unpack_from("<HB", dados, inicio + 64)
+            nome = dados[inicio:inicio + max(0, tamanho_nome - 2)].decode("utf-16-le", errors="ignore")
+            setor_inicial, tamanho = struct.unpack_from("<II", dados, inicio + 116)
+            entradas.append({"nome": nome, "tipo": tipo, "inicio": setor_inicial, "tamanho": tamanho})
+        return entradas
+
+    def streams(self) -> List[str]:
+        return [entrada["nome"] for entrada in self.entradas if entrada["tipo"] == 2]
+
+    def ler(self, nome: str) -> bytes:
+        for entrada in self.entradas:
+            if entrada["tipo"] == 2 and entrada["nome"] == nome:
+                if entrada["tamanho"] < self.limite_mini:
+                    return self._cadeia_mini(entrada["inicio"])[:entrada["tamanho"]]
+                return self._cadeia(entrada["inicio"])[:entrada["tamanho"]]
+        raise KeyError(f"Stream '{nome}' não encontrado no documento")
+
+def _pecas_texto(tabela: bytes, fc_clx: int, lcb_clx: int):
+    """Gera (cp_inicio, cp_fim, fc, comprimido) de cada peça da tabela de peças (PlcPcd)."""
+    clx = tabela[fc_clx:fc_clx + lcb_clx]
+    posicao = 0
+    # Pula as Prc (propriedades), que vêm antes da Pcdt
+    while posicao < len(clx) and clx[posicao] == 0x01:
+        (tamanho,) = struct.unpack_from("<h", clx, posicao + 1)
+        posicao += 3 + tamanho
+    if posicao >= len(clx) or clx[posicao] != 0x02:
+        raise ValueError("Tabela de peças (CLX) inválida")
+    (tamanho_plc,) = struct.unpack_from("<I", clx, posicao + 1)
+    plc = clx[posicao + 5:posicao + 5 + tamanho_plc]
+
+    num_pecas = (tamanho_plc - 4) // 12
+    cps = struct.unpack_from(f"<{num_pecas + 1}I", plc, 0)
+    for i in range(num_pecas):
+        (fc_comprimido,) = struct.unpack_from("<I", plc, (num_pecas + 1) * 4 + i * 8 + 2)
+        comprimido = bool(fc_comprimido & 0x40000000)
+        fc = fc_comprimido & 0x3FFFFFFF
+        yield cps[i], cps[i + 1], (fc // 2 if comprimido else fc), comprimido
+
+def _limpar_texto_doc(texto: str) -> str:
+    """Remove os códigos de campo e troca os caracteres de controle do Word por texto simples."""
+    # Campos: \x13 instrução \x14 resultado \x15 -> mantém só o resultado
+    anterior = None
+    while anterior != texto:
+        anterior = texto
+        texto = re.sub(r"\x13[^\x13\x14\x15]*\x14([^\x13\x15]*)\x15", r"\1", texto)
+        texto = re.sub(r"\x13[^\x13\x14\x15]*\x15", "", texto)
+    texto = texto.replace("\x07\r", "\n").replace("\x07", " | ")
+    texto = re.sub(r"[\r\x0b\x0c\x0e]", "\n", texto)
+    texto = texto.replace("\x1e", "-").replace("\xa0", " ")
+    texto = re.sub(r"[\x00-\x08\x0f-\x1f]", "", texto)
+    linhas = (re.sub(r"[ \t]+", " ", linha).strip(" |") for linha in texto.split("\n"))
+    return "\n".join(linha for linha in linhas if linha)
+
+def extrair_texto_doc(origem: Union[str, bytes]) -> str:
+    """
+    Texto de um .doc do Word 97-2003 (caminho ou bytes): corpo, notas,
+    cabeçalhos/rodapés e caixas de texto. Documentos criptografados e do Word 6/95 (sem tabela
+    de peças) levantam ValueError.
+    """
+    if isinstance(origem, str):
+        with open(origem, "rb") as f:
+            origem = f.read()
+    ole = ArquivoOLE(origem)
+    palavra = ole.ler("WordDocument")
+
+    identificador, nfib = struct.unpack_from("<HH", palavra, 0)
+    if identificador != IDENTIFICADOR_WORD:
+        raise ValueError("Stream WordDocument sem o identificador do Word")
+    if nfib < NFIB_WORD97:
+        raise ValueError("Formato .doc do Word 6/95 não suportado")
+    (sinalizadores,) = struct.unpack_from("<H", palavra, 0x0A)
+    if sinalizadores & 0x0100:
+        raise ValueError("Documento .doc protegido por senha")
+    tabela = ole.ler("1Table" if sinalizadores & 0x0200 else "0Table")
+
+    # FIB: base (32 bytes), FibRgW, FibRgLw e FibRgFcLcb, cada um precedido do tamanho
+    (csw,) = struct.unpack_from("<H", palavra, 32)
+    inicio_rglw = 34 + csw * 2
+    (cslw,) = struct.unpack_from("<H", palavra, inicio_rglw)
+    contadores = struct.unpack_from(f"<{cslw}i", palavra, inicio_rglw + 2)
+    # Histórias do documento, em sequência: corpo (ccpText), notas de rodapé,
+    # cabeçalhos/rodapés, comentários, notas de fim, caixas de texto e caixas
+    # de texto dos cabeçalhos (o índice 6 é reservado)
+    total_cp = sum(max(0, contadores[i]) for i in (3, 4, 5, 7, 8, 9, 10) if i < len(contadores))
+    inicio_fclcb = inicio_rglw + 2 + cslw * 4 + 2
+    fc_clx, lcb_clx = struct.unpack_from("<II", palavra, inicio_fclcb + 33 * 8)
+
+    partes = []
+    for cp_inicio, cp_fim, fc, comprimido in _pecas_texto(tabela, fc_clx, lcb_clx):
+        if cp_inicio >= total_cp:
+            break
+        quantidade = min(cp_fim, total_cp) - cp_inicio
+        if comprimido:
+            partes.append(palavra[fc:fc + quantidade].decode("cp1252", errors="replace"))
+        else:
+            partes.append(palavra[fc:fc + quantidade * 2].decode("utf-16-le", errors="replace"))
+    return _limpar_texto_doc("".join(partes))
@@ -0,0 +1,302 @@
+"""
+Detecção de currículos duplicados antes da extração.
+
+Cada documento recebe uma assinatura com três níveis:
+  - sha256 dos bytes do arquivo (cópia exata, ex.: "arquivo (1).pdf");
+  - sha256 do texto normalizado (mesmo conteúdo reexportado ou em outro formato);
+  - MinHash dos shingles de palavras do texto, para quase-duplicados (pequenas
+    edições), comparado por similaridade de Jaccard estimada.
+
+O índice local (SQLite) guarda as assinaturas já vistas. A busca por
+quase-duplicados usa LSH: a assinatura MinHash é dividida em faixas e só os
+documentos que coincidem em alguma faixa inteira são comparados. O índice
+também guarda a qual original cada duplicado foi associado, para que os
+duplicados possam ser reavaliados se o original sair do índice.
+
+    indice = IndiceDuplicados()
+    original = indice.verificar_ou_registrar(caminho, assinatura_documento(conteudo, texto))
+    if original:
+        print(f"Duplicado de {original['arquivo']} ({original['tipo']}, {original['similaridade']:.2f})")
+"""
+import os
+import re
+import time
+import random
+import struct
+import sqlite3
+import hashlib
+import unicodedata
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+CAMINHO_INDICE_PADRAO = "indice_duplicados.sqlite3"
+
+# Similaridade de Jaccard estimada a partir da qual dois textos são o mesmo currículo
+LIMIAR_SIMILARIDADE = 0.9
+
+# Palavras por shingle e tamanho da assinatura MinHash (FAIXAS x LINHAS_POR_FAIXA)
+PALAVRAS_SHINGLE = 5
+FAIXAS = 16
+LINHAS_POR_FAIXA = 8
+NUM_PERMUTACOES = FAIXAS * LINHAS_POR_FAIXA
+
+# Textos mais curtos que isso (ex.: PDFs digitalizados, sem camada de texto)
+# só são comparados pelo hash dos bytes
+MIN_PALAVRAS_ASSINATURA = 50
+
+_PRIMO = (1 << 61) - 1
+_MASCARA = (1 << 64) - 1
+
+# Permutações fixas: assinaturas de execuções diferentes precisam ser comparáveis
+_gerador = random.Random(20240917)
+_PERMUTACOES = [(_gerador.randrange(1, _PRIMO), _gerador.randrange(0, _PRIMO)) for _ in range(NUM_PERMUTACOES)]
+
+def palavras_normalizadas(texto: str) -> List[str]:
+    """Palavras do texto em minúsculas e sem acentos (ignora pontuação, espaços e quebras de linha)."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.findall(r"\w+", texto)
+
+def _hash64(valor: str) -> int:
+    return int.from_bytes(hashlib.blake2b(valor.encode("utf-8"), digest_size=8).digest(), "little")
+
+def assinatura_minhash(palavras: List[str]) -> List[int]:
+    """Assinatura MinHash dos shingles de PALAVRAS_SHINGLE palavras consecutivas."""
+    n = max(1, len(palavras) - PALAVRAS_SHINGLE + 1)
+    shingles = {_hash64(" ".join(palavras[i:i + PALAVRAS_SHINGLE])) for i in range(n)}
+    return [min((a * x + b) % _PRIMO for x in shingles) & _MASCARA for a, b in _PERMUTACOES]
+
+def similaridade(assinatura_a: List[int], assinatura_b: List[int]) -> float:
+    """Similaridade de Jaccard estimada: fração de posições iguais nas assinaturas MinHash."""
+    return sum(a == b for a, b in zip(assinatura_a, assinatura_b)) / NUM_PERMUTACOES
+
+def _faixas(minhash: List[int]) -> List[str]:
+    return [
+        hashlib.blake2b(struct.pack(f"<{LINHAS_POR_FAIXA}Q", *minhash[i:i + LINHAS_POR_FAIXA]), digest_size=8).hexdigest()
+        for i in range(0, NUM_PERMUTACOES, LINHAS_POR_FAIXA)
+    ]
+
+def assinatura_documento(conteudo: bytes, texto: str) -> Dict[str, Any]:
+    """
+    Assinatura de um documento para a detecção de duplicados.
+
+    Args:
+        conteudo: Bytes do arquivo
+        texto: Texto extraído do documento (pode ser vazio)
+
+    Returns:
+        Dicionário com: sha256, hash_texto (None se não houver texto) e minhash
+        (None se o texto tiver menos de MIN_PALAVRAS_ASSINATURA palavras)
+    """
+    palavras = palavras_normalizadas(texto or "")
+    return {
+        "sha256": hashlib.sha256(conteudo).hexdigest(),
+        "hash_texto": hashlib.sha256(" ".join(palavras).encode("utf-8")).hexdigest() if palavras else None,
+        "minhash": assinatura_minhash(palavras) if len(palavras) >= MIN_PALAVRAS_ASSINATURA else None
+    }
+
+class IndiceDuplicados:
+    """
+    Índice persistente (SQLite) das assinaturas dos documentos já vistos.
+
+    Cada arquivo (pelo caminho absoluto) tem uma única entrada; registrá-lo
+    de novo substitui a assinatura anterior. Os duplicados encontrados por
+    `verificar_ou_registrar` ficam vinculados ao original. Falhas do índice nunca
+    interrompem o processamento: são registradas no log e o documento segue
+    como não duplicado.
+    """
+
+    def __init__(self, caminho: str = CAMINHO_INDICE_PADRAO, limiar: float = LIMIAR_SIMILARIDADE):
+        self.caminho = caminho
+        self.limiar = limiar
+
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+        with self._conectar() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documentos (
+                    id INTEGER PRIMARY KEY,
+                    arquivo TEXT NOT NULL UNIQUE,
+                    sha256 TEXT NOT NULL,
+                    hash_texto TEXT,
+                    minhash BLOB,
+                    criado_em REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documentos_sha256 ON documentos (sha256)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documentos_texto ON documentos (hash_texto)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS faixas (
+                    faixa INTEGER NOT NULL,
+                    valor TEXT NOT NULL,
+                    documento INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_faixas_valor ON faixas (faixa, valor)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_faixas_documento ON faixas (documento)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS vinculos (
+                    duplicado TEXT PRIMARY KEY,
+                    original TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_vinculos_original ON vinculos (original)")
+
+    @contextmanager
+    def _conectar(self):
+        # Uma conexão por operação: seguro entre threads e processos
+        conn = sqlite3.connect(self.caminho, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _procurar(self, conn: sqlite3.Connection, arquivo: str, assinatura: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        linha = conn.execute(
+            "SELECT arquivo FROM documentos WHERE sha256 = ? AND arquivo != ? ORDER BY id LIMIT 1",
+            (assinatura["sha256"], arquivo)
+        ).fetchone()
+        if linha:
+            return {"arquivo": linha[0], "tipo": "exato", "similaridade": 1.0}
+
+        if assinatura["hash_texto"]:
+            linha = conn.execute(
+                "SELECT arquivo FROM documentos WHERE hash_texto = ? AND arquivo != ? ORDER BY id LIMIT 1",
+                (assinatura["hash_texto"], arquivo)
+            ).fetchone()
+            if linha:
+                return {"arquivo": linha[0], "tipo": "texto", "similaridade": 1.0}
+
+        if not assinatura["minhash"]:
+            return None
+        candidatos = set()
+        for faixa, valor in enumerate(_faixas(assinatura["minhash"])):
+            candidatos.update(id_documento for (id_documento,) in conn.execute(
+                "SELECT documento FROM faixas WHERE faixa = ? AND valor = ?", (faixa, valor)
+            ))
+        melhor = None
+        for id_documento in sorted(candidatos):
+            arquivo_candidato, minhash = conn.execute(
+                "SELECT arquivo, minhash FROM documentos WHERE id = ?", (id_documento,)
+            ).fetchone()
+            if arquivo_candidato == arquivo or minhash is None:
+                continue
+            valor = similaridade(assinatura["minhash"], struct.unpack(f"<{NUM_PERMUTACOES}Q", minhash))
+            if valor >= self.limiar and (melhor is None or valor > melhor["similaridade"]):
+                melhor = {"arquivo": arquivo_candidato, "tipo": "similar", "similaridade": valor}
+        return melhor
+
+    def _registrar(self, conn: sqlite3.Connection, arquivo: str, assinatura: Dict[str, Any]) -> None:
+        self._remover_documento(conn, arquivo)
+        conn.execute("DELETE FROM vinculos WHERE duplicado = ?", (arquivo,))
+        minhash = assinatura["minhash"]
+        id_documento = conn.execute(
+            "INSERT INTO documentos (arquivo, sha256, hash_texto, minhash, criado_em) VALUES (?, ?, ?, ?, ?)",
+            (arquivo, assinatura["sha256"], assinatura["hash_texto"],
+             struct.pack(f"<{NUM_PERMUTACOES}Q", *minhash) if minhash else None, time.time())
+        ).lastrowid
+        if minhash:
+            conn.executemany(
+                "INSERT INTO faixas (faixa, valor, documento) VALUES (?, ?, ?)",
+                [(faixa, valor, id_documento) for faixa, valor in enumerate(_faixas(minhash))]
+            )
+
+    def _remover_documento(self, conn: sqlite3.Connection, arquivo: str) -> None:
+        linha = conn.execute("SELECT id FROM documentos WHERE arquivo = ?", (arquivo,)).fetchone()
+        if linha:
+            conn.execute("DELETE FROM faixas WHERE documento = ?", linha)
+            conn.execute("DELETE FROM documentos WHERE id = ?", linha)
+
+    def _remover(self, conn: sqlite3.Connection, arquivo: str) -> List[str]:
+        self._remover_documento(conn, arquivo)
+        duplicados = [duplicado for (duplicado,) in conn.execute(
+            "SELECT duplicado FROM vinculos WHERE original = ? ORDER BY duplicado", (arquivo,)
+        )]
+        conn.execute("DELETE FROM vinculos WHERE original = ? OR duplicado = ?", (arquivo, arquivo))
+        return duplicados
+
+    def procurar(self, arquivo: str, assinatura: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Procura um documento já registrado (outro arquivo) igual ou similar.
+
+        Returns:
+            Dicionário com arquivo (o original), tipo ("exato", "texto" ou
+            "similar") e similaridade; None se não houver
+        """
+        try:
+            with self._conectar() as conn:
+                return self._procurar(conn, os.path.abspath(arquivo), assinatura)
+        except sqlite3.Error as e:
+            print(f"Aviso: Falha ao consultar o índice de duplicados: {e}")
+            return None
+
+    def registrar(self, arquivo: str, assinatura: Dict[str, Any]) -> None:
+        """Registra (ou atualiza) a assinatura do arquivo no índice."""
+        try:
+            with self._conectar() as conn:
+                self._registrar(conn, os.path.abspath(arquivo), assinatura)
+        except sqlite3.Error as e:
+            print(f"Aviso: Falha ao gravar no índice de duplicados: {e}")
+
+    def verificar_ou_registrar(self, arquivo: str, assinatura: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Procura um duplicado e, se não houver, registra o arquivo, na mesma
+        transação (dois processos não registram cópias do mesmo documento como
+        originais).
+
+        Returns:
+            O original (ver `procurar`) ou None se o arquivo foi registrado como novo
+        """
+        arquivo = os.path.abspath(arquivo)
+        try:
+            with self._conectar() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                original = self._procurar(conn, arquivo, assinatura)
+                if original is None:
+                    self._registrar(conn, arquivo, assinatura)
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO vinculos (duplicado, original) VALUES (?, ?)",
+                        (arquivo, original["arquivo"])
+                    )
+                return original
+        except sqlite3.Error as e:
+            print(f"Aviso: Falha ao consultar o índice de duplicados: {e}")
+            return None
+
+    def remover(self, arquivo: str) -> List[str]:
+        """
+        Remove o arquivo do índice (ex.: a extração do original falhou).
+
+        Returns:
+            Os duplicados que estavam vinculados a ele (caminhos absolutos),
+            agora sem original
+        """
+        try:
+            with self._conectar() as conn:
+                return self._remover(conn, os.path.abspath(arquivo))
+        except sqlite3.Error as e:
+            print(f"Aviso: Falha ao remover do índice de duplicados: {e}")
+            return []
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Retorna o número de documentos registrados e quantos têm assinatura MinHash."""
+        try:
+            with self._conectar() as conn:
+                documentos, com_minhash = conn.execute(
+                    "SELECT COUNT(*), COUNT(minhash) FROM documentos"
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Aviso: Falha ao ler estatísticas do índice de duplicados: {e}")
+            documentos, com_minhash = 0, 0
+        return {"documentos": documentos, "com_minhash": com_minhash}
+
+    def limpar(self) -> None:
+        """Remove todas as assinaturas."""
+        with self._conectar() as conn:
+            conn.execute("DELETE FROM faixas")
+            conn.execute("DELETE FROM documentos")
+            conn.execute("DELETE FROM vinculos")
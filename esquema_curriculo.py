@@ -0,0 +1,422 @@
+"""
+Esquema único dos campos do currículo.
+
+Fonte comum para o prompt, o JSON Schema de `response_format` (structured
+outputs), as perguntas por campo dos scripts de texto e o layout das tabelas
+de exibição. Tudo é montado uma vez e reaproveitado entre chamadas.
+"""
+import json
+import hashlib
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
+
+from extracao_local import VALOR_AUSENTE
+
+# Campos extraídos: rótulo de exibição, pergunta (scripts de texto), descrição e instruções (prompt de visão)
+CAMPOS_JSON = {
+    "nome": {
+        "rotulo": "Nome",
+        "pergunta": "Qual é o nome completo do candidato?",
+        "descricao": "Nome completo da pessoa",
+        "instrucoes": "Extraia o nome completo. Se houver apenas nome ou sobrenome, use o que estiver disponível. Mantenha acentos e formatação original."
+    },
+    "email": {
+        "rotulo": "Email",
+        "pergunta": "Qual é o email válido do candidato? (Exemplo: exemplo@dominio.com)",
+        "descricao": "Email válido",
+        "instrucoes": "Procure por endereços de e-mail no formato usuario@dominio.com. Se houver múltiplos e-mails, use o principal ou primeiro encontrado."
+    },
+    "cpf": {
+        "rotulo": "CPF",
+        "pergunta": "Qual é o CPF válido do candidato? Formato esperado: 123.456.789-00.",
+        "descricao": "CPF no formato 123.456.789-00",
+        "instrucoes": "Localize números de CPF. Formate com pontos e hífen (123.456.789-00). Se estiver sem formatação, aplique a formatação correta."
+    },
+    "celular": {
+        "rotulo": "Celular",
+        "pergunta": "Qual é o número de celular válido do candidato? Formato esperado: (XX)XXXXX-XXXX.",
+        "descricao": "Celular no formato (XX)XXXXX-XXXX",
+        "instrucoes": "Identifique números de celular (9 dígitos). Formate como (XX)XXXXX-XXXX. Se não tiver DDD, use apenas o número disponível."
+    },
+    "telefone": {
+        "rotulo": "Telefone",
+        "pergunta": "Qual é o número de telefone fixo válido do candidato? Formato esperado: (XX)XXXX-XXXX.",
+        "descricao": "Telefone fixo no formato (XX)XXXX-XXXX",
+        "instrucoes": "Procure telefones fixos (8 dígitos). Formate como (XX)XXXX-XXXX. Diferente de celular por não ter o 9 na frente."
+    },
+    "idade": {
+        "rotulo": "Idade",
+        "pergunta": "Qual é a idade do candidato? Se houver apenas a data de nascimento, faça a diferença com a data: {hoje}. Formato esperado: XX Anos",
+        "descricao": "Idade em anos",
+        "instrucoes": "Procure pela idade em anos. Se encontrar data de nascimento, calcule a idade aproximada. Use apenas números."
+    },
+    "pis": {
+        "rotulo": "PIS",
+        "pergunta": "Qual é o número do PIS do candidato? Deve ser um número válido com 11 dígitos.",
+        "descricao": "Número do PIS/PASEP",
+        "instrucoes": "Localize o número PIS ou PASEP. Mantenha apenas os números, sem formatação especial."
+    },
+    "rg": {
+        "rotulo": "RG",
+        "pergunta": "Qual é o número do RG do candidato?",
+        "descricao": "Número do RG",
+        "instrucoes": "Encontre o número do RG/Identidade. Mantenha o formato original encontrado no documento."
+    },
+    "ctps": {
+        "rotulo": "CTPS",
+        "pergunta": "Qual é o número da Carteira de Trabalho do candidato?",
+        "descricao": "Número da Carteira de Trabalho",
+        "instrucoes": "Procure pelo número da CTPS (Carteira de Trabalho). Pode aparecer como 'Carteira de Trabalho' ou 'CTPS'."
+    },
+    "habilitacao": {
+        "rotulo": "Habilitação",
+        "pergunta": "Qual é a categoria da habilitação do candidato? (Exemplo: A, B, AB, C, etc.)",
+        "descricao": "Categoria da habilitação (CNH)",
+        "instrucoes": "Identifique a categoria da CNH (A, B, C, D, E, AB, AC, etc.). Se só mencionar 'habilitado', use essa informação."
+    },
+    "estado_civil": {
+        "rotulo": "Estado Civil",
+        "pergunta": "Qual é o estado civil do candidato? (Exemplo: solteiro(a), casado(a), etc.)",
+        "descricao": "Estado civil",
+        "instrucoes": "Procure por estado civil: solteiro(a), casado(a), divorciado(a), viúvo(a), união estável, etc."
+    },
+    "sexo": {
+        "rotulo": "Sexo",
+        "pergunta": "Qual é o sexo do candidato? (Masculino ou Feminino)",
+        "descricao": "Sexo/Gênero",
+        "instrucoes": "Identifique o sexo: Masculino, Feminino, ou como estiver descrito no documento."
+    },
+    "objetivos_profissionais": {
+        "rotulo": "Objetivos Profissionais",
+        "pergunta": "Quais são os objetivos profissionais do candidato? Forneça um resumo objetivo.",
+        "descricao": "Objetivos profissionais",
+        "instrucoes": "Extraia o texto completo da seção de objetivos profissionais, metas de carreira, ou objetivos. Mantenha o texto original."
+    },
+    "resumo_profissional": {
+        "rotulo": "Resumo Profissional",
+        "pergunta": "Qual é o resumo profissional do candidato? Inclua habilidades e experiências relevantes.",
+        "descricao": "Resumo profissional ou perfil",
+        "instrucoes": "Copie o texto do resumo profissional, perfil profissional, ou descrição das competências. Preserve o conteúdo completo."
+    },
+    "pretensao_salarial": {
+        "rotulo": "Pretensão Salarial",
+        "pergunta": "Qual é a pretensão salarial do candidato? Informe o valor em moeda.",
+        "descricao": "Pretensão salarial",
+        "instrucoes": "Procure por valores de pretensão salarial. Mantenha o formato original (R$ 1.000,00, por exemplo)."
+    },
+    "uf": {
+        "rotulo": "UF",
+        "pergunta": "Qual é o estado de residência do candidato? (Exemplo: SP, RJ, MG, etc.)",
+        "descricao": "Estado (sigla)",
+        "instrucoes": "Identifique a sigla do estado (SP, RJ, MG, etc.). Use sempre a sigla de 2 letras em maiúsculo."
+    },
+    "cidade": {
+        "rotulo": "Cidade",
+        "pergunta": "Qual é a cidade de residência do candidato?",
+        "descricao": "Cidade",
+        "instrucoes": "Extraia o nome da cidade onde a pessoa reside. Mantenha a grafia original."
+    },
+    "cep": {
+        "rotulo": "CEP",
+        "pergunta": "Qual é o CEP do endereço do candidato? Formato esperado: XXXXX-XXX.",
+        "descricao": "CEP no formato XXXXX-XXX",
+        "instrucoes": "Localize o CEP. Formate como XXXXX-XXX (5 dígitos, hífen, 3 dígitos). Se estiver sem hífen, adicione a formatação."
+    },
+    "logradouro": {
+        "rotulo": "Logradouro",
+        "pergunta": "Qual é o logradouro do endereço do candidato? (Exemplo: Rua, Avenida, etc.)",
+        "descricao": "Logradouro (rua, avenida, etc.)",
+        "instrucoes": "Extraia o nome da rua, avenida, travessa, etc. Inclua o tipo (Rua, Av., etc.) se estiver presente."
+    },
+    "numero": {
+        "rotulo": "Número",
+        "pergunta": "Qual é o número do imóvel do candidato? Apenas números.",
+        "descricao": "Número do endereço",
+        "instrucoes": "Identifique o número da residência/endereço. Use apenas números ou 's/n' se for sem número."
+    },
+    "complemento": {
+        "rotulo": "Complemento",
+        "pergunta": "Qual é o complemento do endereço do candidato? (Exemplo: apartamento, bloco, etc.)",
+        "descricao": "Complemento do endereço",
+        "instrucoes": "Procure por complementos como apartamento, bloco, casa, andar, etc. Mantenha abreviações originais."
+    },
+    "nivel_ensino": {
+        "rotulo": "Nível de Ensino",
+        "pergunta": "Qual é o nível de ensino do candidato? (Exemplo: médio completo, superior completo, etc.)",
+        "descricao": "Nível de ensino",
+        "instrucoes": "Identifique o maior nível: Fundamental, Médio, Superior, Pós-graduação, Mestrado, Doutorado, etc."
+    },
+    "situacao": {
+        "rotulo": "Situação",
+        "pergunta": "Qual é a situação atual do nível de ensino do candidato? (Exemplo: cursando, concluído, etc.)",
+        "descricao": "Situação do ensino",
+        "instrucoes": "Determine se está: Completo, Incompleto, Cursando, Em andamento, etc."
+    },
+    "curso": {
+        "rotulo": "Curso",
+        "pergunta": "Qual é o nome do curso realizado pelo candidato?",
+        "descricao": "Nome do curso",
+        "instrucoes": "Extraia o nome completo do curso de graduação, técnico, ou principal formação mencionada."
+    },
+    "serie": {
+        "rotulo": "Série",
+        "pergunta": "Qual é a série ou etapa de ensino do candidato? (Exemplo: 1º ano, 2º semestre, etc.)",
+        "descricao": "Série ou etapa",
+        "instrucoes": "Se for ensino fundamental/médio, identifique a série. Para superior, pode ser o período/semestre."
+    },
+    "inicio_mes": {
+        "rotulo": "Início (Mês)",
+        "pergunta": "Qual é o mês de início do curso do candidato? (Exemplo: janeiro, fevereiro, etc.)",
+        "descricao": "Mês de início dos estudos",
+        "instrucoes": "Extraia o mês de início do curso principal. Use nome do mês ou número (01-12)."
+    },
+    "inicio_ano": {
+        "rotulo": "Início (Ano)",
+        "pergunta": "Qual é o ano de início do curso do candidato?",
+        "descricao": "Ano de início dos estudos",
+        "instrucoes": "Identifique o ano de início do curso. Use formato de 4 dígitos (ex: 2020)."
+    },
+    "fim_mes": {
+        "rotulo": "Fim (Mês)",
+        "pergunta": "Qual é o mês de término do curso do candidato? (Exemplo: dezembro, junho, etc.)",
+        "descricao": "Mês de término dos estudos",
+        "instrucoes": "Extraia o mês de conclusão ou previsão de conclusão. Use nome do mês ou número (01-12)."
+    },
+    "fim_ano": {
+        "rotulo": "Fim (Ano)",
+        "pergunta": "Qual é o ano de término do curso do candidato?",
+        "descricao": "Ano de término dos estudos",
+        "instrucoes": "Identifique o ano de conclusão ou previsão. Use formato de 4 dígitos (ex: 2024)."
+    },
+    "instituicao": {
+        "rotulo": "Instituição",
+        "pergunta": "Qual é o nome da instituição de ensino frequentada pelo candidato?",
+        "descricao": "Nome da instituição de ensino",
+        "instrucoes": "Extraia o nome completo da escola, universidade, ou instituição de ensino principal."
+    },
+    "carga_horaria": {
+        "rotulo": "Carga Horária",
+        "pergunta": "Qual é a carga horária total do curso do candidato? Informe em horas.",
+        "descricao": "Carga horária do curso",
+        "instrucoes": "Procure pela carga horária total do curso em horas. Mantenha apenas números seguidos de 'h' ou 'horas'."
+    }
+}
+
+# Agrupamento dos campos para exibição e para a extração por grupos
+GRUPOS_CAMPOS = {
+    "pessoais": ["nome", "email", "cpf", "celular", "telefone", "idade", "pis", "rg", "ctps", "habilitacao", "estado_civil", "sexo"],
+    "perfil": ["objetivos_profissionais", "resumo_profissional", "pretensao_salarial"],
+    "endereco": ["uf", "cidade", "cep", "logradouro", "numero", "complemento"],
+    "formacao": ["nivel_ensino", "situacao", "curso", "serie", "inicio_mes", "inicio_ano", "fim_mes", "fim_ano", "instituicao", "carga_horaria"],
+}
+
+# Campos que encerram a análise incremental quando todos estão preenchidos
+# (páginas seguintes não são enviadas ao modelo)
+CAMPOS_OBRIGATORIOS = ("nome", "email", "celular", "uf", "cidade", "nivel_ensino", "curso", "instituicao")
+
+# Layout das tabelas de exibição: {grupo: (chaves, rótulos)}
+LAYOUTS_TABELAS = {
+    grupo: (tuple(campos), tuple(CAMPOS_JSON[campo]["rotulo"] for campo in campos))
+    for grupo, campos in GRUPOS_CAMPOS.items()
+}
+
+def montar_perguntas(hoje: date = None) -> Dict[str, str]:
+    """Pergunta de cada campo (a da idade usa a data de hoje para calcular a partir do nascimento)."""
+    hoje = hoje or date.today()
+    return {campo: info["pergunta"].format(hoje=hoje) for campo, info in CAMPOS_JSON.items()}
+
+@lru_cache(maxsize=None)
+def _montar_prompt(num_paginas: int, tipo_conteudo: str, campos: Tuple[str, ...]) -> str:
+    campos = list(campos)
+    
+    campos_formatados = []
+    for campo in campos:
+        info = CAMPOS_JSON[campo]
+        campos_formatados.append(f"""
+    "{campo}": 
+        - Descrição: {info['descricao']}
+        - Instruções: {info['instrucoes']}""")
+    
+    if tipo_conteudo == "texto":
+        descricao_paginas = f"estes {num_paginas} textos extraídos, que são as páginas (em ordem)" if num_paginas > 1 else "este texto extraído de um currículo"
+        origem, leitura = "no texto", "do texto"
+    elif tipo_conteudo == "misto":
+        descricao_paginas = f"estas {num_paginas} páginas (em ordem, enviadas como imagem ou como texto extraído)"
+        origem, leitura = "no conteúdo", "das páginas"
+    elif num_paginas > 1:
+        descricao_paginas = f"estas {num_paginas} imagens, que são as páginas (em ordem)"
+        origem, leitura = "nas imagens", "das imagens"
+    else:
+        descricao_paginas = "esta imagem de currículo"
+        origem, leitura = "na imagem", "da imagem"
+    
+    if campos[:3] == ["nome", "email", "cpf"]:
+        exemplo = """{
+            "nome": "João Silva Santos",
+            "email": "joao.silva@email.com",
+            "cpf": "123.456.789-00",
+            ...
+        }"""
+    else:
+        exemplo = "{\n" + "".join(f'            "{campo}": "...",\n' for campo in campos[:3]) + "            ...\n        }"
+    
+    if num_paginas > 1:
+        introducao = f"Analise cuidadosamente {descricao_paginas} de um mesmo currículo, e extraia TODAS as informações visíveis seguindo as instruções específicas para cada campo. Consolide as informações de todas as páginas em um único resultado."
+    else:
+        introducao = f"Analise cuidadosamente {descricao_paginas} e extraia TODAS as informações visíveis seguindo as instruções específicas para cada campo."
+    
+    return f"""
+        {introducao}
+        
+        REGRAS GERAIS:
+        1. Leia todo o texto {leitura} com máxima atenção
+        2. Siga exatamente as instruções específicas de cada campo
+        3. Retorne APENAS um JSON válido, sem texto adicional
+        4. Use "Não informado" apenas se a informação realmente não estiver {origem}
+        5. Mantenha formatos e acentuação original quando solicitado
+        6. Se houver múltiplas informações do mesmo tipo, priorize a mais completa
+        
+        CAMPOS A EXTRAIR E SUAS INSTRUÇÕES ESPECÍFICAS:
+        {''.join(campos_formatados)}
+        
+        FORMATO DE RESPOSTA:
+        Retorne apenas um JSON com as chaves: {campos}
+        
+        Exemplo de estrutura esperada:
+        {exemplo}
+        """
+
+def montar_prompt(num_paginas: int = 1, tipo_conteudo: str = "imagem", campos: List[str] = None) -> str:
+    """
+    Cria o prompt estruturado com as instruções de cada campo.
+    
+    Com `num_paginas` > 1 o prompt pede a consolidação de todas as páginas
+    de um mesmo currículo em um único JSON. `tipo_conteudo` indica como as
+    páginas são enviadas: "imagem", "texto" (camada de texto do PDF) ou "misto".
+    `campos` restringe o prompt a um subconjunto de CAMPOS_JSON (padrão: todos).
+    
+    O texto é montado uma vez por combinação de argumentos e reaproveitado.
+    """
+    return _montar_prompt(num_paginas, tipo_conteudo, tuple(CAMPOS_JSON) if campos is None else tuple(campos))
+
+@lru_cache(maxsize=None)
+def _esquema_resposta(campos: Tuple[str, ...], permitir_nulo: bool) -> Dict[str, Any]:
+    tipo = ["string", "null"] if permitir_nulo else "string"
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "dados_curriculo",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    campo: {"type": tipo, "description": CAMPOS_JSON[campo]["descricao"]}
+                    for campo in campos
+                },
+                "required": list(campos),
+                "additionalProperties": False
+            }
+        }
+    }
+
+def esquema_resposta(campos: List[str] = None, permitir_nulo: bool = False) -> Dict[str, Any]:
+    """
+    `response_format` de structured outputs para os campos pedidos (padrão: todos).
+    
+    Com o esquema estrito o modelo sempre devolve um objeto JSON com exatamente
+    essas chaves, todas string (ou null, com `permitir_nulo`).
+    """
+    return _esquema_resposta(tuple(CAMPOS_JSON) if campos is None else tuple(campos), permitir_nulo)
+
+def decodificar_resposta(conteudo: str, campos: List[str] = None, valor_ausente: Any = VALOR_AUSENTE) -> Dict[str, Any]:
+    """
+    Converte a resposta do modelo em dicionário, completando as chaves ausentes
+    com `valor_ausente`.
+    
+    Respostas de structured outputs já são JSON puro; blocos ```json (modelos
+    sem `response_format`) são aceitos. Levanta ValueError se não houver um
+    objeto JSON válido.
+    """
+    texto = (conteudo or "").strip()
+    if texto.startswith("```"):
+        texto = texto.strip("`").strip()
+        if texto.startswith("json"):
+            texto = texto[4:]
+    try:
+        dados = json.loads(texto)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Resposta não é um JSON válido: {e}")
+    if not isinstance(dados, dict):
+        raise ValueError("Resposta não é um objeto JSON")
+    
+    for campo in (CAMPOS_JSON if campos is None else campos):
+        dados.setdefault(campo, valor_ausente)
+    return dados
+
+class LeitorJsonIncremental:
+    """
+    Lê um objeto JSON plano (a resposta de structured outputs) em pedaços,
+    como chegam no streaming, e devolve cada campo assim que o valor termina.
+    
+        leitor = LeitorJsonIncremental()
+        for trecho in trechos:
+            for campo, valor in leitor.alimentar(trecho):
+                ...
+    
+    Só os campos do primeiro nível são emitidos; valores aninhados (listas,
+    objetos) saem inteiros quando fecham. O texto completo fica em `texto`
+    para a decodificação final com `decodificar_resposta`.
+    """
+    
+    def __init__(self):
+        self.texto = ""
+        self._posicao = 0  # Próximo caractere a ler
+        self._inicio_membro = None  # Início do par "chave": valor atual
+        self._profundidade = 0
+        self._em_string = False
+        self._escape = False
+    
+    def alimentar(self, trecho: str) -> List[Tuple[str, Any]]:
+        """Acrescenta um pedaço da resposta; retorna os pares (campo, valor) concluídos nele."""
+        self.texto += trecho
+        concluidos = []
+        for posicao in range(self._posicao, len(self.texto)):
+            caractere = self.texto[posicao]
+            if self._em_string:
+                if self._escape:
+                    self._escape = False
+                elif caractere == "\\":
+                    self._escape = True
+                elif caractere == '"':
+                    self._em_string = False
+            elif caractere == '"':
+                self._em_string = True
+            elif caractere in "{[":
+                self._profundidade += 1
+                if self._profundidade == 1:
+                    self._inicio_membro = posicao + 1
+            elif caractere in "}]":
+                if self._profundidade == 1:
+                    concluidos.extend(self._fechar_membro(posicao))
+                self._profundidade -= 1
+            elif caractere == "," and self._profundidade == 1:
+                concluidos.extend(self._fechar_membro(posicao))
+                self._inicio_membro = posicao + 1
+        self._posicao = len(self.texto)
+        return concluidos
+    
+    def _fechar_membro(self, fim: int) -> List[Tuple[str, Any]]:
+        membro = self.texto[self._inicio_membro:fim].strip()
+        if not membro:
+            return []
+        try:
+            return list(json.loads("{" + membro + "}").items())
+        except json.JSONDecodeError:
+            # Texto fora do formato esperado: fica para a decodificação final
+            return []
+
+# Versão do prompt e do esquema de resposta (hash): invalida o cache quando as instruções mudam
+VERSAO_PROMPT = hashlib.sha256(
+    (montar_prompt() + json.dumps(esquema_resposta(), sort_keys=True)).encode("utf-8")
+).hexdigest()[:12]
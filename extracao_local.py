@@ -0,0 +1,185 @@
+import re
+from typing import Dict, Any, Optional
+
+# Campos com formato rígido que podem ser extraídos localmente, sem o modelo
+CAMPOS_LOCAIS = ("cpf", "pis", "email", "celular", "telefone", "cep")
+
+# DDDs válidos no Brasil (Anatel)
+DDDS_VALIDOS = {
+    11, 12, 13, 14, 15, 16, 17, 18, 19, 21, 22, 24, 27, 28,
+    31, 32, 33, 34, 35, 37, 38, 41, 42, 43, 44, 45, 46, 47, 48, 49,
+    51, 53, 54, 55, 61, 62, 63, 64, 65, 66, 67, 68, 69, 71, 73, 74, 75, 77, 79,
+    81, 82, 83, 84, 85, 86, 87, 88, 89, 91, 92, 93, 94, 95, 96, 97, 98, 99
+}
+
+VALOR_AUSENTE = "Não informado"
+
+# Padrões compilados uma única vez
+_ONZE_DIGITOS = r"(?<!\d)(\d{3}\.?\d{3}\.?\d{3}-?\d{2}|\d{3}\.?\d{5}\.?\d{2}-?\d)(?!\d)"
+RE_CPF_ROTULADO = re.compile(r"\bCPF\b\D{0,15}?" + _ONZE_DIGITOS, re.IGNORECASE)
+RE_CPF_FORMATADO = re.compile(r"(?<!\d)\d{3}\.\d{3}\.\d{3}-\d{2}(?!\d)")
+RE_PIS_ROTULADO = re.compile(r"\b(?:PIS|PASEP|NIT)\b\D{0,20}?" + _ONZE_DIGITOS, re.IGNORECASE)
+RE_EMAIL = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+RE_CEP_ROTULADO = re.compile(r"\bCEP\b\D{0,5}?(?<!\d)(\d{2}\.?\d{3}-?\d{3})(?!\d)", re.IGNORECASE)
+RE_CEP_FORMATADO = re.compile(r"(?<!\d)\d{2}\.?\d{3}-\d{3}(?!\d)")
+RE_TELEFONE = re.compile(r"(?<!\d)(?:\+?55[\s.-]*)?\(?(\d{2})\)?[\s.-]*(9[\s.]?\d{4}|[2-5]\d{3})[\s.-]?(\d{4})(?!\d)")
+
+def somente_digitos(valor: str) -> str:
+    return re.sub(r"\D", "", valor or "")
+
+def cpf_valido(digitos: str) -> bool:
+    """Valida os dígitos verificadores do CPF (11 dígitos, sem formatação)."""
+    if len(digitos) != 11 or digitos == digitos[0] * 11:
+        return False
+    for tamanho in (9, 10):
+        soma = sum(int(digitos[i]) * (tamanho + 1 - i) for i in range(tamanho))
+        resto = soma % 11
+        if int(digitos[tamanho]) != (0 if resto < 2 else 11 - resto):
+            return False
+    return True
+
+def pis_valido(digitos: str) -> bool:
+    """Valida o dígito verificador do PIS/PASEP/NIT (11 dígitos, sem formatação)."""
+    if len(digitos) != 11 or digitos == digitos[0] * 11:
+        return False
+    soma = sum(int(d) * p for d, p in zip(digitos[:10], (3, 2, 9, 8, 7, 6, 5, 4, 3, 2)))
+    dv = 11 - soma % 11
+    return int(digitos[10]) == (0 if dv >= 10 else dv)
+
+def formatar_cpf(digitos: str) -> str:
+    return f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"
+
+def formatar_cep(digitos: str) -> str:
+    return f"{digitos[:5]}-{digitos[5:]}"
+
+def formatar_telefone(ddd: str, numero: str) -> str:
+    return f"({ddd}){numero[:-4]}-{numero[-4:]}"
+
+def classificar_telefone(digitos: str) -> Optional[str]:
+    """Retorna "celular", "telefone" ou None para um número com DDD (10 ou 11 dígitos)."""
+    if digitos.startswith("55") and len(digitos) in (12, 13):
+        digitos = digitos[2:]
+    if len(digitos) not in (10, 11) or int(digitos[:2]) not in DDDS_VALIDOS:
+        return None
+    numero = digitos[2:]
+    if len(numero) == 9 and numero[0] == "9":
+        return "celular"
+    if len(numero) == 8 and numero[0] in "2345":
+        return "telefone"
+    return None
+
+def pre_extrair_campos(texto: str) -> Dict[str, str]:
+    """
+    Extrai CPF, PIS, e-mail, celular, telefone e CEP de um texto usando apenas
+    expressões regulares e dígitos verificadores.
+
+    Retorna somente os campos encontrados e validados, já no formato pedido ao
+    modelo (CPF 123.456.789-00, PIS só números, (XX)XXXXX-XXXX, XXXXX-XXX).
+    """
+    if not texto:
+        return {}
+
+    encontrados = {}
+    # Trechos já atribuídos a CPF/PIS/CEP são mascarados antes da busca por telefones
+    mascarado = texto
+
+    def mascarar(inicio, fim):
+        nonlocal mascarado
+        mascarado = mascarado[:inicio] + " " * (fim - inicio) + mascarado[fim:]
+
+    for match in RE_PIS_ROTULADO.finditer(texto):
+        digitos = somente_digitos(match.group(1))
+        if pis_valido(digitos):
+            encontrados.setdefault("pis", digitos)
+            mascarar(*match.span(1))
+
+    for match in list(RE_CPF_ROTULADO.finditer(texto)) + list(RE_CPF_FORMATADO.finditer(texto)):
+        grupo = 1 if match.re is RE_CPF_ROTULADO else 0
+        digitos = somente_digitos(match.group(grupo))
+        if digitos != encontrados.get("pis") and cpf_valido(digitos):
+            encontrados.setdefault("cpf", formatar_cpf(digitos))
+            mascarar(*match.span(grupo))
+
+    match = RE_EMAIL.search(texto)
+    if match:
+        encontrados["email"] = match.group(0)
+
+    for match in list(RE_CEP_ROTULADO.finditer(mascarado)) + list(RE_CEP_FORMATADO.finditer(mascarado)):
+        grupo = 1 if match.re is RE_CEP_ROTULADO else 0
+        digitos = somente_digitos(match.group(grupo))
+        if len(digitos) == 8 and digitos[:2] != "00":
+            encontrados.setdefault("cep", formatar_cep(digitos))
+            mascarar(*match.span(grupo))
+
+    for match in RE_TELEFONE.finditer(mascarado):
+        ddd, prefixo, sufixo = match.groups()
+        prefixo = somente_digitos(prefixo)
+        tipo = classificar_telefone(ddd + prefixo + sufixo)
+        if tipo and tipo not in encontrados:
+            encontrados[tipo] = formatar_telefone(ddd, prefixo + sufixo)
+
+    return encontrados
+
+def normalizar_campo(campo: str, valor: Any) -> Optional[str]:
+    """
+    Valida e normaliza o valor de um campo local vindo do modelo.
+
+    Retorna o valor no formato padrão, ou None se for inválido (dígito
+    verificador errado, DDD inexistente, formato impossível).
+    """
+    if not isinstance(valor, str):
+        return None
+    digitos = somente_digitos(valor)
+
+    if campo == "cpf":
+        return formatar_cpf(digitos) if cpf_valido(digitos) else None
+    if campo == "pis":
+        return digitos if pis_valido(digitos) else None
+    if campo == "email":
+        match = RE_EMAIL.fullmatch(valor.strip())
+        return match.group(0) if match else None
+    if campo == "cep":
+        return formatar_cep(digitos) if len(digitos) == 8 else None
+    if campo in ("celular", "telefone"):
+        if digitos.startswith("55") and len(digitos) in (12, 13):
+            digitos = digitos[2:]
+        if len(digitos) in (10, 11) and int(digitos[:2]) in DDDS_VALIDOS:
+            numero = digitos[2:]
+            ddd = digitos[:2]
+        elif len(digitos) in (8, 9):
+            numero, ddd = digitos, None
+        else:
+            return None
+        # Celular tem 9 dígitos começando por 9; um fixo de 8 dígitos não é celular
+        if campo == "celular" and not (len(numero) == 9 and numero[0] == "9"):
+            return None
+        if ddd is None:
+            # Número sem DDD: mantém como veio, não há como validar
+            return valor.strip()
+        return formatar_telefone(ddd, numero)
+    return valor
+
+def validar_dados_extraidos(dados: Dict[str, Any], valor_ausente: Any = VALOR_AUSENTE) -> Dict[str, Any]:
+    """
+    Confere os campos locais da resposta do modelo, normalizando o formato e
+    substituindo valores inválidos por `valor_ausente`.
+    """
+    for campo in CAMPOS_LOCAIS:
+        valor = dados.get(campo)
+        if valor is None or valor == valor_ausente or valor == VALOR_AUSENTE:
+            continue
+        normalizado = normalizar_campo(campo, valor)
+        if normalizado is None and campo == "celular":
+            # Fixo informado como celular: vai para o telefone (se ainda vazio)
+            telefone = normalizar_campo("telefone", valor)
+            if telefone is not None and dados.get("telefone") in (None, valor_ausente, VALOR_AUSENTE):
+                print(f"Aviso: número fixo informado como celular movido para 'telefone': {valor}")
+                dados["telefone"] = telefone
+                dados[campo] = valor_ausente
+                continue
+        if normalizado is None:
+            print(f"Aviso: valor inválido descartado para '{campo}': {valor}")
+            dados[campo] = valor_ausente
+        else:
+            dados[campo] = normalizado
+    return dados
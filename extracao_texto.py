@@ -0,0 +1,188 @@
+"""
+Motor de extração de texto de currículos (.pdf, .doc, .docx) em vários núcleos.
+
+Os arquivos são distribuídos em blocos por um pool de processos (o parsing de
+PDF é CPU-bound; threads só disputariam o GIL) e os resultados saem por um
+gerador à medida que ficam prontos, com um número limitado de blocos em voo,
+de modo que a memória não cresce com o tamanho da pasta. Falhas são
+reportadas por arquivo, sem interromper os demais.
+
+PDFs são lidos com o PyMuPDF; o pdfplumber (mais lento) só é usado nas
+páginas sensíveis ao layout: texto em colunas lado a lado, que o PyMuPDF
+intercala, ou texto com pouca proporção de caracteres legíveis.
+
+    for resultado in extrair_textos(caminhos):
+        print(resultado["arquivo"], resultado.get("erro") or len(resultado["texto"]))
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Iterable, Iterator
+
+import fitz  # PyMuPDF
+
+from camada_texto import proporcao_legivel, MIN_PROPORCAO_LEGIVEL
+from documentos_word import EXTENSOES_WORD, extrair_texto_arquivo_word
+
+EXTENSOES_TEXTO = (".pdf",) + EXTENSOES_WORD
+
+# Arquivos por tarefa enviada a um processo
+TAMANHO_BLOCO = 4
+
+# Blocos em voo por processo (limita a memória dos resultados ainda não consumidos)
+BLOCOS_POR_PROCESSO = 2
+
+# Sobreposição vertical mínima (fração da menor altura) para dois blocos de
+# texto serem considerados lado a lado, em colunas
+SOBREPOSICAO_COLUNAS = 0.5
+MIN_LARGURA_COLUNA = 72  # pontos (1 polegada): ignora números e marcadores soltos
+
+def pagina_em_colunas(blocos: List[tuple]) -> bool:
+    """Indica se há blocos de texto lado a lado (colunas) na página."""
+    blocos = [b for b in blocos if b[6] == 0 and b[4].strip() and b[2] - b[0] >= MIN_LARGURA_COLUNA]
+    for i, (x0, y0, x1, y1, *_) in enumerate(blocos):
+        for (a0, b0, a1, b1, *_) in blocos[i + 1:]:
+            sobreposicao_vertical = min(y1, b1) - max(y0, b0)
+            menor_altura = min(y1 - y0, b1 - b0) or 1
+            if sobreposicao_vertical / menor_altura >= SOBREPOSICAO_COLUNAS and (x1 <= a0 or a1 <= x0):
+                return True
+    return False
+
+def texto_blocos(blocos: List[tuple]) -> str:
+    """Texto dos blocos de texto na ordem de leitura: de cima para baixo e, na mesma altura, da esquerda para a direita."""
+    blocos = sorted((b for b in blocos if b[6] == 0), key=lambda b: (round(b[3]), b[0]))
+    return "\n".join(b[4].rstrip() for b in blocos if b[4].strip())
+
+def pagina_sensivel_layout(blocos: List[tuple], texto: str) -> bool:
+    if texto.strip() and proporcao_legivel(texto) < MIN_PROPORCAO_LEGIVEL:
+        return True
+    return pagina_em_colunas(blocos)
+
+def extrair_texto_pdf(caminho: str) -> Dict[str, Any]:
+    """
+    Texto de um PDF, página a página: PyMuPDF por padrão e pdfplumber (com
+    layout) nas páginas sensíveis ao layout. Cada página passa uma única vez
+    pela extração do PyMuPDF (em blocos): a verificação de layout e o texto
+    saem do mesmo resultado.
+
+    Returns:
+        Dicionário com: texto, paginas e paginas_pdfplumber
+    """
+    partes = []
+    paginas_layout = []
+    with fitz.open(caminho) as documento:
+        num_paginas = len(documento)
+        for page in documento:
+            blocos = page.get_text("blocks")
+            texto = texto_blocos(blocos)
+            if pagina_sensivel_layout(blocos, texto):
+                paginas_layout.append(page.number)
+            partes.append(texto)
+
+    if paginas_layout:
+        try:
+            from pdfplumber import open as open_pdf
+        except ImportError:
+            # Sem pdfplumber: fica a ordem de leitura dos blocos do PyMuPDF
+            open_pdf = None
+        if open_pdf is not None:
+            with open_pdf(caminho) as pdf:
+                for numero in paginas_layout:
+                    partes[numero] = pdf.pages[numero].extract_text(layout=True) or ""
+
+    return {
+        "texto": "\n".join(parte.strip() for parte in partes if parte and parte.strip()),
+        "paginas": num_paginas,
+        "paginas_pdfplumber": len(paginas_layout)
+    }
+
+def extrair_texto_arquivo(caminho: str) -> Dict[str, Any]:
+    """
+    Extrai o texto de um arquivo; erros ficam no resultado em vez de serem levantados.
+
+    Returns:
+        Dicionário com: arquivo, texto, tempo_ms e, conforme o tipo, paginas e
+        paginas_pdfplumber; em caso de falha, erro
+    """
+    inicio = time.perf_counter()
+    resultado = {"arquivo": caminho, "texto": ""}
+    try:
+        extensao = os.path.splitext(caminho)[1].lower()
+        if extensao == ".pdf":
+            resultado.update(extrair_texto_pdf(caminho))
+        elif extensao in EXTENSOES_WORD:
+            resultado["texto"] = extrair_texto_arquivo_word(caminho)
+        else:
+            raise ValueError(f"Formato não suportado: {extensao}")
+    except Exception as e:
+        resultado["erro"] = f"{type(e).__name__}: {e}"
+    resultado["tempo_ms"] = (time.perf_counter() - inicio) * 1000
+    return resultado
+
+def _extrair_bloco(caminhos: List[str]) -> List[Dict[str, Any]]:
+    return [extrair_texto_arquivo(caminho) for caminho in caminhos]
+
+def _blocos(caminhos: Iterable[str], tamanho: int) -> Iterator[List[str]]:
+    bloco = []
+    for caminho in caminhos:
+        bloco.append(caminho)
+        if len(bloco) == tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+def extrair_textos(
+    caminhos: Iterable[str],
+    processos: int = None,
+    tamanho_bloco: int = TAMANHO_BLOCO
+) -> Iterator[Dict[str, Any]]:
+    """
+    Extrai o texto dos arquivos em um pool de processos, gerando os resultados
+    (ver `extrair_texto_arquivo`) na ordem em que ficam prontos.
+
+    Args:
+        caminhos: Arquivos a processar (pode ser um gerador; é consumido aos poucos)
+        processos: Número de processos (padrão: núcleos da CPU)
+        tamanho_bloco: Arquivos por tarefa
+    """
+    processos = processos or os.cpu_count() or 1
+    blocos = _blocos(caminhos, tamanho_bloco)
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        em_voo = {}
+        sem_processo = []
+
+        def falhas(bloco: List[str], erro: Exception) -> List[Dict[str, Any]]:
+            return [{"arquivo": caminho, "texto": "", "tempo_ms": 0.0, "erro": f"Falha no processo de extração: {erro}"}
+                    for caminho in bloco]
+
+        def enviar_proximo() -> bool:
+            bloco = next(blocos, None)
+            if bloco is None:
+                return False
+            try:
+                em_voo[executor.submit(_extrair_bloco, bloco)] = bloco
+            except BrokenProcessPool as e:
+                # Pool quebrado por um processo encerrado: os arquivos restantes viram erro
+                sem_processo.extend(falhas(bloco, e))
+            return True
+
+        for _ in range(processos * BLOCOS_POR_PROCESSO):
+            if not enviar_proximo():
+                break
+
+        while em_voo:
+            prontos, _ = wait(em_voo, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                bloco = em_voo.pop(futuro)
+                try:
+                    resultados = futuro.result()
+                except Exception as e:
+                    # Processo encerrado no meio do bloco (ex.: falha no parser nativo)
+                    resultados = falhas(bloco, e)
+                enviar_proximo()
+                yield from resultados
+            while sem_processo:
+                yield sem_processo.pop(0)
+                enviar_proximo()
@@ -0,0 +1,503 @@
+"""
+Fila de trabalhos (SQLite) para a análise de currículos fora do Streamlit.
+
+O app só enfileira o PDF e consulta o status; processos trabalhadores
+independentes executam renderização → upload → análise → limpeza e gravam o
+resultado no próprio banco. O número de trabalhadores é dimensionado pela CPU
+e pelos limites da API, não pelo número de usuários conectados, e um refresh
+da página não perde o trabalho.
+
+Uso:
+    python fila_trabalhos.py --trabalhadores 4
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Callable
+
+import fitz  # PyMuPDF
+
+from cache_extracao import CacheExtracao, CAMINHO_CACHE_PADRAO, chave_documento
+from camada_texto import planejar_paginas
+from renderizacao import renderizar_pagina
+from documentos_word import eh_documento_word, planejar_documento_word
+from google_drive import obter_cliente_drive
+from modelo_curriculo import analisar_curriculo_por_paginas, imagem_para_data_url, definir_roteador, opcoes_chave_documento, MODELO, VERSAO_PROMPT
+from provedores import criar_roteador
+from agendador import dividir_limites
+from metricas import medir, resumo as resumo_metricas
+
+# Arquivo SQLite da fila
+CAMINHO_FILA_PADRAO = "fila_trabalhos.sqlite3"
+
+# Configurações Google Drive
+FOLDER_ID = "1kvWh4CxWZsmovOBZat7QzgY9kw26o7RE"  # Sua pasta
+
+# Renderização das páginas enviadas por imagem (JPEG reduz os bytes enviados sem perder legibilidade;
+# margens em branco são recortadas e o detalhe low/high é escolhido por página)
+OPCOES_RENDERIZACAO = {"dpi": 72, "formato": "jpeg", "qualidade": 85, "escala_cinza": False, "recortar": True, "detalhe_adaptativo": True}
+
+# Status de um trabalho
+PENDENTE = "pendente"
+PROCESSANDO = "processando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+
+# Trabalhador sem sinal de vida por esse tempo é considerado morto: o trabalho volta para a fila
+INTERVALO_SINAL_SEGUNDOS = 10
+TEMPO_ABANDONO_SEGUNDOS = 120
+MAX_TENTATIVAS_TRABALHO = 3
+
+# Intervalo entre consultas à fila de um trabalhador ocioso
+INTERVALO_CONSULTA_SEGUNDOS = 1.0
+
+# Trabalhos finalizados são removidos depois desse tempo
+MAX_IDADE_TRABALHO_SEGUNDOS = 7 * 24 * 3600  # 7 dias
+
+class FilaTrabalhos:
+    """
+    Fila persistente (SQLite) de análises de currículos, compartilhada entre
+    o app e os processos trabalhadores.
+
+    Cada trabalho guarda o PDF (apagado ao final), as opções, a etapa atual,
+    os campos já recebidos em streaming e o resultado. Pedidos repetidos (mesmo
+    PDF e mesmas opções) reaproveitam o trabalho existente, exceto se ele falhou.
+
+    Trabalhos enviados juntos podem formar um lote com limite próprio de
+    concorrência: um trabalho do lote só é reservado se houver menos que
+    `max_paralelo` trabalhos do mesmo lote em processamento.
+    """
+
+    def __init__(self, caminho: str = CAMINHO_FILA_PADRAO):
+        self.caminho = caminho
+
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+        with self._conectar() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS trabalhos (
+                    id TEXT PRIMARY KEY,
+                    chave TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    nome_arquivo TEXT,
+                    pdf BLOB,
+                    opcoes TEXT NOT NULL,
+                    etapa TEXT,
+                    dados_parciais TEXT,
+                    resultado TEXT,
+                    erro TEXT,
+                    trabalhador TEXT,
+                    lote TEXT,
+                    max_paralelo INTEGER,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    criado_em REAL NOT NULL,
+                    iniciado_em REAL,
+                    concluido_em REAL,
+                    atualizado_em REAL NOT NULL
+                )
+            """)
+            # Bancos criados antes dos lotes
+            colunas = {linha["name"] for linha in conn.execute("PRAGMA table_info(trabalhos)")}
+            for coluna, tipo in (("lote", "TEXT"), ("max_paralelo", "INTEGER")):
+                if coluna not in colunas:
+                    conn.execute(f"ALTER TABLE trabalhos ADD COLUMN {coluna} {tipo}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_trabalhos_status ON trabalhos (status, criado_em)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_trabalhos_lote ON trabalhos (lote, status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_trabalhos_chave ON trabalhos (chave)")
+
+    @contextmanager
+    def _conectar(self):
+        # Uma conexão por operação: seguro entre threads e processos
+        conn = sqlite3.connect(self.caminho, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def enfileirar(
+        self,
+        pdf_bytes: bytes,
+        nome_arquivo: str,
+        opcoes: Dict[str, Any],
+        lote: str = None,
+        max_paralelo: int = None
+    ) -> str:
+        """
+        Enfileira a análise de um PDF e retorna o id do trabalho (ou o de um
+        pedido igual em andamento/concluído). `lote` e `max_paralelo` limitam
+        quantos trabalhos do mesmo envio são processados ao mesmo tempo.
+        """
+        chave = chave_documento(pdf_bytes, MODELO, VERSAO_PROMPT, json.dumps(opcoes, sort_keys=True))
+        agora = time.time()
+        with self._conectar() as conn:
+            # Trava de escrita antes da consulta: dois envios simultâneos do mesmo PDF não criam dois trabalhos
+            conn.execute("BEGIN IMMEDIATE")
+            linha = conn.execute(
+                "SELECT id FROM trabalhos WHERE chave = ? AND status != ? ORDER BY criado_em DESC LIMIT 1",
+                (chave, ERRO)
+            ).fetchone()
+            if linha is not None:
+                return linha["id"]
+
+            id_trabalho = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO trabalhos (id, chave, status, nome_arquivo, pdf, opcoes, lote, max_paralelo, criado_em, atualizado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (id_trabalho, chave, PENDENTE, nome_arquivo, pdf_bytes, json.dumps(opcoes), lote, max_paralelo, agora, agora)
+            )
+        return id_trabalho
+
+    def obter(self, id_trabalho: str) -> Optional[Dict[str, Any]]:
+        """Status de um trabalho (sem o PDF); None se não existir."""
+        with self._conectar() as conn:
+            linha = conn.execute(
+                "SELECT id, status, nome_arquivo, opcoes, etapa, dados_parciais, resultado, erro, trabalhador, "
+                "tentativas, criado_em, iniciado_em, concluido_em, atualizado_em FROM trabalhos WHERE id = ?",
+                (id_trabalho,)
+            ).fetchone()
+        if linha is None:
+            return None
+
+        trabalho = dict(linha)
+        for coluna in ("opcoes", "dados_parciais", "resultado"):
+            if trabalho[coluna] is not None:
+                trabalho[coluna] = json.loads(trabalho[coluna])
+        trabalho["posicao"] = self.posicao(trabalho) if trabalho["status"] == PENDENTE else 0
+        return trabalho
+
+    def posicao(self, trabalho: Dict[str, Any]) -> int:
+        """Posição do trabalho pendente na fila (1 = o próximo a ser atendido)."""
+        with self._conectar() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM trabalhos WHERE status = ? AND criado_em <= ?",
+                (PENDENTE, trabalho["criado_em"])
+            ).fetchone()[0]
+
+    def reservar(self, trabalhador: str) -> Optional[Dict[str, Any]]:
+        """
+        Retira o trabalho pendente mais antigo da fila (atômico entre processos),
+        com o PDF, pulando os lotes que já estão no seu limite de concorrência.
+        """
+        conn = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            linha = conn.execute(
+                "SELECT id, pdf, opcoes FROM trabalhos AS t WHERE status = ? AND (max_paralelo IS NULL OR ("
+                "SELECT COUNT(*) FROM trabalhos WHERE lote = t.lote AND status = ?) < max_paralelo) "
+                "ORDER BY criado_em LIMIT 1",
+                (PENDENTE, PROCESSANDO)
+            ).fetchone()
+            if linha is None:
+                conn.execute("COMMIT")
+                return None
+
+            agora = time.time()
+            conn.execute(
+                "UPDATE trabalhos SET status = ?, trabalhador = ?, tentativas = tentativas + 1, "
+                "iniciado_em = ?, atualizado_em = ? WHERE id = ?",
+                (PROCESSANDO, trabalhador, agora, agora, linha["id"])
+            )
+            conn.execute("COMMIT")
+            return {"id": linha["id"], "pdf": linha["pdf"], "opcoes": json.loads(linha["opcoes"])}
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _atualizar(self, id_trabalho: str, **colunas) -> None:
+        colunas["atualizado_em"] = time.time()
+        atribuicoes = ", ".join(f"{coluna} = ?" for coluna in colunas)
+        with self._conectar() as conn:
+            conn.execute(f"UPDATE trabalhos SET {atribuicoes} WHERE id = ?", (*colunas.values(), id_trabalho))
+
+    def sinalizar(self, id_trabalho: str) -> None:
+        """Sinal de vida do trabalhador (evita que o trabalho seja tomado como abandonado)."""
+        self._atualizar(id_trabalho)
+
+    def definir_etapa(self, id_trabalho: str, etapa: str) -> None:
+        self._atualizar(id_trabalho, etapa=etapa)
+
+    def salvar_parciais(self, id_trabalho: str, dados_parciais: Dict[str, Any]) -> None:
+        """Grava os campos já recebidos em streaming, para o app exibir durante o processamento."""
+        self._atualizar(id_trabalho, dados_parciais=json.dumps(dados_parciais, ensure_ascii=False))
+
+    def concluir(self, id_trabalho: str, resultado: Dict[str, Any]) -> None:
+        """Grava o resultado e descarta o PDF. Resultados com erro marcam o trabalho como erro."""
+        erro = resultado["dados"].get("erro")
+        self._atualizar(
+            id_trabalho,
+            status=ERRO if erro else CONCLUIDO,
+            resultado=json.dumps(resultado, ensure_ascii=False),
+            erro=erro,
+            pdf=None,
+            concluido_em=time.time()
+        )
+
+    def falhar(self, id_trabalho: str, erro: str) -> None:
+        self._atualizar(id_trabalho, status=ERRO, erro=erro, pdf=None, concluido_em=time.time())
+
+    def recuperar_abandonados(self, tempo_abandono: float = TEMPO_ABANDONO_SEGUNDOS) -> int:
+        """
+        Devolve à fila os trabalhos de trabalhadores sem sinal de vida; após
+        MAX_TENTATIVAS_TRABALHO tentativas o trabalho é marcado como erro.
+        """
+        limite = time.time() - tempo_abandono
+        with self._conectar() as conn:
+            conn.execute(
+                "UPDATE trabalhos SET status = ?, erro = ?, pdf = NULL, concluido_em = ? "
+                "WHERE status = ? AND atualizado_em < ? AND tentativas >= ?",
+                (ERRO, "Trabalhador interrompido repetidamente", time.time(), PROCESSANDO, limite, MAX_TENTATIVAS_TRABALHO)
+            )
+            return conn.execute(
+                "UPDATE trabalhos SET status = ?, trabalhador = NULL, etapa = NULL, dados_parciais = NULL "
+                "WHERE status = ? AND atualizado_em < ?",
+                (PENDENTE, PROCESSANDO, limite)
+            ).rowcount
+
+    def remover_antigos(self, max_idade_segundos: float = MAX_IDADE_TRABALHO_SEGUNDOS) -> int:
+        """Remove os trabalhos finalizados há mais de `max_idade_segundos`."""
+        with self._conectar() as conn:
+            return conn.execute(
+                "DELETE FROM trabalhos WHERE status IN (?, ?) AND concluido_em < ?",
+                (CONCLUIDO, ERRO, time.time() - max_idade_segundos)
+            ).rowcount
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Número de trabalhos por status."""
+        with self._conectar() as conn:
+            contagens = dict(conn.execute("SELECT status, COUNT(*) FROM trabalhos GROUP BY status").fetchall())
+        return {status: contagens.get(status, 0) for status in (PENDENTE, PROCESSANDO, CONCLUIDO, ERRO)}
+
+def preparar_paginas(pdf_bytes: bytes, usar_camada_texto: bool = True):
+    """
+    Planeja as páginas do PDF e renderiza só as que precisam de visão.
+
+    Returns:
+        Tupla contendo: (plano por página, {número da página: imagem renderizada})
+    """
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+        plano = planejar_paginas(pdf_document)
+        if not usar_camada_texto:
+            for decisao in plano:
+                decisao.update(usar_texto=False, motivo="camada de texto desativada", texto="", tokens_texto=0)
+
+        imagens = {}
+        for decisao in plano:
+            if not decisao["usar_texto"]:
+                imagem = renderizar_pagina(pdf_document.load_page(decisao["pagina"] - 1), **OPCOES_RENDERIZACAO)
+                decisao.update(detail=imagem["detail"], tokens_imagem_ajustado=imagem["tokens_imagem"])
+                imagens[decisao["pagina"]] = imagem
+    return plano, imagens
+
+def processar_pdf(
+    pdf_bytes: bytes,
+    opcoes: Dict[str, Any],
+    cache: CacheExtracao = None,
+    ao_mudar_etapa: Callable[[str], None] = None,
+    ao_receber_campo: Callable[[str, Any], None] = None
+) -> Dict[str, Any]:
+    """
+    Renderiza, envia e analisa um PDF de currículo; apaga as imagens do Drive ao final.
+    Documentos do Word (.doc/.docx) seguem direto como texto.
+
+    Páginas com camada de texto utilizável são enviadas como texto; apenas as
+    digitalizadas ou com pouco texto são rasterizadas. O resultado é procurado
+    antes no cache de extração pelo hash do PDF.
+
+    Args:
+        pdf_bytes: Conteúdo do PDF
+        opcoes: usar_google_drive, requisicao_unica, usar_camada_texto, incremental e ao_vivo
+        cache: Cache de resultados opcional (CacheExtracao)
+        ao_mudar_etapa: Callback chamado com o nome de cada etapa iniciada
+        ao_receber_campo: Callback (campo, valor) dos campos recebidos em streaming
+
+    Returns:
+        Dicionário com: dados, total_tokens, preco_total, plano (sem o texto das
+        páginas; None se veio do cache), falhas_limpeza e do_cache
+    """
+    ao_mudar_etapa = ao_mudar_etapa or (lambda etapa: None)
+    requisicao_unica = opcoes.get("requisicao_unica", True)
+    usar_camada_texto = opcoes.get("usar_camada_texto", True)
+    incremental = opcoes.get("incremental", False)
+
+    chave_pdf = chave_documento(pdf_bytes, MODELO, VERSAO_PROMPT, opcoes_chave_documento(requisicao_unica, usar_camada_texto, incremental))
+    resultado_cache = cache.obter(chave_pdf) if cache is not None else None
+    if resultado_cache is not None:
+        dados_curriculo, total_tokens, preco_total = resultado_cache
+        return {"dados": dados_curriculo, "total_tokens": total_tokens, "preco_total": preco_total,
+                "plano": None, "falhas_limpeza": [], "do_cache": True}
+
+    # 1. Converter em imagens apenas as páginas que precisam de visão
+    ao_mudar_etapa("renderizacao")
+    if eh_documento_word(pdf_bytes):
+        # .doc/.docx: texto nativo, sem conversão para PDF nem renderização
+        plano, imagens = planejar_documento_word(pdf_bytes), {}
+    else:
+        plano, imagens = preparar_paginas(pdf_bytes, usar_camada_texto)
+
+    paginas = []
+    file_ids = []
+    falhas_limpeza = []
+    try:
+        # 2. Montar as páginas: texto, ou imagem (embutida ou enviada ao Drive)
+        if imagens and opcoes.get("usar_google_drive"):
+            ao_mudar_etapa("upload")
+        for decisao in plano:
+            if decisao["usar_texto"]:
+                paginas.append({"texto": decisao["texto"]})
+                continue
+
+            imagem = imagens[decisao["pagina"]]
+            if opcoes.get("usar_google_drive"):
+                nome = f"page{imagem['pagina']}.{OPCOES_RENDERIZACAO['formato']}"
+                link, file_id = obter_cliente_drive().upload_bytes_publico(imagem["bytes"], nome, FOLDER_ID, imagem["mime_type"])
+                file_ids.append(file_id)
+                paginas.append({"imagem_url": link, "detail": imagem["detail"]})
+            else:
+                # Imagem embutida (base64), sem Drive
+                paginas.append({"imagem_url": imagem_para_data_url(imagem["bytes"], imagem["mime_type"]), "detail": imagem["detail"]})
+
+        # 3. Analisar currículo com IA
+        ao_mudar_etapa("analise")
+        dados_curriculo, total_tokens, preco_total = analisar_curriculo_por_paginas(
+            # Cache só no nível do documento (chave_pdf): consultar também por páginas
+            # contaria duas falhas e gravaria duas entradas por documento novo
+            paginas, requisicao_unica=requisicao_unica, cache=None, ao_receber_campo=ao_receber_campo, incremental=incremental
+        )
+    finally:
+        # 4. Deletar as imagens do Google Drive
+        if file_ids:
+            ao_mudar_etapa("limpeza")
+            try:
+                falhas_limpeza = [f"Não foi possível deletar o arquivo {file_id}: {e}" for file_id, e in obter_cliente_drive().deletar_arquivos(file_ids)]
+            except Exception as e:
+                falhas_limpeza = [f"Erro ao limpar arquivos temporários: {e}"]
+
+    if cache is not None:
+        cache.salvar(chave_pdf, dados_curriculo, total_tokens, preco_total)
+    plano = [{chave: valor for chave, valor in decisao.items() if chave != "texto"} for decisao in plano]
+    return {"dados": dados_curriculo, "total_tokens": total_tokens, "preco_total": preco_total,
+            "plano": plano, "falhas_limpeza": falhas_limpeza, "do_cache": False}
+
+def executar_trabalho(fila: FilaTrabalhos, trabalho: Dict[str, Any], cache: CacheExtracao = None) -> None:
+    """Processa um trabalho reservado, mantendo o sinal de vida e gravando etapa, parciais e resultado."""
+    id_trabalho = trabalho["id"]
+    parar_sinal = threading.Event()
+
+    def sinalizar():
+        while not parar_sinal.wait(INTERVALO_SINAL_SEGUNDOS):
+            try:
+                fila.sinalizar(id_trabalho)
+            except sqlite3.Error as e:
+                print(f"Aviso: Falha ao sinalizar o trabalho {id_trabalho}: {e}")
+
+    dados_parciais = {}
+
+    def ao_receber_campo(campo, valor):
+        dados_parciais[campo] = valor
+        fila.salvar_parciais(id_trabalho, dados_parciais)
+
+    thread_sinal = threading.Thread(target=sinalizar, daemon=True)
+    thread_sinal.start()
+    try:
+        with medir("trabalho", id=id_trabalho) as info:
+            resultado = processar_pdf(
+                trabalho["pdf"],
+                trabalho["opcoes"],
+                cache=cache,
+                ao_mudar_etapa=lambda etapa: fila.definir_etapa(id_trabalho, etapa),
+                ao_receber_campo=ao_receber_campo if trabalho["opcoes"].get("ao_vivo") else None
+            )
+            if "erro" in resultado["dados"]:
+                info["status"] = "erro"
+        # Tempos por etapa acumulados neste trabalhador, para exibição no app
+        resultado["metricas"] = resumo_metricas()["histogramas"]
+        fila.concluir(id_trabalho, resultado)
+    except Exception as e:
+        print(f"Erro no trabalho {id_trabalho}: {e}")
+        fila.falhar(id_trabalho, f"Erro no processamento: {e}")
+    finally:
+        parar_sinal.set()
+        thread_sinal.join()
+
+def executar_trabalhador(
+    caminho_fila: str = CAMINHO_FILA_PADRAO,
+    caminho_cache: Optional[str] = CAMINHO_CACHE_PADRAO,
+    provedores: List[str] = None,
+    hedge: bool = False,
+    total_trabalhadores: int = 1
+) -> None:
+    """
+    Laço de um processo trabalhador: reserva, processa e, quando ocioso, faz a
+    manutenção da fila. Com `provedores`, as consultas sem streaming passam
+    pelo roteador de provedores (ver provedores.py). Os limites por minuto dos
+    modelos são divididos entre os `total_trabalhadores` processos.
+    """
+    dividir_limites(total_trabalhadores)
+    if provedores:
+        definir_roteador(criar_roteador(provedores, hedge))
+    fila = FilaTrabalhos(caminho_fila)
+    cache = CacheExtracao(caminho_cache) if caminho_cache else None
+    nome = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"Trabalhador {nome} iniciado.")
+
+    while True:
+        trabalho = fila.reservar(nome)
+        if trabalho is None:
+            recuperados = fila.recuperar_abandonados()
+            if recuperados:
+                print(f"{recuperados} trabalho(s) abandonado(s) devolvido(s) à fila.")
+            fila.remover_antigos()
+            time.sleep(INTERVALO_CONSULTA_SEGUNDOS)
+            continue
+
+        print(f"[{nome}] Processando trabalho {trabalho['id']}...")
+        executar_trabalho(fila, trabalho, cache)
+
+def main():
+    parser = argparse.ArgumentParser(description="Processos trabalhadores da fila de análise de currículos.")
+    parser.add_argument("--trabalhadores", type=int, default=min(4, os.cpu_count() or 1), help="Número de processos trabalhadores")
+    parser.add_argument("--fila", default=CAMINHO_FILA_PADRAO, help="Arquivo SQLite da fila")
+    parser.add_argument("--cache", default=CAMINHO_CACHE_PADRAO, help="Arquivo do cache de extração")
+    parser.add_argument("--sem-cache", action="store_true", help="Desativa o cache de extração")
+    parser.add_argument("--provedores", default=None, help="Provedores do roteador, separados por vírgula (openai, bedrock, langchain); o modo ao vivo usa sempre a OpenAI")
+    parser.add_argument("--hedge", action="store_true", help="Dispara a requisição em um segundo provedor quando o primeiro passa do seu p95")
+    args = parser.parse_args()
+
+    # Cria as tabelas antes de subir os processos
+    FilaTrabalhos(args.fila)
+    caminho_cache = None if args.sem_cache else args.cache
+    provedores = args.provedores.split(",") if args.provedores else None
+
+    processos: List[multiprocessing.Process] = []
+    for _ in range(args.trabalhadores):
+        processo = multiprocessing.Process(target=executar_trabalhador, args=(args.fila, caminho_cache, provedores, args.hedge, args.trabalhadores), daemon=True)
+        processo.start()
+        processos.append(processo)
+
+    try:
+        for processo in processos:
+            processo.join()
+    except KeyboardInterrupt:
+        # Trabalhos interrompidos voltam à fila quando o sinal de vida expirar
+        print("\nEncerrando os trabalhadores...")
+        for processo in processos:
+            processo.terminate()
+
+if __name__ == "__main__":
+    main()
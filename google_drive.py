@@ -0,0 +1,146 @@
+import io
+import os
+import pickle
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+
+from metricas import medir
+
+# Configurações Google Drive
+SCOPES = ['https://www.googleapis.com/auth/drive.file']
+CAMINHO_TOKEN = 'token.pickle'
+CAMINHO_CREDENCIAIS = 'credentials.json'
+
+# Renova o token antes de expirar, para não pagar a renovação no meio de um upload
+MARGEM_RENOVACAO = timedelta(minutes=5)
+
+def authenticate():
+    creds = None
+    if os.path.exists(CAMINHO_TOKEN):
+        with open(CAMINHO_TOKEN, 'rb') as token:
+            creds = pickle.load(token)
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(CAMINHO_CREDENCIAIS, SCOPES)
+            creds = flow.run_local_server(port=0)
+        with open(CAMINHO_TOKEN, 'wb') as token:
+            pickle.dump(creds, token)
+    return creds
+
+class ClienteDrive:
+    """
+    Cliente do Google Drive compartilhado pelo processo.
+
+    Autentica uma única vez e renova o token de forma proativa (sob trava).
+    O serviço da API é construído uma vez por thread, pois o `httplib2.Http`
+    não é seguro entre threads; cada thread reaproveita sua própria conexão.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._creds = None
+        self._local = threading.local()
+
+    def credenciais(self):
+        """Retorna credenciais válidas, renovando-as se estiverem perto de expirar."""
+        with self._lock:
+            if self._creds is None:
+                self._creds = authenticate()
+            elif self._precisa_renovar(self._creds):
+                self._creds.refresh(Request())
+                with open(CAMINHO_TOKEN, 'wb') as token:
+                    pickle.dump(self._creds, token)
+            return self._creds
+
+    @staticmethod
+    def _precisa_renovar(creds) -> bool:
+        if not creds.refresh_token:
+            return False
+        if creds.expiry is None:
+            return not creds.valid
+        # google-auth usa datetimes UTC sem fuso horário
+        agora = datetime.now(timezone.utc).replace(tzinfo=None)
+        return not creds.valid or creds.expiry - agora < MARGEM_RENOVACAO
+
+    def servico(self):
+        """Serviço 'drive' v3 da thread atual (construído uma vez por thread)."""
+        creds = self.credenciais()
+        servico = getattr(self._local, "servico", None)
+        if servico is None:
+            http = AuthorizedHttp(creds, http=httplib2.Http())
+            servico = build('drive', 'v3', http=http, cache_discovery=False)
+            self._local.servico = servico
+        return servico
+
+    def _publicar(self, file_metadata, media) -> Tuple[str, str]:
+        with medir("upload_drive", nome=file_metadata['name']):
+            service = self.servico()
+            file = service.files().create(body=file_metadata, media_body=media, fields='id').execute()
+            file_id = file.get('id')
+
+            # Torna o arquivo público
+            permission = {
+                'type': 'anyone',
+                'role': 'reader'
+            }
+            service.permissions().create(fileId=file_id, body=permission).execute()
+
+        # Gera o link público
+        return f"https://drive.google.com/uc?id={file_id}", file_id
+
+    def upload_arquivo_publico(self, path_image: str, folder_id: str, mimetype: str = 'image/png') -> Tuple[str, str]:
+        """Envia um arquivo do disco e retorna (link público, id)."""
+        file_metadata = {
+            'name': os.path.basename(path_image),
+            'parents': [folder_id]
+        }
+        return self._publicar(file_metadata, MediaFileUpload(path_image, mimetype=mimetype))
+
+    def upload_bytes_publico(self, conteudo: bytes, nome: str, folder_id: str, mimetype: str = 'image/png') -> Tuple[str, str]:
+        """Envia bytes em memória (sem arquivo temporário) e retorna (link público, id)."""
+        file_metadata = {
+            'name': nome,
+            'parents': [folder_id]
+        }
+        media = MediaIoBaseUpload(io.BytesIO(conteudo), mimetype=mimetype)
+        return self._publicar(file_metadata, media)
+
+    def deletar_arquivos(self, file_ids: List[str]) -> List[Tuple[str, Exception]]:
+        """Remove os arquivos informados; retorna a lista de (id, erro) que falharam."""
+        falhas = []
+        with medir("limpeza_drive", arquivos=len(file_ids)) as info:
+            service = self.servico()
+            for file_id in file_ids:
+                try:
+                    service.files().delete(fileId=file_id).execute()
+                except Exception as e:
+                    falhas.append((file_id, e))
+            info["falhas"] = len(falhas)
+        return falhas
+
+_cliente_drive = None
+_cliente_drive_lock = threading.Lock()
+
+def obter_cliente_drive() -> ClienteDrive:
+    """Retorna o ClienteDrive único do processo (criado na primeira chamada)."""
+    global _cliente_drive
+    with _cliente_drive_lock:
+        if _cliente_drive is None:
+            _cliente_drive = ClienteDrive()
+        return _cliente_drive
+
+def upload_image_and_get_public_link(path_image, folder_id, return_id=False):
+    public_url, file_id = obter_cliente_drive().upload_arquivo_publico(path_image, folder_id)
+    if return_id:
+        return public_url, file_id
+    return public_url
@@ -0,0 +1,311 @@
+"""
+Ingestão em lote de currículos (.pdf, .doc, .docx) de uma pasta.
+
+Uso:
+    python ingestao_lote.py content/curriculos_ia --saida resultados.jsonl
+
+A extração de texto e a renderização rodam em um pool de processos; as
+chamadas ao modelo rodam com concorrência limitada. Cada documento concluído
+é gravado no JSONL de saída e registrado no manifesto, de modo que uma
+execução interrompida retoma sem reprocessar os arquivos já concluídos.
+
+Antes do modelo, cada documento é comparado ao índice de duplicados (cópia
+exata, mesmo texto ou texto quase igual); duplicados não são enviados ao
+modelo e ficam no JSONL apenas com a referência ao original (duplicado_de).
+"""
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Iterator
+
+import fitz  # PyMuPDF
+
+from camada_texto import planejar_paginas, resumir_plano
+from renderizacao import renderizar_pagina
+from documentos_word import EXTENSOES_WORD, planejar_documento_word
+from cache_extracao import CacheExtracao, CAMINHO_CACHE_PADRAO
+from duplicados import IndiceDuplicados, CAMINHO_INDICE_PADRAO, assinatura_documento
+from modelo_curriculo import analisar_curriculo_por_paginas, imagem_para_data_url, definir_roteador, MODELO
+from provedores import criar_roteador
+from agendador import obter_agendador, resumo as resumo_agendadores
+
+EXTENSOES_SUPORTADAS = (".pdf", ".doc", ".docx")
+
+# Renderização das páginas sem camada de texto utilizável (margens recortadas, detalhe por página)
+OPCOES_RENDERIZACAO = {"dpi": 72, "formato": "jpeg", "qualidade": 85, "recortar": True, "detalhe_adaptativo": True}
+
+def listar_arquivos(diretorio: str, recursivo: bool = False) -> Iterator[str]:
+    """Lista os arquivos suportados da pasta, em ordem alfabética."""
+    if recursivo:
+        for raiz, pastas, arquivos in os.walk(diretorio):
+            pastas.sort()
+            for nome in sorted(arquivos):
+                if nome.lower().endswith(EXTENSOES_SUPORTADAS):
+                    yield os.path.join(raiz, nome)
+    else:
+        for nome in sorted(os.listdir(diretorio)):
+            caminho = os.path.join(diretorio, nome)
+            if os.path.isfile(caminho) and nome.lower().endswith(EXTENSOES_SUPORTADAS):
+                yield caminho
+
+def chave_manifesto(caminho: str) -> str:
+    """Identifica a versão de um arquivo pelo caminho, tamanho e data de modificação."""
+    info = os.stat(caminho)
+    return f"{os.path.abspath(caminho)}|{info.st_size}|{info.st_mtime_ns}"
+
+def carregar_manifesto(caminho_manifesto: str) -> Dict[str, str]:
+    """Lê o manifesto (JSONL) e retorna {chave: status} com o último status de cada arquivo."""
+    status = {}
+    if not os.path.exists(caminho_manifesto):
+        return status
+    with open(caminho_manifesto, encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                # Linha truncada por uma interrupção no meio da escrita
+                continue
+            status[registro["chave"]] = registro["status"]
+    return status
+
+def preparar_documento(caminho: str) -> Dict[str, Any]:
+    """
+    Prepara as páginas de um documento para o modelo (executado no pool de processos).
+
+    Returns:
+        Dicionário com: arquivo, sha256, assinatura (ver `assinatura_documento`),
+        paginas, resumo_plano, tempo_preparo_ms e, em caso de falha, erro
+    """
+    inicio = time.perf_counter()
+    resultado = {"arquivo": caminho}
+    try:
+        with open(caminho, "rb") as f:
+            conteudo = f.read()
+
+        extensao = os.path.splitext(caminho)[1].lower()
+        if extensao == ".pdf":
+            with fitz.open(stream=conteudo, filetype="pdf") as pdf_document:
+                texto = "\n".join(page.get_text() for page in pdf_document)
+                plano = planejar_paginas(pdf_document)
+                paginas = []
+                for decisao in plano:
+                    if decisao["usar_texto"]:
+                        paginas.append({"texto": decisao["texto"]})
+                    else:
+                        imagem = renderizar_pagina(pdf_document.load_page(decisao["pagina"] - 1), **OPCOES_RENDERIZACAO)
+                        decisao.update(detail=imagem["detail"], tokens_imagem_ajustado=imagem["tokens_imagem"])
+                        paginas.append({"imagem_url": imagem_para_data_url(imagem["bytes"], imagem["mime_type"]), "detail": imagem["detail"]})
+            resultado["resumo_plano"] = resumir_plano(plano)
+        elif extensao in EXTENSOES_WORD:
+            # Texto nativo do Word, sem conversão para PDF nem renderização
+            plano = planejar_documento_word(conteudo)
+            texto = "\n".join(decisao["texto"] for decisao in plano)
+            paginas = [{"texto": decisao["texto"]} for decisao in plano]
+            resultado["resumo_plano"] = resumir_plano(plano)
+        else:
+            raise ValueError(f"Formato não suportado: {extensao}")
+
+        resultado["assinatura"] = assinatura_documento(conteudo, texto)
+        resultado["sha256"] = resultado["assinatura"]["sha256"]
+        resultado["paginas"] = paginas
+    except Exception as e:
+        resultado["erro"] = f"Erro ao preparar documento: {e}"
+    resultado["tempo_preparo_ms"] = (time.perf_counter() - inicio) * 1000
+    return resultado
+
+def analisar_documento(preparado: Dict[str, Any], requisicao_unica: bool, cache: CacheExtracao, incremental: bool = False) -> Dict[str, Any]:
+    """Envia as páginas preparadas ao modelo (executado no pool de threads)."""
+    inicio = time.perf_counter()
+    dados_curriculo, total_tokens, preco_total = analisar_curriculo_por_paginas(
+        preparado["paginas"], requisicao_unica=requisicao_unica, cache=cache, incremental=incremental
+    )
+    return {
+        "dados": dados_curriculo,
+        "total_tokens": total_tokens,
+        "preco_total": preco_total,
+        "tempo_analise_ms": (time.perf_counter() - inicio) * 1000
+    }
+
+def processar_pasta(
+    diretorio: str,
+    caminho_saida: str,
+    caminho_manifesto: str,
+    processos: int = None,
+    paralelo_llm: int = 8,
+    recursivo: bool = False,
+    requisicao_unica: bool = True,
+    repetir_erros: bool = True,
+    cache: CacheExtracao = None,
+    incremental: bool = False,
+    indice: IndiceDuplicados = None
+) -> Dict[str, int]:
+    """
+    Processa todos os currículos da pasta, retomando a partir do manifesto.
+
+    Com `indice`, documentos duplicados de um já visto não vão ao modelo e
+    ficam com status "duplicado" no manifesto (não são reprocessados). Se a
+    análise de um original falhar, ele sai do índice e os duplicados vinculados
+    a ele recebem o status "revalidar", sendo reavaliados na próxima execução.
+
+    Returns:
+        Contadores: concluidos, duplicados, erros, ignorados (já concluídos em
+        execução anterior)
+    """
+    processos = processos or os.cpu_count() or 1
+    status_anterior = carregar_manifesto(caminho_manifesto)
+
+    arquivos = []
+    ignorados = 0
+    for caminho in listar_arquivos(diretorio, recursivo):
+        status = status_anterior.get(chave_manifesto(caminho))
+        if status in ("concluido", "duplicado") or (status == "erro" and not repetir_erros):
+            ignorados += 1
+        else:
+            arquivos.append(caminho)
+
+    print(f"{len(arquivos)} arquivo(s) a processar, {ignorados} já processado(s) anteriormente.")
+    contadores = {"concluidos": 0, "duplicados": 0, "erros": 0, "ignorados": ignorados}
+    if not arquivos:
+        return contadores
+
+    # Limita quantos documentos ficam em memória entre a preparação e o modelo
+    limite_em_voo = processos + 2 * paralelo_llm
+    pendentes = iter(arquivos)
+
+    with open(caminho_saida, "a", encoding="utf-8") as saida, \
+            open(caminho_manifesto, "a", encoding="utf-8") as manifesto, \
+            ProcessPoolExecutor(max_workers=processos) as pool_cpu, \
+            ThreadPoolExecutor(max_workers=paralelo_llm) as pool_llm:
+
+        em_preparo = {}
+        em_analise = {}
+
+        def registrar(preparado, analise, erro=None, original=None):
+            registro = {
+                "arquivo": preparado["arquivo"],
+                "sha256": preparado.get("sha256"),
+                "tempo_preparo_ms": round(preparado.get("tempo_preparo_ms", 0), 1),
+                "resumo_plano": preparado.get("resumo_plano")
+            }
+            if original is not None:
+                registro.update(duplicado_de=original["arquivo"], tipo_duplicado=original["tipo"],
+                                similaridade=round(original["similaridade"], 3))
+            if analise is not None:
+                registro.update(analise)
+                registro["tempo_analise_ms"] = round(analise["tempo_analise_ms"], 1)
+                if "erro" in analise["dados"]:
+                    erro = analise["dados"]["erro"]
+            if erro:
+                registro["erro"] = erro
+
+            saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            saida.flush()
+            status = "erro" if erro else "duplicado" if original else "concluido"
+            manifesto.write(json.dumps({"chave": chave_manifesto(preparado["arquivo"]), "status": status}, ensure_ascii=False) + "\n")
+            if erro and indice is not None:
+                # Sem o original, os duplicados dele voltam a ser processados na próxima execução
+                for duplicado in indice.remover(preparado["arquivo"]):
+                    try:
+                        chave = chave_manifesto(duplicado)
+                    except OSError:
+                        continue
+                    manifesto.write(json.dumps({"chave": chave, "status": "revalidar"}, ensure_ascii=False) + "\n")
+                    print(f"Duplicado a revalidar na próxima execução (original falhou): {duplicado}")
+            manifesto.flush()
+            os.fsync(manifesto.fileno())
+
+            contadores["erros" if erro else "duplicados" if original else "concluidos"] += 1
+            feitos = contadores["concluidos"] + contadores["duplicados"] + contadores["erros"]
+            if original:
+                print(f"[{feitos}/{len(arquivos)}] DUPLICADO {preparado['arquivo']} de {original['arquivo']} "
+                      f"({original['tipo']}, similaridade {original['similaridade']:.2f})")
+                return
+            print(f"[{feitos}/{len(arquivos)}] {'ERRO' if erro else 'OK'} {preparado['arquivo']}" + (f": {erro}" if erro else "")
+                  + f" · fila do agendador: {obter_agendador(MODELO).profundidade()}")
+
+        def completar_fila():
+            while len(em_preparo) + len(em_analise) < limite_em_voo:
+                caminho = next(pendentes, None)
+                if caminho is None:
+                    return
+                em_preparo[pool_cpu.submit(preparar_documento, caminho)] = caminho
+
+        completar_fila()
+        while em_preparo or em_analise:
+            concluidos, _ = wait(list(em_preparo) + list(em_analise), return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                if futuro in em_preparo:
+                    caminho = em_preparo.pop(futuro)
+                    try:
+                        preparado = futuro.result()
+                    except Exception as e:
+                        preparado = {"arquivo": caminho, "erro": f"Erro ao preparar documento: {e}"}
+                    original = None
+                    if "erro" not in preparado and indice is not None:
+                        original = indice.verificar_ou_registrar(preparado["arquivo"], preparado["assinatura"])
+                    if "erro" in preparado:
+                        registrar(preparado, None, preparado["erro"])
+                    elif original is not None:
+                        registrar(preparado, None, original=original)
+                    else:
+                        em_analise[pool_llm.submit(analisar_documento, preparado, requisicao_unica, cache, incremental)] = preparado
+                else:
+                    preparado = em_analise.pop(futuro)
+                    try:
+                        registrar(preparado, futuro.result())
+                    except Exception as e:
+                        registrar(preparado, None, f"Erro na análise: {e}")
+            completar_fila()
+
+    return contadores
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrai dados de todos os currículos de uma pasta para um arquivo JSONL.")
+    parser.add_argument("diretorio", help="Pasta com os currículos (.pdf, .doc, .docx)")
+    parser.add_argument("--saida", default="resultados.jsonl", help="Arquivo JSONL de saída (acrescenta ao final)")
+    parser.add_argument("--manifesto", default=None, help="Manifesto de retomada (padrão: <saida>.manifesto.jsonl)")
+    parser.add_argument("--processos", type=int, default=None, help="Processos para extração/renderização (padrão: núcleos da CPU)")
+    parser.add_argument("--paralelo-llm", type=int, default=8, help="Documentos analisados pelo modelo ao mesmo tempo")
+    parser.add_argument("--recursivo", action="store_true", help="Inclui subpastas")
+    parser.add_argument("--por-pagina", action="store_true", help="Uma chamada por página em vez de uma por documento")
+    parser.add_argument("--incremental", action="store_true", help="Com --por-pagina: páginas em sequência, só com os campos faltantes, parando quando os obrigatórios estiverem preenchidos")
+    parser.add_argument("--nao-repetir-erros", action="store_true", help="Não reprocessa arquivos que falharam em execuções anteriores")
+    parser.add_argument("--cache", default=CAMINHO_CACHE_PADRAO, help="Arquivo do cache de extração")
+    parser.add_argument("--sem-cache", action="store_true", help="Desativa o cache de extração")
+    parser.add_argument("--indice-duplicados", default=CAMINHO_INDICE_PADRAO, help="Arquivo do índice de duplicados")
+    parser.add_argument("--sem-deduplicacao", action="store_true", help="Envia ao modelo também os documentos duplicados")
+    parser.add_argument("--provedores", default=None, help="Provedores do roteador, separados por vírgula (openai, bedrock, langchain)")
+    parser.add_argument("--hedge", action="store_true", help="Dispara a requisição em um segundo provedor quando o primeiro passa do seu p95")
+    args = parser.parse_args()
+
+    roteador = None
+    if args.provedores:
+        roteador = criar_roteador(args.provedores.split(","), args.hedge)
+        definir_roteador(roteador)
+
+    inicio = time.perf_counter()
+    contadores = processar_pasta(
+        args.diretorio,
+        args.saida,
+        args.manifesto or f"{args.saida}.manifesto.jsonl",
+        processos=args.processos,
+        paralelo_llm=args.paralelo_llm,
+        recursivo=args.recursivo,
+        requisicao_unica=not args.por_pagina,
+        repetir_erros=not args.nao_repetir_erros,
+        cache=None if args.sem_cache else CacheExtracao(args.cache),
+        incremental=args.incremental,
+        indice=None if args.sem_deduplicacao else IndiceDuplicados(args.indice_duplicados)
+    )
+    print(f"\nConcluídos: {contadores['concluidos']} · Duplicados: {contadores['duplicados']} · Erros: {contadores['erros']} · "
+          f"Ignorados: {contadores['ignorados']} · Tempo total: {time.perf_counter() - inicio:.1f} s")
+    if roteador is not None:
+        for nome, estatisticas in roteador.resumo().items():
+            print(f"Provedor {nome}: {estatisticas}")
+    for nome, estado in resumo_agendadores().items():
+        print(f"Agendador {nome}: {estado}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,460 @@
+"""
+Modo em lote (OpenAI Batch API) para grandes volumes de currículos.
+
+Uso:
+    python lote_openai.py preparar content/curriculos_ia --lote lote_2024_06
+    python lote_openai.py enviar lote_2024_06
+    python lote_openai.py status lote_2024_06
+    python lote_openai.py baixar lote_2024_06
+    python lote_openai.py ingerir lote_2024_06 --saida resultados.jsonl
+
+Para testar sem a API, `simular` gera os arquivos de resultado localmente
+(no mesmo formato da Batch API) no lugar de `enviar`/`baixar`.
+
+`preparar` grava as requisições de chat completion em arquivos JSONL no
+formato da Batch API (requisicoes.NNN.jsonl) e um mapa (mapa.jsonl) que liga
+cada `custom_id` ao documento, à página e aos campos extraídos localmente.
+`ingerir` lê os arquivos de resultado (resultados.NNN.jsonl) e combina as
+páginas de cada documento com a mesma lógica do modo síncrono. Documentos com
+alguma página sem resultado válido ficam com erro (e fora do cache). Os
+concluídos vão ao cache de extração pela chave das páginas e pela chave do
+documento, a mesma que a fila de trabalhos consulta.
+"""
+import os
+import json
+import glob
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Tuple, Iterable, Callable
+
+from camada_texto import estimar_tokens_texto, estimar_tokens_imagem
+from cache_extracao import CacheExtracao, CAMINHO_CACHE_PADRAO, chave_documento_sha256
+from extracao_local import pre_extrair_campos, VALOR_AUSENTE
+from ingestao_lote import listar_arquivos, preparar_documento
+from modelo_curriculo import (
+    obter_cliente, CAMPOS_JSON, LIMITE_PAGINAS_REQUISICAO_UNICA,
+    montar_corpo_requisicao, interpretar_resposta, planejar_consulta, preparar_url_imagem,
+    tipo_conteudo_paginas, usar_requisicao_unica, chave_cache_paginas, opcoes_chave_documento,
+    combinar_dados_multiplas_paginas, MODELO, VERSAO_PROMPT
+)
+from metricas import uso_resposta, uso_vazio, somar_uso
+
+ENDPOINT_LOTE = "/v1/chat/completions"
+JANELA_CONCLUSAO = "24h"
+
+# Limites de um arquivo de entrada da Batch API (com folga no tamanho)
+MAX_REQUISICOES_ARQUIVO = 50000
+MAX_BYTES_ARQUIVO = 190 * 1024 * 1024
+
+# A Batch API cobra metade do preço das chamadas síncronas
+DESCONTO_LOTE = 0.5
+
+ARQUIVO_MAPA = "mapa.jsonl"
+ARQUIVO_LOTES = "lotes.json"
+PADRAO_REQUISICOES = "requisicoes.*.jsonl"
+
+# Estimativa de tokens de uma página renderizada (tamanho A4/Carta a 72 DPI) no simulador local
+TOKENS_IMAGEM_SIMULADA = estimar_tokens_imagem(612, 792)
+
+def montar_requisicoes_documento(
+    id_documento: str,
+    paginas: List[Dict[str, str]],
+    requisicao_unica: bool = True,
+    limite_paginas_requisicao_unica: int = LIMITE_PAGINAS_REQUISICAO_UNICA
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Monta as linhas da Batch API de um documento e o seu registro no mapa.
+
+    A divisão é a mesma de `analisar_curriculo_por_paginas`: uma requisição
+    para o documento inteiro (custom_id "<id>::doc") ou uma por página
+    ("<id>::<n>"), com a pré-extração local retirando campos do prompt.
+
+    Returns:
+        Tupla contendo: (linhas de requisição, registro do mapa)
+    """
+    paginas = [
+        pagina if "texto" in pagina else dict(pagina, imagem_url=preparar_url_imagem(pagina["imagem_url"]))
+        for pagina in paginas
+    ]
+    usa_requisicao_unica = usar_requisicao_unica(paginas, requisicao_unica, limite_paginas_requisicao_unica)
+    grupos = [("doc", paginas)] if usa_requisicao_unica else [(str(i + 1), [pagina]) for i, pagina in enumerate(paginas)]
+
+    linhas = []
+    requisicoes = []
+    for indice, paginas_grupo in grupos:
+        prompt, campos, campos_locais = planejar_consulta(paginas_grupo, tipo_conteudo_paginas(paginas_grupo))
+        custom_id = f"{id_documento}::{indice}"
+        if not campos:
+            # Tudo extraído localmente: a requisição não vai ao lote
+            requisicoes.append({"custom_id": custom_id, "campos_locais": campos_locais, "local": True})
+            continue
+        linhas.append({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": ENDPOINT_LOTE,
+            "body": montar_corpo_requisicao(prompt, paginas_grupo, campos)
+        })
+        requisicoes.append({"custom_id": custom_id, "campos_locais": campos_locais})
+
+    registro = {
+        "id_documento": id_documento,
+        "requisicoes": requisicoes,
+        "chave_cache": chave_cache_paginas(paginas, usa_requisicao_unica)
+    }
+    return linhas, registro
+
+def gravar_requisicoes(linhas: Iterable[Dict[str, Any]], diretorio_lote: str) -> List[str]:
+    """
+    Grava as linhas em requisicoes.NNN.jsonl, abrindo um novo arquivo ao atingir
+    o limite de requisições ou de bytes da Batch API.
+
+    Returns:
+        Caminhos dos arquivos gravados
+    """
+    caminhos = []
+    arquivo = None
+    quantidade = tamanho = 0
+    try:
+        for linha in linhas:
+            dados = (json.dumps(linha, ensure_ascii=False) + "\n").encode("utf-8")
+            if arquivo is None or quantidade >= MAX_REQUISICOES_ARQUIVO or tamanho + len(dados) > MAX_BYTES_ARQUIVO:
+                if arquivo is not None:
+                    arquivo.close()
+                caminhos.append(os.path.join(diretorio_lote, f"requisicoes.{len(caminhos) + 1:03d}.jsonl"))
+                arquivo = open(caminhos[-1], "wb")
+                quantidade = tamanho = 0
+            arquivo.write(dados)
+            quantidade += 1
+            tamanho += len(dados)
+    finally:
+        if arquivo is not None:
+            arquivo.close()
+    return caminhos
+
+def preparar_lote(
+    diretorio: str,
+    diretorio_lote: str,
+    processos: int = None,
+    recursivo: bool = False,
+    requisicao_unica: bool = True
+) -> Dict[str, int]:
+    """
+    Prepara os currículos da pasta (pool de processos) e grava os arquivos de
+    requisição e o mapa no diretório do lote.
+
+    Returns:
+        Contadores: documentos, requisicoes, arquivos, erros
+    """
+    os.makedirs(diretorio_lote, exist_ok=True)
+    arquivos = list(listar_arquivos(diretorio, recursivo))
+    print(f"Preparando {len(arquivos)} arquivo(s)...")
+    contadores = {"documentos": 0, "requisicoes": 0, "arquivos": 0, "erros": 0}
+
+    with open(os.path.join(diretorio_lote, ARQUIVO_MAPA), "w", encoding="utf-8") as mapa, \
+            ProcessPoolExecutor(max_workers=processos or os.cpu_count() or 1) as pool_cpu:
+
+        def gerar_linhas():
+            for preparado in pool_cpu.map(preparar_documento, arquivos):
+                registro = {"arquivo": preparado["arquivo"], "sha256": preparado.get("sha256"), "resumo_plano": preparado.get("resumo_plano")}
+                if "erro" in preparado:
+                    registro["erro"] = preparado["erro"]
+                    contadores["erros"] += 1
+                    print(f"ERRO {preparado['arquivo']}: {preparado['erro']}")
+                else:
+                    id_documento = hashlib.sha256(os.path.abspath(preparado["arquivo"]).encode("utf-8")).hexdigest()[:16]
+                    linhas, registro_lote = montar_requisicoes_documento(id_documento, preparado["paginas"], requisicao_unica)
+                    registro.update(registro_lote)
+                    registro["chave_documento"] = chave_documento_sha256(
+                        preparado["sha256"], MODELO, VERSAO_PROMPT, opcoes_chave_documento(requisicao_unica)
+                    )
+                    contadores["documentos"] += 1
+                    contadores["requisicoes"] += len(linhas)
+                    yield from linhas
+                mapa.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+        contadores["arquivos"] = len(gravar_requisicoes(gerar_linhas(), diretorio_lote))
+
+    return contadores
+
+def arquivos_requisicao(diretorio_lote: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(diretorio_lote, PADRAO_REQUISICOES)))
+
+def caminho_resultado(caminho_requisicoes: str) -> str:
+    """requisicoes.NNN.jsonl -> resultados.NNN.jsonl (no mesmo diretório)."""
+    diretorio, nome = os.path.split(caminho_requisicoes)
+    return os.path.join(diretorio, nome.replace("requisicoes.", "resultados.", 1))
+
+def carregar_lotes(diretorio_lote: str) -> Dict[str, Dict[str, Any]]:
+    caminho = os.path.join(diretorio_lote, ARQUIVO_LOTES)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+def salvar_lotes(diretorio_lote: str, lotes: Dict[str, Dict[str, Any]]):
+    with open(os.path.join(diretorio_lote, ARQUIVO_LOTES), "w", encoding="utf-8") as f:
+        json.dump(lotes, f, ensure_ascii=False, indent=2)
+
+def enviar_lote(diretorio_lote: str) -> Dict[str, Dict[str, Any]]:
+    """Envia cada arquivo de requisições ainda não enviado e registra o id do lote em lotes.json."""
+    client = obter_cliente()
+    if client is None:
+        raise RuntimeError("API Key não configurada")
+    lotes = carregar_lotes(diretorio_lote)
+    for caminho in arquivos_requisicao(diretorio_lote):
+        nome = os.path.basename(caminho)
+        if nome in lotes:
+            continue
+        with open(caminho, "rb") as f:
+            arquivo = client.files.create(file=f, purpose="batch")
+        lote = client.batches.create(
+            input_file_id=arquivo.id,
+            endpoint=ENDPOINT_LOTE,
+            completion_window=JANELA_CONCLUSAO,
+            metadata={"origem": "demmo-talent", "arquivo": nome}
+        )
+        lotes[nome] = {"id": lote.id, "status": lote.status}
+        # Grava a cada envio para não reenviar arquivos se a execução for interrompida
+        salvar_lotes(diretorio_lote, lotes)
+        print(f"{nome}: lote {lote.id} enviado")
+    return lotes
+
+def atualizar_status(diretorio_lote: str) -> Dict[str, Dict[str, Any]]:
+    """Consulta o status de cada lote enviado."""
+    client = obter_cliente()
+    if client is None:
+        raise RuntimeError("API Key não configurada")
+    lotes = carregar_lotes(diretorio_lote)
+    for nome, info in lotes.items():
+        lote = client.batches.retrieve(info["id"])
+        info.update({
+            "status": lote.status,
+            "output_file_id": lote.output_file_id,
+            "error_file_id": lote.error_file_id,
+            "concluidas": lote.request_counts.completed if lote.request_counts else None,
+            "falhas": lote.request_counts.failed if lote.request_counts else None,
+            "total": lote.request_counts.total if lote.request_counts else None
+        })
+        print(f"{nome}: {lote.status} ({info['concluidas']}/{info['total']} concluídas, {info['falhas']} falhas)")
+    salvar_lotes(diretorio_lote, lotes)
+    return lotes
+
+def baixar_resultados(diretorio_lote: str) -> List[str]:
+    """
+    Baixa os resultados dos lotes encerrados para resultados.NNN.jsonl
+    (saída e arquivo de erros da Batch API juntos).
+
+    Returns:
+        Caminhos dos arquivos de resultado gravados
+    """
+    gravados = []
+    client = obter_cliente()
+    for nome, info in atualizar_status(diretorio_lote).items():
+        if info["status"] not in ("completed", "expired", "cancelled", "failed"):
+            continue
+        destino = caminho_resultado(os.path.join(diretorio_lote, nome))
+        with open(destino, "wb") as f:
+            for file_id in (info.get("output_file_id"), info.get("error_file_id")):
+                if file_id:
+                    conteudo = client.files.content(file_id).content
+                    f.write(conteudo if conteudo.endswith(b"\n") or not conteudo else conteudo + b"\n")
+        gravados.append(destino)
+    return gravados
+
+def responder_localmente(corpo: Dict[str, Any]) -> str:
+    """
+    Resposta padrão do simulador: extrai localmente os campos do texto das
+    páginas e devolve "Não informado" nos demais.
+    """
+    textos = [parte["text"] for parte in corpo["messages"][0]["content"][1:] if parte["type"] == "text"]
+    dados = {campo: VALOR_AUSENTE for campo in CAMPOS_JSON}
+    dados.update(pre_extrair_campos("\n".join(textos)))
+    return json.dumps(dados, ensure_ascii=False)
+
+def gerar_resultados_locais(
+    caminho_requisicoes: str,
+    caminho_resultados: str = None,
+    responder: Callable[[Dict[str, Any]], str] = responder_localmente
+) -> str:
+    """
+    Substituto local da Batch API: lê um arquivo de requisições e grava o
+    arquivo de resultado correspondente, no mesmo formato da API.
+
+    `responder` recebe o corpo da requisição e retorna o conteúdo da mensagem
+    do modelo; se lançar uma exceção, a linha é gravada como erro.
+    """
+    caminho_resultados = caminho_resultados or caminho_resultado(caminho_requisicoes)
+    with open(caminho_requisicoes, encoding="utf-8") as entrada, \
+            open(caminho_resultados, "w", encoding="utf-8") as saida:
+        for numero, linha in enumerate(entrada, 1):
+            requisicao = json.loads(linha)
+            corpo = requisicao["body"]
+            resultado = {"id": f"batch_req_local_{numero}", "custom_id": requisicao["custom_id"], "response": None, "error": None}
+            try:
+                conteudo = responder(corpo)
+            except Exception as e:
+                resultado["error"] = {"code": "erro_local", "message": str(e)}
+            else:
+                partes = corpo["messages"][0]["content"]
+                tokens_entrada = sum(
+                    estimar_tokens_texto(parte["text"]) if parte["type"] == "text"
+                    else estimar_tokens_imagem(0, 0, "low") if parte["image_url"].get("detail") == "low"
+                    else TOKENS_IMAGEM_SIMULADA
+                    for parte in partes
+                )
+                tokens_saida = estimar_tokens_texto(conteudo)
+                resultado["response"] = {
+                    "status_code": 200,
+                    "request_id": f"local_{numero}",
+                    "body": {
+                        "object": "chat.completion",
+                        "model": corpo["model"],
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": conteudo}, "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": tokens_entrada, "completion_tokens": tokens_saida, "total_tokens": tokens_entrada + tokens_saida}
+                    }
+                }
+            saida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+    return caminho_resultados
+
+def interpretar_linha_resultado(resultado: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Converte uma linha de resultado da Batch API em (dados ou dict de erro, uso com tokens e custo sem desconto)."""
+    resposta = resultado.get("response")
+    if resultado.get("error") or not resposta or resposta.get("status_code") != 200:
+        erro = resultado.get("error") or (resposta or {}).get("body", {}).get("error") or {}
+        return {"erro": f"Erro no lote: {erro.get('message', 'requisição sem resposta')}"}, uso_vazio()
+    corpo = resposta["body"]
+    uso = uso_resposta(corpo["model"], corpo.get("usage"))
+    escolha = corpo["choices"][0]
+    return interpretar_resposta(escolha["message"].get("content") or "", escolha["message"].get("refusal"), escolha.get("finish_reason")), uso
+
+def carregar_resultados(caminhos_resultados: Iterable[str]) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Lê os arquivos de resultado e retorna {custom_id: (dados, uso)}."""
+    resultados = {}
+    for caminho in caminhos_resultados:
+        with open(caminho, encoding="utf-8") as f:
+            for linha in f:
+                if linha.strip():
+                    resultado = json.loads(linha)
+                    resultados[resultado["custom_id"]] = interpretar_linha_resultado(resultado)
+    return resultados
+
+def combinar_documento(registro: Dict[str, Any], resultados: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]) -> Tuple[Dict[str, Any], int, float]:
+    """
+    Combina as respostas das requisições de um documento (na ordem das páginas),
+    como em `analisar_curriculo_por_paginas`.
+
+    Returns:
+        Tupla contendo: (dados_curriculo, total_tokens, preco_total)
+    """
+    dados_por_requisicao = []
+    falhas = []
+    uso_total = uso_vazio()
+    for requisicao in registro["requisicoes"]:
+        if requisicao.get("local"):
+            dados_por_requisicao.append(dict(requisicao["campos_locais"]))
+            continue
+        dados, uso = resultados.get(requisicao["custom_id"], ({"erro": "Requisição sem resultado no lote"}, uso_vazio()))
+        if "erro" in dados:
+            falhas.append((requisicao["custom_id"].rsplit("::", 1)[1], dados["erro"]))
+        else:
+            dados.update(requisicao["campos_locais"])
+        dados_por_requisicao.append(dados)
+        uso_total = somar_uso(uso_total, uso)
+
+    if len(dados_por_requisicao) == 1:
+        dados_finais = dados_por_requisicao[0]
+    elif falhas:
+        # Como no modo síncrono: combinar sem as páginas que falharam perderia campos sem aviso
+        numeros = ", ".join(numero for numero, _ in falhas)
+        dados_finais = {"erro": f"Falha na análise da(s) página(s) {numeros}: {falhas[0][1]}"}
+    else:
+        dados_finais = combinar_dados_multiplas_paginas(dados_por_requisicao)
+    return dados_finais, uso_total["total_tokens"], uso_total["custo_usd"] * DESCONTO_LOTE
+
+def ingerir_lote(diretorio_lote: str, caminho_saida: str, cache: CacheExtracao = None) -> Dict[str, int]:
+    """
+    Lê os resultados do lote, combina por documento e grava um registro por
+    documento no JSONL de saída (mesmo formato de `ingestao_lote`).
+
+    Returns:
+        Contadores: concluidos, erros, pendentes (requisições sem arquivo de resultado)
+    """
+    caminhos = [caminho_resultado(c) for c in arquivos_requisicao(diretorio_lote)]
+    existentes = [c for c in caminhos if os.path.exists(c)]
+    if len(existentes) < len(caminhos):
+        print(f"Aviso: {len(caminhos) - len(existentes)} arquivo(s) de resultado ainda não disponível(is).")
+    resultados = carregar_resultados(existentes)
+
+    contadores = {"concluidos": 0, "erros": 0, "pendentes": 0}
+    with open(os.path.join(diretorio_lote, ARQUIVO_MAPA), encoding="utf-8") as mapa, \
+            open(caminho_saida, "a", encoding="utf-8") as saida:
+        for linha in mapa:
+            registro = json.loads(linha)
+            saida_registro = {"arquivo": registro["arquivo"], "sha256": registro["sha256"], "resumo_plano": registro["resumo_plano"]}
+            if "erro" in registro:
+                saida_registro["erro"] = registro["erro"]
+            else:
+                contadores["pendentes"] += sum(1 for r in registro["requisicoes"] if not r.get("local") and r["custom_id"] not in resultados)
+                dados, total_tokens, preco_total = combinar_documento(registro, resultados)
+                saida_registro.update({"dados": dados, "total_tokens": total_tokens, "preco_total": preco_total})
+                if "erro" in dados:
+                    saida_registro["erro"] = dados["erro"]
+                elif cache is not None:
+                    for chave in (registro["chave_cache"], registro.get("chave_documento")):
+                        if chave:
+                            cache.salvar(chave, dados, total_tokens, preco_total)
+            contadores["erros" if "erro" in saida_registro else "concluidos"] += 1
+            saida.write(json.dumps(saida_registro, ensure_ascii=False) + "\n")
+    return contadores
+
+def main():
+    parser = argparse.ArgumentParser(description="Extração de currículos em lote pela OpenAI Batch API.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    preparar = subparsers.add_parser("preparar", help="Gera os arquivos de requisição e o mapa do lote")
+    preparar.add_argument("diretorio", help="Pasta com os currículos (.pdf, .doc, .docx)")
+    preparar.add_argument("--lote", required=True, help="Diretório de trabalho do lote")
+    preparar.add_argument("--processos", type=int, default=None, help="Processos para extração/renderização (padrão: núcleos da CPU)")
+    preparar.add_argument("--recursivo", action="store_true", help="Inclui subpastas")
+    preparar.add_argument("--por-pagina", action="store_true", help="Uma requisição por página em vez de uma por documento")
+
+    for comando, ajuda in (
+        ("enviar", "Envia os arquivos de requisição à Batch API"),
+        ("status", "Mostra o status dos lotes enviados"),
+        ("baixar", "Baixa os resultados dos lotes encerrados"),
+        ("simular", "Gera os resultados localmente, sem a API (testes)")
+    ):
+        subparsers.add_parser(comando, help=ajuda).add_argument("lote", help="Diretório de trabalho do lote")
+
+    ingerir = subparsers.add_parser("ingerir", help="Combina os resultados por documento")
+    ingerir.add_argument("lote", help="Diretório de trabalho do lote")
+    ingerir.add_argument("--saida", default="resultados.jsonl", help="Arquivo JSONL de saída (acrescenta ao final)")
+    ingerir.add_argument("--cache", default=CAMINHO_CACHE_PADRAO, help="Arquivo do cache de extração")
+    ingerir.add_argument("--sem-cache", action="store_true", help="Não grava os resultados no cache de extração")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.comando == "preparar":
+        contadores = preparar_lote(args.diretorio, args.lote, args.processos, args.recursivo, not args.por_pagina)
+        print(f"\nDocumentos: {contadores['documentos']} · Requisições: {contadores['requisicoes']} · "
+              f"Arquivos: {contadores['arquivos']} · Erros: {contadores['erros']}")
+    elif args.comando == "enviar":
+        enviar_lote(args.lote)
+    elif args.comando == "status":
+        atualizar_status(args.lote)
+    elif args.comando == "baixar":
+        for caminho in baixar_resultados(args.lote):
+            print(f"Resultados gravados em {caminho}")
+    elif args.comando == "simular":
+        for caminho in arquivos_requisicao(args.lote):
+            print(f"Resultados simulados gravados em {gerar_resultados_locais(caminho)}")
+    elif args.comando == "ingerir":
+        contadores = ingerir_lote(args.lote, args.saida, None if args.sem_cache else CacheExtracao(args.cache))
+        print(f"\nConcluídos: {contadores['concluidos']} · Erros: {contadores['erros']} · "
+              f"Requisições pendentes: {contadores['pendentes']}")
+    print(f"Tempo total: {time.perf_counter() - inicio:.1f} s")
+
+if __name__ == "__main__":
+    main()
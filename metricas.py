@@ -0,0 +1,188 @@
+"""
+Instrumentação por etapa: tempo, tokens, custo e retentativas.
+
+Cada etapa medida com `medir` gera uma linha JSON no logger "metricas"
+(stderr por padrão, ou o arquivo em METRICAS_ARQUIVO) e alimenta contadores
+e histogramas de latência do processo, consultáveis com `resumo()`.
+
+    with medir("chamada_llm", modelo=MODELO) as info:
+        response = client.chat.completions.create(...)
+        info.update(uso_resposta(MODELO, response.usage))
+"""
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator
+
+# Preço por 1 milhão de tokens (entrada, saída), em US$
+PRECOS_MODELOS = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "claude-3-7-sonnet": (3.00, 15.00),
+}
+
+# Limites superiores (ms) dos intervalos dos histogramas de latência
+LIMITES_HISTOGRAMA_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, float("inf"))
+
+logger = logging.getLogger("metricas")
+if not logger.handlers:
+    _caminho_log = os.getenv("METRICAS_ARQUIVO")
+    _handler = logging.FileHandler(_caminho_log, encoding="utf-8") if _caminho_log else logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+def precos_modelo(modelo: str):
+    """Preços (entrada, saída) do modelo; aceita nomes com versão (gpt-4o-2024-08-06, ARNs do Bedrock)."""
+    for nome in sorted(PRECOS_MODELOS, key=len, reverse=True):
+        if nome in modelo:
+            return PRECOS_MODELOS[nome]
+    raise KeyError(f"Modelo sem preço cadastrado: {modelo}")
+
+def calcular_custo(modelo: str, tokens_entrada: int, tokens_saida: int = 0) -> float:
+    """Custo em US$ de uma chamada, com os preços de entrada e saída do modelo."""
+    preco_entrada, preco_saida = precos_modelo(modelo)
+    return (tokens_entrada * preco_entrada + tokens_saida * preco_saida) / 1_000_000
+
+def uso_vazio() -> Dict[str, Any]:
+    return {"tokens_entrada": 0, "tokens_saida": 0, "total_tokens": 0, "custo_usd": 0.0}
+
+def uso_resposta(modelo: str, usage) -> Dict[str, Any]:
+    """Converte o `usage` da resposta (objeto da SDK ou dict) em tokens e custo."""
+    if usage is None:
+        return uso_vazio()
+    if not isinstance(usage, dict):
+        usage = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+    entrada = usage.get("prompt_tokens", 0) or 0
+    saida = usage.get("completion_tokens", 0) or 0
+    return {
+        "tokens_entrada": entrada,
+        "tokens_saida": saida,
+        "total_tokens": entrada + saida,
+        "custo_usd": calcular_custo(modelo, entrada, saida)
+    }
+
+def somar_uso(*usos: Dict[str, Any]) -> Dict[str, Any]:
+    total = uso_vazio()
+    for uso in usos:
+        for chave in total:
+            total[chave] += uso.get(chave, 0)
+    return total
+
+class Histograma:
+    """Histograma de intervalos fixos: pode ser somado entre processos e execuções."""
+
+    def __init__(self):
+        self.contagens = [0] * len(LIMITES_HISTOGRAMA_MS)
+        self.n = 0
+        self.soma = 0.0
+        self.minimo = float("inf")
+        self.maximo = 0.0
+
+    def observar(self, valor: float):
+        for i, limite in enumerate(LIMITES_HISTOGRAMA_MS):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+        self.n += 1
+        self.soma += valor
+        self.minimo = min(self.minimo, valor)
+        self.maximo = max(self.maximo, valor)
+
+    def percentil(self, p: float) -> float:
+        """Percentil aproximado: limite superior do intervalo que o contém (limitado ao máximo observado)."""
+        alvo = p * self.n
+        acumulado = 0
+        for limite, contagem in zip(LIMITES_HISTOGRAMA_MS, self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return min(limite, self.maximo)
+        return self.maximo
+
+    def resumo(self) -> Dict[str, Any]:
+        if not self.n:
+            return {"n": 0}
+        return {
+            "n": self.n,
+            "media": self.soma / self.n,
+            "min": self.minimo,
+            "p50": self.percentil(0.5),
+            "p95": self.percentil(0.95),
+            "max": self.maximo,
+            "intervalos": dict(zip([str(l) for l in LIMITES_HISTOGRAMA_MS], self.contagens))
+        }
+
+class Metricas:
+    """Contadores e histogramas do processo (seguros entre threads)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.contadores: Dict[str, float] = {}
+        self.histogramas: Dict[str, Histograma] = {}
+
+    def contar(self, nome: str, valor: float = 1):
+        with self._lock:
+            self.contadores[nome] = self.contadores.get(nome, 0) + valor
+
+    def observar(self, nome: str, valor: float):
+        with self._lock:
+            self.histogramas.setdefault(nome, Histograma()).observar(valor)
+
+    def registrar_etapa(self, etapa: str, duracao_ms: float, info: Dict[str, Any]):
+        """Atualiza os agregados da etapa e emite a linha JSON do evento."""
+        self.contar(f"{etapa}.chamadas")
+        if info.get("status") == "erro":
+            self.contar(f"{etapa}.erros")
+        self.observar(f"{etapa}.ms", duracao_ms)
+        for chave in ("tokens_entrada", "tokens_saida", "custo_usd", "retentativas"):
+            if info.get(chave):
+                self.contar(f"{etapa}.{chave}", info[chave])
+        logger.info(json.dumps({"ts": time.time(), "etapa": etapa, "duracao_ms": round(duracao_ms, 2), **info}, ensure_ascii=False, default=str))
+
+    def resumo(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "contadores": dict(self.contadores),
+                "histogramas": {nome: h.resumo() for nome, h in self.histogramas.items()}
+            }
+
+    def reiniciar(self):
+        with self._lock:
+            self.contadores.clear()
+            self.histogramas.clear()
+
+# Agregados do processo
+metricas = Metricas()
+
+@contextmanager
+def medir(etapa: str, **campos) -> Iterator[Dict[str, Any]]:
+    """
+    Mede o tempo de parede de uma etapa. O dicionário retornado pode receber
+    campos extras (tokens, custo, retentativas...) que vão para a linha JSON;
+    exceções marcam o evento com status "erro" e são propagadas. Dentro de um
+    gerador encerrado antes do fim (GeneratorExit, ex.: o consumidor parou de
+    ler o streaming), o evento fica com status "cancelado".
+    """
+    info = dict(campos)
+    inicio = time.perf_counter()
+    try:
+        yield info
+    except GeneratorExit:
+        info["status"] = "cancelado"
+        raise
+    except Exception as e:
+        info["status"] = "erro"
+        info["erro"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        info.setdefault("status", "ok")
+        metricas.registrar_etapa(etapa, (time.perf_counter() - inicio) * 1000, info)
+
+def resumo() -> Dict[str, Any]:
+    return metricas.resumo()
@@ -1,16 +1,30 @@
 import os 
 from pathlib import Path
-import json
 import re
+import io
+import base64
+import time
+import threading
 import requests
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional, Callable, Iterator, Generator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from openai import OpenAI
 import streamlit as st
+from cache_extracao import CacheExtracao, chave_paginas
+from extracao_local import pre_extrair_campos, validar_dados_extraidos, VALOR_AUSENTE
+from metricas import medir, metricas, uso_resposta, uso_vazio, somar_uso
+from camada_texto import estimar_tokens_texto, estimar_tokens_imagem
+from agendador import obter_agendador
+from esquema_curriculo import CAMPOS_JSON, CAMPOS_OBRIGATORIOS, VERSAO_PROMPT, LeitorJsonIncremental, montar_prompt, esquema_resposta, decodificar_resposta
 
 
 
-# Obtém a chave da OpenAI a partir do secrets.toml
-api_key = st.secrets["OPENAI_API_KEY"]
+def obter_api_key() -> str:
+    """Obtém a chave da OpenAI do secrets.toml ou, fora do Streamlit, da variável de ambiente."""
+    try:
+        return st.secrets["OPENAI_API_KEY"]
+    except Exception:
+        return os.getenv("OPENAI_API_KEY")
 
 # # Carrega as variáveis de ambiente
 # from dotenv import load_dotenv 
@@ -18,8 +32,55 @@ api_key = st.secrets["OPENAI_API_KEY"]
 # load_dotenv(dotenv_path)
 # api_key = os.getenv("OPENAI_API_KEY")
 
-# Inicializa o cliente OpenAI
-client = OpenAI(api_key=api_key)
+def criar_cliente(api_key: str = None) -> Optional[OpenAI]:
+    """
+    Cria o cliente OpenAI; sem chave retorna None e as funções de extração
+    retornam o erro "API Key não configurada".
+    """
+    api_key = api_key or obter_api_key()
+    # As retentativas são feitas em chamar_modelo, para que sejam medidas
+    return OpenAI(api_key=api_key, max_retries=0) if api_key else None
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+def definir_cliente(cliente: Optional[OpenAI]) -> None:
+    """Define o cliente usado pelo módulo (ex.: o cliente mantido em st.cache_resource pelo app)."""
+    global _cliente
+    with _cliente_lock:
+        _cliente = cliente
+
+def obter_cliente() -> Optional[OpenAI]:
+    """Retorna o cliente do processo, criado na primeira chamada (e não na importação)."""
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            _cliente = criar_cliente()
+        return _cliente
+
+# Roteador de provedores (provedores.Roteador); None = chamada direta à OpenAI
+_roteador = None
+
+def definir_roteador(roteador) -> None:
+    """Encaminha as consultas sem streaming para um roteador de provedores (None desativa)."""
+    global _roteador
+    _roteador = roteador
+
+def cliente_disponivel(ao_receber_campo: Callable = None) -> bool:
+    """Há como consultar o modelo: cliente OpenAI ou, sem streaming, um roteador de provedores."""
+    return obter_cliente() is not None or (_roteador is not None and ao_receber_campo is None)
+
+# Modelo usado na extração
+MODELO = "gpt-4o"
+
+# Número máximo de páginas analisadas simultaneamente por currículo
+MAX_PAGINAS_PARALELAS = 4
+
+# Acima deste número de páginas a requisição única volta para uma chamada por página
+LIMITE_PAGINAS_REQUISICAO_UNICA = 4
+
+# Tokens estimados de uma imagem por URL externa (tamanho desconhecido): página A4/carta em "high"
+TOKENS_IMAGEM_EXTERNA = estimar_tokens_imagem(612, 792)
 
 def link_drive_direto(link: str) -> str:
     """Converte link do Google Drive para formato direto."""
@@ -29,258 +90,436 @@ def link_drive_direto(link: str) -> str:
         return f"https://drive.google.com/uc?export=view&id={file_id}"
     return link
 
+def imagem_para_data_url(imagem_bytes: bytes, mime_type: str = "image/png") -> str:
+    """Codifica os bytes de uma imagem como data URL base64, sem hospedagem externa."""
+    return f"data:{mime_type};base64,{base64.b64encode(imagem_bytes).decode('utf-8')}"
+
+def descrever_url_imagem(url: str) -> str:
+    """Resumo legível da URL para logs (data URLs são muito longas para imprimir)."""
+    if url.startswith("data:"):
+        return f"imagem embutida ({len(url) // 1024} KB)"
+    return url
+
 def validar_url_imagem(url: str) -> bool:
     """Valida se a URL da imagem é acessível."""
     try:
-        response = requests.head(url, timeout=10)
+        with medir("validacao_url") as info:
+            response = requests.head(url, timeout=10)
+            info["status_http"] = response.status_code
         return response.status_code == 200
     except Exception as e:
         print(f"Aviso: Não foi possível validar a URL: {e}")
         return True  # Assume que está ok se não conseguir validar
 
-def extrair_dados_curriculo_single(imagem_url: str) -> Dict[str, Any]:
+def preparar_url_imagem(imagem_url: str) -> str:
+    """Converte links do Drive e valida URLs externas; data URLs seguem inalteradas."""
+    # Imagens embutidas (data URL) não precisam de conversão nem validação
+    if imagem_url.startswith("data:"):
+        return imagem_url
+    
+    # Converte link do Drive se necessário
+    if "drive.google.com" in imagem_url:
+        imagem_url = link_drive_direto(imagem_url)
+        print(f"URL convertida: {imagem_url}")
+    
+    # Valida a URL (opcional)
+    validar_url_imagem(imagem_url)
+    return imagem_url
+
+def tipo_conteudo_paginas(paginas: List[Dict[str, str]]) -> str:
+    """Retorna "imagem", "texto" ou "misto" conforme o conteúdo das páginas."""
+    tipos = {"texto" if "texto" in pagina else "imagem" for pagina in paginas}
+    return tipos.pop() if len(tipos) == 1 else "misto"
+
+def montar_corpo_requisicao(prompt: str, paginas: List[Dict[str, str]], campos: List[str] = None) -> Dict[str, Any]:
+    """
+    Monta o corpo da requisição de chat completion com o prompt e as páginas.
+    
+    Cada página é um dicionário com "imagem_url" (imagem para o modelo de visão,
+    com "detail" opcional) ou "texto" (camada de texto já extraída do PDF). A resposta é restrita ao
+    JSON Schema dos `campos` pedidos (structured outputs).
+    """
+    conteudo = [
+        {
+            "type": "text",
+            "text": prompt
+        }
+    ]
+    for i, pagina in enumerate(paginas):
+        if "texto" in pagina:
+            conteudo.append({
+                "type": "text",
+                "text": f"--- Página {i+1} (texto extraído) ---\n{pagina['texto']}"
+            })
+        else:
+            conteudo.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": pagina["imagem_url"],
+                    "detail": pagina.get("detail", "high")  # "high" por padrão, para análise mais detalhada
+                }
+            })
+    
+    return {
+        "model": MODELO,
+        "messages": [
+            {
+                "role": "user",
+                "content": conteudo
+            }
+        ],
+        "response_format": esquema_resposta(campos),
+        "max_tokens": 4000,
+        "temperature": 0
+    }
+
+def interpretar_resposta(resultado: str, recusa: str = None, motivo_fim: str = None) -> Dict[str, Any]:
+    """Converte a resposta do modelo em dados validados; retorna um dict de erro se não for possível."""
+    if recusa:
+        print(f"O modelo recusou a extração: {recusa}")
+        return {"erro": f"O modelo recusou a extração: {recusa}"}
+    if motivo_fim == "length":
+        # JSON cortado pelo limite de tokens: não há como recuperar o objeto
+        return {"erro": "Resposta interrompida pelo limite de tokens", "resposta_bruta": resultado}
+    
+    try:
+        dados_extraidos = decodificar_resposta(resultado)
+    except ValueError as e:
+        print(f"Erro ao decodificar JSON: {e}")
+        print(f"Resposta completa recebida: {resultado}")
+        return {"erro": "Resposta não está em formato JSON válido", "resposta_bruta": resultado}
+    
+    # Confere CPF, PIS, e-mail, telefones e CEP (dígitos verificadores, DDD, formato)
+    return validar_dados_extraidos(dados_extraidos)
+
+def estimar_tokens_imagem_url(url: str, detail: str = "high") -> int:
+    """Tokens estimados de uma imagem; em data URLs o tamanho vem do cabeçalho da imagem."""
+    if detail == "low":
+        return estimar_tokens_imagem(0, 0, "low")
+    if not url.startswith("data:"):
+        return TOKENS_IMAGEM_EXTERNA
+    try:
+        from PIL import Image
+        largura, altura = Image.open(io.BytesIO(base64.b64decode(url.split(",", 1)[1]))).size
+    except Exception:
+        return TOKENS_IMAGEM_EXTERNA
+    return estimar_tokens_imagem(largura, altura, detail)
+
+def estimar_tokens_corpo(corpo: Dict[str, Any]) -> int:
+    """
+    Tokens que a requisição pode consumir: texto e imagens enviados mais o
+    máximo de saída. É o que o agendador reserva antes da chamada.
+    """
+    tokens = corpo.get("max_tokens", 0)
+    for mensagem in corpo["messages"]:
+        conteudo = mensagem["content"]
+        if isinstance(conteudo, str):
+            tokens += estimar_tokens_texto(conteudo)
+            continue
+        for parte in conteudo:
+            if parte["type"] == "text":
+                tokens += estimar_tokens_texto(parte["text"])
+            else:
+                tokens += estimar_tokens_imagem_url(parte["image_url"]["url"], parte["image_url"].get("detail", "high"))
+    return tokens
+
+def criar_com_retentativas(corpo: Dict[str, Any]) -> Tuple[Any, int]:
+    """
+    Faz a chamada de chat completion pelo agendador do modelo: respeita os
+    limites de requisições e tokens por minuto e repete erros transitórios
+    (limite de taxa, conexão, timeout, erro 5xx) com espera exponencial e
+    Retry-After (ver `agendador`).
+    
+    Em streams o uso real só chega no fim, então fica valendo a estimativa.
+    
+    Returns:
+        Tupla contendo: (resposta ou stream, número de retentativas)
+    """
+    return obter_agendador(corpo["model"]).executar(
+        lambda: obter_cliente().chat.completions.create(**corpo),
+        estimar_tokens_corpo(corpo),
+        tokens_usados=lambda resposta: resposta.usage.total_tokens if not corpo.get("stream") and resposta.usage else None
+    )
+
+def chamar_modelo(corpo: Dict[str, Any]):
+    """
+    Faz a chamada de chat completion com retentativas (ver `criar_com_retentativas`).
+    
+    Registra a etapa "chamada_llm" com tempo, tokens, custo e retentativas.
+    """
+    with medir("chamada_llm", modelo=corpo["model"]) as info:
+        response, info["retentativas"] = criar_com_retentativas(corpo)
+        info.update(uso_resposta(corpo["model"], response.usage))
+    return response
+
+def chamar_modelo_stream(corpo: Dict[str, Any]) -> Iterator[Any]:
+    """
+    Versão em streaming de `chamar_modelo`: gera os chunks da resposta à medida
+    que chegam. As retentativas só cobrem a abertura do stream; o uso de tokens
+    vem no último chunk (`include_usage`).
+    
+    Registra a etapa "chamada_llm" também com o tempo até o primeiro token.
+    """
+    corpo = dict(corpo, stream=True, stream_options={"include_usage": True})
+    inicio = time.perf_counter()
+    with medir("chamada_llm", modelo=corpo["model"], streaming=True) as info:
+        stream, info["retentativas"] = criar_com_retentativas(corpo)
+        for chunk in stream:
+            if chunk.usage:
+                info.update(uso_resposta(corpo["model"], chunk.usage))
+            if "primeiro_token_ms" not in info and chunk.choices and chunk.choices[0].delta.content:
+                info["primeiro_token_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+            yield chunk
+
+def consultar_modelo(
+    prompt: str,
+    paginas: List[Dict[str, str]],
+    campos: List[str] = None,
+    ao_receber_campo: Callable[[str, Any], None] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Envia o prompt e as páginas em uma única requisição e interpreta o JSON retornado.
+    
+    Com `ao_receber_campo`, a resposta vem em streaming e cada campo é
+    repassado a `ao_receber_campo(campo, valor)` assim que termina de chegar.
+    Sem streaming, se houver um roteador de provedores configurado
+    (`definir_roteador`), a requisição vai para o provedor escolhido por ele.
+    
+    Returns:
+        Tupla contendo: (dados_extraidos ou dict de erro, uso com tokens de
+        entrada/saída e custo)
+    """
+    if ao_receber_campo is not None:
+        # O streaming campo a campo só existe na chamada direta à OpenAI
+        return consumir_campos(consultar_modelo_stream(prompt, paginas, campos), ao_receber_campo)
+    if _roteador is not None:
+        return _roteador.extrair(prompt, paginas, campos)
+    return consultar_openai(prompt, paginas, campos)
+
+def consultar_openai(prompt: str, paginas: List[Dict[str, str]], campos: List[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Chamada direta à OpenAI (sem streaming e sem roteador); mesmo retorno de `consultar_modelo`."""
+    print("Enviando requisição para GPT-4 Vision...")
+    
+    # Faz a chamada para a API usando apenas as URLs (e textos extraídos)
+    response = chamar_modelo(montar_corpo_requisicao(prompt, paginas, campos))
+    
+    # Extrai o conteúdo da resposta
+    escolha = response.choices[0]
+    resultado = escolha.message.content or ""
+    uso = uso_resposta(MODELO, response.usage)
+    
+    print(f"Resposta bruta recebida: {resultado[:200]}...")
+    
+    with medir("interpretacao_json") as info:
+        dados = interpretar_resposta(resultado, getattr(escolha.message, "refusal", None), escolha.finish_reason)
+        if "erro" in dados:
+            info["status"] = "erro"
+    return dados, uso
+
+def consultar_modelo_stream(
+    prompt: str,
+    paginas: List[Dict[str, str]],
+    campos: List[str] = None
+) -> Generator[Tuple[str, Any], None, Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Versão em streaming de `consultar_modelo`: gera (campo, valor) à medida que
+    cada campo do JSON termina de chegar, já com a validação local aplicada.
+    
+    O valor de retorno do gerador (`yield from`) é o mesmo de `consultar_modelo`:
+    (dados_extraidos ou dict de erro, uso).
+    """
+    print("Enviando requisição para GPT-4 Vision (streaming)...")
+    
+    leitor = LeitorJsonIncremental()
+    recusa = ""
+    motivo_fim = None
+    uso = uso_vazio()
+    for chunk in chamar_modelo_stream(montar_corpo_requisicao(prompt, paginas, campos)):
+        if chunk.usage:
+            uso = uso_resposta(MODELO, chunk.usage)
+        if not chunk.choices:
+            continue
+        escolha = chunk.choices[0]
+        motivo_fim = escolha.finish_reason or motivo_fim
+        recusa += getattr(escolha.delta, "refusal", None) or ""
+        if escolha.delta.content:
+            for campo, valor in leitor.alimentar(escolha.delta.content):
+                yield campo, validar_dados_extraidos({campo: valor})[campo]
+    
+    print(f"Resposta bruta recebida: {leitor.texto[:200]}...")
+    
+    with medir("interpretacao_json") as info:
+        dados = interpretar_resposta(leitor.texto, recusa or None, motivo_fim)
+        if "erro" in dados:
+            info["status"] = "erro"
+    return dados, uso
+
+def consumir_campos(gerador: Generator, ao_receber_campo: Callable[[str, Any], None]):
+    """Repassa cada (campo, valor) do gerador ao callback e retorna o valor final do gerador."""
+    while True:
+        try:
+            campo, valor = next(gerador)
+        except StopIteration as fim:
+            return fim.value
+        ao_receber_campo(campo, valor)
+
+def planejar_consulta(paginas: List[Dict[str, str]], tipo_conteudo: str, campos: List[str] = None) -> Tuple[str, List[str], Dict[str, str]]:
+    """
+    Pré-extrai localmente CPF, PIS, e-mail, celular, telefone e CEP das páginas
+    de texto e monta o prompt só com os campos restantes (dentre `campos`,
+    padrão: todos).
+    
+    Returns:
+        Tupla contendo: (prompt, campos pedidos ao modelo, campos_locais)
+    """
+    campos = list(CAMPOS_JSON) if campos is None else campos
+    texto = "\n".join(pagina["texto"] for pagina in paginas if "texto" in pagina)
+    campos_locais = {campo: valor for campo, valor in pre_extrair_campos(texto).items() if campo in campos}
+    campos = [campo for campo in campos if campo not in campos_locais]
+    return montar_prompt(len(paginas), tipo_conteudo, campos), campos, campos_locais
+
+def consultar_com_pre_extracao(
+    paginas: List[Dict[str, str]],
+    tipo_conteudo: str,
+    ao_receber_campo: Callable[[str, Any], None] = None,
+    campos: List[str] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Consulta o modelo pedindo apenas os campos que a extração local não encontrou.
+    
+    CPF, PIS, e-mail, celular, telefone e CEP presentes nas páginas de texto são
+    extraídos por regex/dígito verificador e retirados do prompt, reduzindo os
+    tokens de entrada e de saída. Com `ao_receber_campo` (streaming), os campos
+    locais são repassados antes mesmo da chamada ao modelo. `campos` restringe
+    a consulta a um subconjunto de CAMPOS_JSON (padrão: todos).
+    """
+    prompt, campos, campos_locais = planejar_consulta(paginas, tipo_conteudo, campos)
+    if campos_locais:
+        print(f"Campos extraídos localmente: {list(campos_locais.keys())}")
+        if ao_receber_campo is not None:
+            for campo, valor in campos_locais.items():
+                ao_receber_campo(campo, valor)
+    if not campos:
+        # Todos os campos pedidos saíram da extração local: nada a perguntar ao modelo
+        return dict(campos_locais), uso_vazio()
+    
+    dados, uso = consultar_modelo(prompt, paginas, campos, ao_receber_campo)
+    if "erro" not in dados:
+        dados.update(campos_locais)
+    return dados, uso
+
+def extrair_dados_curriculo_single(
+    imagem_url: str,
+    detail: str = "high",
+    ao_receber_campo: Callable[[str, Any], None] = None,
+    campos: List[str] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """
     Extrai dados estruturados de um currículo em uma única imagem usando OpenAI Vision.
+    Com `ao_receber_campo`, a resposta vem em streaming (ver `consultar_modelo`);
+    `campos` restringe o prompt e o schema a um subconjunto de CAMPOS_JSON.
     """
     
-    if not api_key:
-        return {"erro": "API Key não configurada"}
+    if not cliente_disponivel(ao_receber_campo):
+        return {"erro": "API Key não configurada"}, uso_vazio()
     
     try:
-        # Converte link do Drive se necessário
-        if "drive.google.com" in imagem_url:
-            imagem_url = link_drive_direto(imagem_url)
-            print(f"URL convertida: {imagem_url}")
-        
-        # Valida a URL (opcional)
-        validar_url_imagem(imagem_url)
-        
-        # Estrutura de dados esperada com instruções específicas
-        campos_json = {
-            "nome": {
-                "descricao": "Nome completo da pessoa",
-                "instrucoes": "Extraia o nome completo. Se houver apenas nome ou sobrenome, use o que estiver disponível. Mantenha acentos e formatação original."
-            },
-            "email": {
-                "descricao": "Email válido",
-                "instrucoes": "Procure por endereços de e-mail no formato usuario@dominio.com. Se houver múltiplos e-mails, use o principal ou primeiro encontrado."
-            },
-            "cpf": {
-                "descricao": "CPF no formato 123.456.789-00",
-                "instrucoes": "Localize números de CPF. Formate com pontos e hífen (123.456.789-00). Se estiver sem formatação, aplique a formatação correta."
-            },
-            "celular": {
-                "descricao": "Celular no formato (XX)XXXXX-XXXX",
-                "instrucoes": "Identifique números de celular (9 dígitos). Formate como (XX)XXXXX-XXXX. Se não tiver DDD, use apenas o número disponível."
-            },
-            "telefone": {
-                "descricao": "Telefone fixo no formato (XX)XXXX-XXXX",
-                "instrucoes": "Procure telefones fixos (8 dígitos). Formate como (XX)XXXX-XXXX. Diferente de celular por não ter o 9 na frente."
-            },
-            "idade": {
-                "descricao": "Idade em anos",
-                "instrucoes": "Procure pela idade em anos. Se encontrar data de nascimento, calcule a idade aproximada. Use apenas números."
-            },
-            "pis": {
-                "descricao": "Número do PIS/PASEP",
-                "instrucoes": "Localize o número PIS ou PASEP. Mantenha apenas os números, sem formatação especial."
-            },
-            "rg": {
-                "descricao": "Número do RG",
-                "instrucoes": "Encontre o número do RG/Identidade. Mantenha o formato original encontrado no documento."
-            },
-            "ctps": {
-                "descricao": "Número da Carteira de Trabalho",
-                "instrucoes": "Procure pelo número da CTPS (Carteira de Trabalho). Pode aparecer como 'Carteira de Trabalho' ou 'CTPS'."
-            },
-            "habilitacao": {
-                "descricao": "Categoria da habilitação (CNH)",
-                "instrucoes": "Identifique a categoria da CNH (A, B, C, D, E, AB, AC, etc.). Se só mencionar 'habilitado', use essa informação."
-            },
-            "estado_civil": {
-                "descricao": "Estado civil",
-                "instrucoes": "Procure por estado civil: solteiro(a), casado(a), divorciado(a), viúvo(a), união estável, etc."
-            },
-            "sexo": {
-                "descricao": "Sexo/Gênero",
-                "instrucoes": "Identifique o sexo: Masculino, Feminino, ou como estiver descrito no documento."
-            },
-            "objetivos_profissionais": {
-                "descricao": "Objetivos profissionais",
-                "instrucoes": "Extraia o texto completo da seção de objetivos profissionais, metas de carreira, ou objetivos. Mantenha o texto original."
-            },
-            "resumo_profissional": {
-                "descricao": "Resumo profissional ou perfil",
-                "instrucoes": "Copie o texto do resumo profissional, perfil profissional, ou descrição das competências. Preserve o conteúdo completo."
-            },
-            "pretensao_salarial": {
-                "descricao": "Pretensão salarial",
-                "instrucoes": "Procure por valores de pretensão salarial. Mantenha o formato original (R$ 1.000,00, por exemplo)."
-            },
-            "uf": {
-                "descricao": "Estado (sigla)",
-                "instrucoes": "Identifique a sigla do estado (SP, RJ, MG, etc.). Use sempre a sigla de 2 letras em maiúsculo."
-            },
-            "cidade": {
-                "descricao": "Cidade",
-                "instrucoes": "Extraia o nome da cidade onde a pessoa reside. Mantenha a grafia original."
-            },
-            "cep": {
-                "descricao": "CEP no formato XXXXX-XXX",
-                "instrucoes": "Localize o CEP. Formate como XXXXX-XXX (5 dígitos, hífen, 3 dígitos). Se estiver sem hífen, adicione a formatação."
-            },
-            "logradouro": {
-                "descricao": "Logradouro (rua, avenida, etc.)",
-                "instrucoes": "Extraia o nome da rua, avenida, travessa, etc. Inclua o tipo (Rua, Av., etc.) se estiver presente."
-            },
-            "numero": {
-                "descricao": "Número do endereço",
-                "instrucoes": "Identifique o número da residência/endereço. Use apenas números ou 's/n' se for sem número."
-            },
-            "complemento": {
-                "descricao": "Complemento do endereço",
-                "instrucoes": "Procure por complementos como apartamento, bloco, casa, andar, etc. Mantenha abreviações originais."
-            },
-            "nivel_ensino": {
-                "descricao": "Nível de ensino",
-                "instrucoes": "Identifique o maior nível: Fundamental, Médio, Superior, Pós-graduação, Mestrado, Doutorado, etc."
-            },
-            "situacao": {
-                "descricao": "Situação do ensino",
-                "instrucoes": "Determine se está: Completo, Incompleto, Cursando, Em andamento, etc."
-            },
-            "curso": {
-                "descricao": "Nome do curso",
-                "instrucoes": "Extraia o nome completo do curso de graduação, técnico, ou principal formação mencionada."
-            },
-            "serie": {
-                "descricao": "Série ou etapa",
-                "instrucoes": "Se for ensino fundamental/médio, identifique a série. Para superior, pode ser o período/semestre."
-            },
-            "inicio_mes": {
-                "descricao": "Mês de início dos estudos",
-                "instrucoes": "Extraia o mês de início do curso principal. Use nome do mês ou número (01-12)."
-            },
-            "inicio_ano": {
-                "descricao": "Ano de início dos estudos",
-                "instrucoes": "Identifique o ano de início do curso. Use formato de 4 dígitos (ex: 2020)."
-            },
-            "fim_mes": {
-                "descricao": "Mês de término dos estudos",
-                "instrucoes": "Extraia o mês de conclusão ou previsão de conclusão. Use nome do mês ou número (01-12)."
-            },
-            "fim_ano": {
-                "descricao": "Ano de término dos estudos",
-                "instrucoes": "Identifique o ano de conclusão ou previsão. Use formato de 4 dígitos (ex: 2024)."
-            },
-            "instituicao": {
-                "descricao": "Nome da instituição de ensino",
-                "instrucoes": "Extraia o nome completo da escola, universidade, ou instituição de ensino principal."
-            },
-            "carga_horaria": {
-                "descricao": "Carga horária do curso",
-                "instrucoes": "Procure pela carga horária total do curso em horas. Mantenha apenas números seguidos de 'h' ou 'horas'."
-            }
-        }
-        
-        # Cria o prompt estruturado com instruções detalhadas
-        campos_formatados = []
-        for campo, info in campos_json.items():
-            campos_formatados.append(f"""
-    "{campo}": 
-        - Descrição: {info['descricao']}
-        - Instruções: {info['instrucoes']}""")
-        
-        prompt = f"""
-        Analise cuidadosamente esta imagem de currículo e extraia TODAS as informações visíveis seguindo as instruções específicas para cada campo.
-        
-        REGRAS GERAIS:
-        1. Leia todo o texto da imagem com máxima atenção
-        2. Siga exatamente as instruções específicas de cada campo
-        3. Retorne APENAS um JSON válido, sem texto adicional
-        4. Use "Não informado" apenas se a informação realmente não estiver na imagem
-        5. Mantenha formatos e acentuação original quando solicitado
-        6. Se houver múltiplas informações do mesmo tipo, priorize a mais completa
-        
-        CAMPOS A EXTRAIR E SUAS INSTRUÇÕES ESPECÍFICAS:
-        {''.join(campos_formatados)}
-        
-        FORMATO DE RESPOSTA:
-        Retorne apenas um JSON com as chaves: {list(campos_json.keys())}
-        
-        Exemplo de estrutura esperada:
-        {{
-            "nome": "João Silva Santos",
-            "email": "joao.silva@email.com",
-            "cpf": "123.456.789-00",
-            ...
-        }}
-        """
-        
-        print("Enviando requisição para GPT-4 Vision...")
-        
-        # Faz a chamada para a API usando apenas a URL
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": imagem_url,
-                                "detail": "high"  # Para análise mais detalhada
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=4000,
-            temperature=0
+        imagem_url = preparar_url_imagem(imagem_url)
+        return consultar_modelo(
+            montar_prompt(campos=campos), [{"imagem_url": imagem_url, "detail": detail}], campos, ao_receber_campo=ao_receber_campo
         )
-        
-        # Extrai o conteúdo da resposta
-        resultado = response.choices[0].message.content
-        tokens_usados = response.usage.total_tokens
-        
-        print(f"Resposta bruta recebida: {resultado[:200]}...")
-        
-        # Tenta extrair o JSON da resposta
-        try:
-            # Remove possíveis marcadores de código
-            resultado_limpo = resultado.replace('```json', '').replace('```', '').strip()
-            
-            # Se a resposta começar com '{', assume que é JSON
-            if resultado_limpo.startswith('{'):
-                dados_extraidos = json.loads(resultado_limpo)
-            else:
-                # Se não, procura por JSON na resposta
-                json_match = re.search(r'\{.*\}', resultado_limpo, re.DOTALL)
-                if json_match:
-                    dados_extraidos = json.loads(json_match.group())
-                else:
-                    raise ValueError("Nenhum JSON encontrado na resposta")
-            
-            # Garante que todas as chaves estão presentes
-            for chave in campos_json.keys():
-                if chave not in dados_extraidos:
-                    dados_extraidos[chave] = "Não informado"
-            
-            return dados_extraidos, tokens_usados
-            
-        except (json.JSONDecodeError, ValueError) as e:
-            print(f"Erro ao decodificar JSON: {e}")
-            print(f"Resposta completa recebida: {resultado}")
-            return {"erro": "Resposta não está em formato JSON válido", "resposta_bruta": resultado}, tokens_usados
             
     except Exception as e:
         print(f"Erro geral: {e}")
-        return {"erro": f"Erro na análise: {str(e)}"}, 0
+        return {"erro": f"Erro na análise: {str(e)}"}, uso_vazio()
+
+def extrair_dados_curriculo_single_stream(
+    imagem_url: str,
+    detail: str = "high"
+) -> Generator[Tuple[str, Any], None, Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Versão em streaming de `extrair_dados_curriculo_single`: gera (campo, valor)
+    assim que cada campo fica pronto e retorna (dados, uso) ao final.
+    
+        gerador = extrair_dados_curriculo_single_stream(url)
+        dados, uso = consumir_campos(gerador, lambda campo, valor: print(campo, valor))
+    """
+    
+    if obter_cliente() is None:
+        return {"erro": "API Key não configurada"}, uso_vazio()
+    
+    try:
+        imagem_url = preparar_url_imagem(imagem_url)
+        return (yield from consultar_modelo_stream(montar_prompt(), [{"imagem_url": imagem_url, "detail": detail}]))
+    
+    except Exception as e:
+        print(f"Erro geral: {e}")
+        return {"erro": f"Erro na análise: {str(e)}"}, uso_vazio()
+
+def extrair_dados_curriculo_texto(
+    texto: str,
+    ao_receber_campo: Callable[[str, Any], None] = None,
+    campos: List[str] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Extrai dados estruturados de uma página de currículo a partir da camada de texto.
+    
+    Usado para PDFs digitais: o texto custa muito menos tokens que a imagem
+    da mesma página e a resposta é mais rápida.
+    """
+    
+    if not cliente_disponivel(ao_receber_campo):
+        return {"erro": "API Key não configurada"}, uso_vazio()
+    
+    try:
+        return consultar_com_pre_extracao([{"texto": texto}], "texto", ao_receber_campo, campos)
+    
+    except Exception as e:
+        print(f"Erro geral: {e}")
+        return {"erro": f"Erro na análise: {str(e)}"}, uso_vazio()
+
+def extrair_dados_pagina(
+    pagina: Dict[str, str],
+    ao_receber_campo: Callable[[str, Any], None] = None,
+    campos: List[str] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Extrai os dados de uma página, por texto ou por imagem conforme o conteúdo."""
+    if "texto" in pagina:
+        return extrair_dados_curriculo_texto(pagina["texto"], ao_receber_campo, campos)
+    return extrair_dados_curriculo_single(pagina["imagem_url"], pagina.get("detail", "high"), ao_receber_campo, campos)
+
+def extrair_dados_curriculo_documento(
+    paginas: List[Dict[str, str]],
+    ao_receber_campo: Callable[[str, Any], None] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Extrai dados de todas as páginas de um currículo em uma única requisição.
+    
+    O prompt de instruções é enviado uma única vez junto com o conteúdo de cada
+    página (imagem ou texto), e o modelo devolve o JSON já consolidado (sem
+    etapa de combinação). Com `ao_receber_campo`, a resposta vem em streaming
+    (ver `consultar_modelo`).
+    """
+    
+    if not cliente_disponivel(ao_receber_campo):
+        return {"erro": "API Key não configurada"}, uso_vazio()
+    
+    try:
+        paginas = [
+            pagina if "texto" in pagina else dict(pagina, imagem_url=preparar_url_imagem(pagina["imagem_url"]))
+            for pagina in paginas
+        ]
+        return consultar_com_pre_extracao(paginas, tipo_conteudo_paginas(paginas), ao_receber_campo)
+    
+    except Exception as e:
+        print(f"Erro geral: {e}")
+        return {"erro": f"Erro na análise: {str(e)}"}, uso_vazio()
+
+def descrever_pagina(pagina: Dict[str, str]) -> str:
+    """Resumo legível de uma página para logs."""
+    if "texto" in pagina:
+        return f"texto extraído ({len(pagina['texto'])} caracteres)"
+    return descrever_url_imagem(pagina["imagem_url"])
 
 def combinar_dados_multiplas_paginas(lista_dados: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
@@ -312,53 +551,270 @@ def combinar_dados_multiplas_paginas(lista_dados: List[Dict[str, Any]]) -> Dict[
     
     return dados_combinados
 
-def analisar_curriculo_por_links(links_publicos: List[str]) -> Tuple[Dict[str, Any], int, float]:
+def usar_requisicao_unica(paginas: List[Dict[str, str]], requisicao_unica: bool, limite_paginas_requisicao_unica: int = LIMITE_PAGINAS_REQUISICAO_UNICA) -> bool:
+    """Indica se o documento vai em uma única requisição ou em uma por página."""
+    return requisicao_unica and 1 < len(paginas) <= limite_paginas_requisicao_unica
+
+def chave_cache_paginas(paginas: List[Dict[str, str]], usa_requisicao_unica: bool, campos_incrementais: List[str] = None) -> Optional[str]:
     """
-    Analisa um currículo que pode ter múltiplas páginas através de links públicos.
+    Chave do cache de extração para as páginas; None se alguma depender de URL externa.
+    No modo incremental (`campos_incrementais` = campos obrigatórios) o
+    resultado pode omitir páginas, então a chave é outra.
+    """
+    if not all("texto" in p or p["imagem_url"].startswith("data:") for p in paginas):
+        return None
+    conteudos = [
+        (p["texto"] if "texto" in p else p["imagem_url"] + (f"|detail={p['detail']}" if "detail" in p else "")).encode("utf-8")
+        for p in paginas
+    ]
+    opcoes = f"requisicao_unica={int(usa_requisicao_unica)}"
+    if campos_incrementais is not None:
+        opcoes += f";incremental={','.join(campos_incrementais)}"
+    return chave_paginas(conteudos, MODELO, VERSAO_PROMPT, opcoes)
+
+def opcoes_chave_documento(requisicao_unica: bool, usar_camada_texto: bool = True, incremental: bool = False) -> str:
+    """Opções que entram na chave do cache por documento (`chave_documento`), comuns à fila e ao lote."""
+    opcoes = f"requisicao_unica={int(requisicao_unica)};camada_texto={int(usar_camada_texto)}"
+    if incremental:
+        opcoes += f";incremental={','.join(CAMPOS_OBRIGATORIOS)}"
+    return opcoes
+
+def campos_faltantes(dados: Dict[str, Any]) -> List[str]:
+    """Campos de CAMPOS_JSON ainda sem valor ("Não informado") em `dados`."""
+    return [campo for campo in CAMPOS_JSON if dados.get(campo, VALOR_AUSENTE) == VALOR_AUSENTE]
+
+def analisar_paginas_incremental(
+    paginas: List[Dict[str, str]],
+    campos_obrigatorios: List[str] = CAMPOS_OBRIGATORIOS,
+    ao_receber_campo: Callable[[str, Any], None] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Analisa as páginas em sequência pedindo a cada uma só os campos ainda
+    faltantes: a primeira recebe o prompt completo e as seguintes um prompt e
+    um schema reduzidos. Para assim que todos os `campos_obrigatorios` estiverem
+    preenchidos (as páginas restantes nem são enviadas) ou não faltar nenhum campo.
+    
+    Returns:
+        Tupla contendo: (dados_extraidos ou dict de erro, uso somado)
+    """
+    dados = {campo: VALOR_AUSENTE for campo in CAMPOS_JSON}
+    uso_total = uso_vazio()
+    for i, pagina in enumerate(paginas):
+        faltantes = campos_faltantes(dados)
+        if not faltantes or not set(campos_obrigatorios) & set(faltantes):
+            print(f"Campos obrigatórios preenchidos: {len(paginas) - i} página(s) restante(s) não enviada(s) ao modelo.")
+            metricas.contar("incremental.paginas_puladas", len(paginas) - i)
+            break
+        
+        print(f"Analisando página {i+1}/{len(paginas)} ({len(faltantes)} campo(s) faltante(s)): {descrever_pagina(pagina)}")
+        dados_pagina, uso_pagina = extrair_dados_pagina(
+            pagina, ao_receber_campo, None if len(faltantes) == len(CAMPOS_JSON) else faltantes
+        )
+        uso_total = somar_uso(uso_total, uso_pagina)
+        if "erro" in dados_pagina:
+            return {"erro": f"Falha na análise da página {i+1}: {dados_pagina['erro']}"}, uso_total
+        
+        for campo in faltantes:
+            valor = dados_pagina.get(campo, VALOR_AUSENTE)
+            if valor and valor != VALOR_AUSENTE:
+                dados[campo] = valor
+    return dados, uso_total
+
+def analisar_curriculo_por_paginas(
+    paginas: List[Dict[str, str]],
+    max_paralelo: int = MAX_PAGINAS_PARALELAS,
+    requisicao_unica: bool = False,
+    limite_paginas_requisicao_unica: int = LIMITE_PAGINAS_REQUISICAO_UNICA,
+    cache: CacheExtracao = None,
+    ao_receber_campo: Callable[[str, Any], None] = None,
+    incremental: bool = False,
+    campos_obrigatorios: List[str] = CAMPOS_OBRIGATORIOS
+) -> Tuple[Dict[str, Any], int, float]:
+    """
+    Analisa um currículo que pode ter múltiplas páginas, cada uma enviada como
+    imagem ({"imagem_url": ...}) ou como camada de texto ({"texto": ...}).
+    
+    As páginas são enviadas ao modelo em paralelo (até `max_paralelo` requisições
+    simultâneas); a ordem original é preservada na combinação dos resultados.
+    
+    Com `requisicao_unica=True`, todas as páginas vão em uma só requisição
+    (o prompt é pago uma vez por documento e não há etapa de combinação),
+    desde que o currículo não ultrapasse `limite_paginas_requisicao_unica`
+    páginas; acima disso volta para uma chamada por página.
+    
+    Com `incremental=True`, em vez das chamadas paralelas por página, as
+    páginas são analisadas em sequência e cada uma só recebe os campos ainda
+    faltantes; a análise para quando todos os `campos_obrigatorios` estiverem
+    preenchidos (ver `analisar_paginas_incremental`). A requisição única, quando
+    se aplica, tem precedência.
+    
+    Se um `cache` for informado e nenhuma página depender de URL externa, o
+    resultado é procurado pelo hash das páginas (mais modelo e versão do prompt)
+    antes de qualquer chamada ao modelo.
     
     Args:
-        links_publicos: Lista de URLs das imagens do currículo
+        paginas: Lista de páginas do currículo, na ordem do documento
+        max_paralelo: Máximo de páginas analisadas ao mesmo tempo (1 = sequencial)
+        requisicao_unica: Envia todas as páginas em uma única requisição
+        limite_paginas_requisicao_unica: Máximo de páginas para a requisição única
+        cache: Cache de resultados opcional (CacheExtracao)
+        ao_receber_campo: Callback (campo, valor) chamado a cada campo recebido
+            em streaming; só com requisição única, página única ou modo
+            incremental, pois as chamadas por página rodam em threads e ainda
+            passam pela combinação
+        incremental: Analisa as páginas em sequência só com os campos faltantes
+        campos_obrigatorios: Campos que encerram a análise incremental
     
     Returns:
         Tupla contendo: (dados_curriculo, total_tokens, preco_total)
     """
     
-    if not links_publicos:
-        return {"erro": "Nenhum link fornecido"}, 0, 0.0
+    if not paginas:
+        return {"erro": "Nenhuma página fornecida"}, 0, 0.0
     
-    print(f"Iniciando análise de {len(links_publicos)} página(s) de currículo...")
+    usa_requisicao_unica = usar_requisicao_unica(paginas, requisicao_unica, limite_paginas_requisicao_unica)
+    usa_incremental = incremental and not usa_requisicao_unica and len(paginas) > 1
     
-    dados_por_pagina = []
-    total_tokens = 0
+    chave = chave_cache_paginas(
+        paginas, usa_requisicao_unica, list(campos_obrigatorios) if usa_incremental else None
+    ) if cache is not None else None
+    if chave is not None:
+        resultado_cache = cache.obter(chave)
+        if resultado_cache is not None:
+            print("Resultado encontrado no cache de extração.")
+            return resultado_cache
     
-    # Analisa cada página
-    for i, link in enumerate(links_publicos):
-        print(f"Analisando página {i+1}/{len(links_publicos)}: {link}")
-        
-        dados_pagina, tokens_pagina = extrair_dados_curriculo_single(link)
-        dados_por_pagina.append(dados_pagina)
-        total_tokens += tokens_pagina
-        
-        # Se houve erro crítico, retorna imediatamente
-        if "erro" in dados_pagina and "API Key" in dados_pagina["erro"]:
-            return dados_pagina, total_tokens, 0.0
+    print(f"Iniciando análise de {len(paginas)} página(s) de currículo...")
     
-    # Combina dados de todas as páginas
-    if len(links_publicos) == 1:
-        dados_finais = dados_por_pagina[0]
+    if usa_requisicao_unica:
+        print(f"Analisando as {len(paginas)} páginas em uma única requisição...")
+        dados_finais, uso_total = extrair_dados_curriculo_documento(paginas, ao_receber_campo)
+    elif len(paginas) == 1:
+        # Página única: chamada direta na thread atual (sem pool e sem combinação)
+        print(f"Analisando página 1/1: {descrever_pagina(paginas[0])}")
+        dados_finais, uso_total = extrair_dados_pagina(paginas[0], ao_receber_campo)
+    elif usa_incremental:
+        with medir("analise_incremental", paginas=len(paginas)):
+            dados_finais, uso_total = analisar_paginas_incremental(paginas, campos_obrigatorios, ao_receber_campo)
     else:
+        dados_por_pagina = [None] * len(paginas)
+        uso_total = uso_vazio()
+        
+        # Analisa as páginas em paralelo, guardando cada resultado na posição da página
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_paralelo, len(paginas))))
+        try:
+            futuros = {}
+            for i, pagina in enumerate(paginas):
+                print(f"Analisando página {i+1}/{len(paginas)}: {descrever_pagina(pagina)}")
+                futuros[executor.submit(extrair_dados_pagina, pagina)] = i
+            
+            for futuro in as_completed(futuros):
+                dados_pagina, uso_pagina = futuro.result()
+                dados_por_pagina[futuros[futuro]] = dados_pagina
+                uso_total = somar_uso(uso_total, uso_pagina)
+                
+                # Se houve erro crítico, cancela as páginas pendentes e retorna imediatamente
+                if "erro" in dados_pagina and "API Key" in dados_pagina["erro"]:
+                    return dados_pagina, uso_total["total_tokens"], 0.0
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # Página que falhou mesmo após as retentativas invalida o documento:
+        # combinar sem ela perderia campos sem aviso (e o resultado iria para o cache)
+        falhas = [(i + 1, dados["erro"]) for i, dados in enumerate(dados_por_pagina) if "erro" in dados]
+        if falhas:
+            numeros = ", ".join(str(numero) for numero, _ in falhas)
+            print(f"Falha na análise da(s) página(s) {numeros}.")
+            return {"erro": f"Falha na análise da(s) página(s) {numeros}: {falhas[0][1]}"}, uso_total["total_tokens"], uso_total["custo_usd"]
+
+        # Combina dados de todas as páginas
         print("Combinando dados de múltiplas páginas...")
-        dados_finais = combinar_dados_multiplas_paginas(dados_por_pagina)
+        with medir("combinacao", paginas=len(paginas)):
+            dados_finais = combinar_dados_multiplas_paginas(dados_por_pagina)
     
-    # Calcula preço estimado (baseado nos preços do GPT-4 Vision)
-    # Preços aproximados: input $0.01/1K tokens, output $0.03/1K tokens
-    # Assumindo uma proporção média de input/output
-    preco_total = (total_tokens / 1000) * 0.02  # Preço médio estimado
+    total_tokens = uso_total["total_tokens"]
+    preco_total = uso_total["custo_usd"]
     
-    print(f"Análise concluída. Tokens totais: {total_tokens}, Custo estimado: ${preco_total:.4f}")
+    print(f"Análise concluída. Tokens totais: {total_tokens} ({uso_total['tokens_entrada']} entrada, "
+          f"{uso_total['tokens_saida']} saída), Custo: ${preco_total:.4f}")
+    
+    if chave is not None:
+        cache.salvar(chave, dados_finais, total_tokens, preco_total)
     
     return dados_finais, total_tokens, preco_total
 
+def analisar_curriculo_por_links(
+    links_publicos: List[str],
+    max_paralelo: int = MAX_PAGINAS_PARALELAS,
+    requisicao_unica: bool = False,
+    limite_paginas_requisicao_unica: int = LIMITE_PAGINAS_REQUISICAO_UNICA,
+    incremental: bool = False
+) -> Tuple[Dict[str, Any], int, float]:
+    """
+    Analisa um currículo que pode ter múltiplas páginas através de links públicos.
+    
+    Args:
+        links_publicos: Lista de URLs das imagens do currículo
+        max_paralelo: Máximo de páginas analisadas ao mesmo tempo (1 = sequencial)
+        requisicao_unica: Envia todas as páginas em uma única requisição
+        limite_paginas_requisicao_unica: Máximo de páginas para a requisição única
+        incremental: Páginas em sequência, só com os campos ainda faltantes
+    
+    Returns:
+        Tupla contendo: (dados_curriculo, total_tokens, preco_total)
+    """
+    
+    if not links_publicos:
+        return {"erro": "Nenhum link fornecido"}, 0, 0.0
+    
+    return analisar_curriculo_por_paginas(
+        [{"imagem_url": link} for link in links_publicos],
+        max_paralelo=max_paralelo,
+        requisicao_unica=requisicao_unica,
+        limite_paginas_requisicao_unica=limite_paginas_requisicao_unica,
+        incremental=incremental
+    )
+
+def analisar_curriculo_por_imagens(
+    imagens: List[bytes],
+    mime_type: str = "image/png",
+    max_paralelo: int = MAX_PAGINAS_PARALELAS,
+    requisicao_unica: bool = False,
+    limite_paginas_requisicao_unica: int = LIMITE_PAGINAS_REQUISICAO_UNICA,
+    cache: CacheExtracao = None,
+    incremental: bool = False
+) -> Tuple[Dict[str, Any], int, float]:
+    """
+    Analisa um currículo a partir das imagens das páginas em memória.
+    
+    As imagens são enviadas ao modelo como data URLs base64, dispensando o
+    upload para o Google Drive, a permissão pública e a limpeza posterior.
+    
+    Args:
+        imagens: Lista com os bytes de cada página, na ordem do documento
+        mime_type: Tipo MIME das imagens (ex: "image/png", "image/jpeg")
+        max_paralelo: Máximo de páginas analisadas ao mesmo tempo (1 = sequencial)
+        requisicao_unica: Envia todas as páginas em uma única requisição
+        limite_paginas_requisicao_unica: Máximo de páginas para a requisição única
+        cache: Cache de resultados opcional (CacheExtracao)
+        incremental: Páginas em sequência, só com os campos ainda faltantes
+    
+    Returns:
+        Tupla contendo: (dados_curriculo, total_tokens, preco_total)
+    """
+    
+    if not imagens:
+        return {"erro": "Nenhuma imagem fornecida"}, 0, 0.0
+    
+    return analisar_curriculo_por_paginas(
+        [{"imagem_url": imagem_para_data_url(imagem, mime_type)} for imagem in imagens],
+        max_paralelo=max_paralelo,
+        requisicao_unica=requisicao_unica,
+        limite_paginas_requisicao_unica=limite_paginas_requisicao_unica,
+        cache=cache,
+        incremental=incremental
+    )
+
 # Função para compatibilidade com o código anterior
 def analisar_extrato_por_links(links_publicos: List[str]) -> Tuple[Dict[str, Any], int, float]:
     """
@@ -0,0 +1,433 @@
+"""
+Provedores de extração com interface comum e roteamento por latência.
+
+Cada provedor (OpenAI, Bedrock/Claude, LangChain ChatOpenAI ou um provedor
+falso local, para testes) recebe o mesmo prompt e as mesmas páginas e devolve
+(dados, uso). O `Roteador` acompanha latência e erros de cada provedor, envia
+a requisição ao mais rápido entre os saudáveis e, opcionalmente, dispara uma
+requisição de reserva (hedge) em outro provedor quando a primeira passa do
+p95 de latência do provedor escolhido.
+
+    roteador = Roteador([ProvedorOpenAI(), ProvedorBedrock()], hedge=True)
+    definir_roteador(roteador)  # modelo_curriculo passa a usar o roteador
+"""
+import re
+import json
+import time
+import random
+import base64
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Tuple, Optional
+
+import requests
+
+from esquema_curriculo import CAMPOS_JSON
+from extracao_local import VALOR_AUSENTE
+from metricas import medir, metricas, uso_vazio, calcular_custo
+from camada_texto import estimar_tokens_texto
+from modelo_curriculo import consultar_openai, interpretar_resposta, link_drive_direto, estimar_tokens_imagem_url, MODELO
+from agendador import obter_agendador
+
+# Modelos padrão dos provedores
+MODELO_BEDROCK = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
+MODELO_LANGCHAIN = "gpt-4.1-mini-2025-04-14"
+MAX_TOKENS_LANGCHAIN = 4000
+
+# Janela de latências recentes usada no roteamento e no limiar do hedge
+JANELA_LATENCIAS = 50
+AMOSTRAS_MINIMAS_P95 = 5
+LIMIAR_HEDGE_PADRAO_MS = 20000  # Antes de haver amostras suficientes para o p95
+
+# Provedor com erros seguidos fica fora do roteamento por um tempo
+MAX_ERROS_SEGUIDOS = 3
+PAUSA_PROVEDOR_SEGUNDOS = 60
+
+# Requisições simultâneas do roteador (incluindo as de hedge)
+MAX_REQUISICOES_ROTEADOR = 16
+
+def extrair_objeto_json(texto: str) -> str:
+    """Recorta o objeto JSON de respostas com texto em volta (modelos sem structured outputs)."""
+    encontrado = re.search(r"\{.*\}", texto or "", re.DOTALL)
+    return encontrado.group(0) if encontrado else (texto or "")
+
+def bytes_imagem(imagem_url: str) -> Tuple[bytes, str]:
+    """Bytes e tipo de uma imagem em data URL ou link público (para APIs que só aceitam base64)."""
+    if imagem_url.startswith("data:"):
+        cabecalho, dados = imagem_url.split(",", 1)
+        return base64.b64decode(dados), cabecalho[5:].split(";")[0]
+    resposta = requests.get(link_drive_direto(imagem_url), timeout=30)
+    resposta.raise_for_status()
+    return resposta.content, resposta.headers.get("Content-Type", "image/jpeg").split(";")[0]
+
+class Provedor:
+    """
+    Interface comum dos provedores de extração.
+
+    As subclasses implementam `completar` (texto da resposta e uso); `extrair`
+    interpreta o JSON e aplica a mesma validação da extração com a OpenAI.
+    Falhas de rede/API são levantadas como exceções.
+    """
+
+    def __init__(self, nome: str, modelo: str):
+        self.nome = nome
+        self.modelo = modelo
+
+    def completar(self, prompt: str, paginas: List[Dict[str, str]], campos: List[str] = None) -> Tuple[str, Optional[str], Dict[str, Any]]:
+        """
+        Returns:
+            Tupla contendo: (texto da resposta, motivo de término no formato da
+            OpenAI: "stop" ou "length", uso)
+        """
+        raise NotImplementedError
+
+    def estimar_tokens(self, prompt: str, paginas: List[Dict[str, str]], max_tokens: int) -> int:
+        """Tokens reservados no agendador do modelo: prompt, páginas e máximo de saída."""
+        return estimar_tokens_texto(prompt) + max_tokens + sum(
+            estimar_tokens_texto(pagina["texto"]) if "texto" in pagina
+            else estimar_tokens_imagem_url(pagina["imagem_url"], pagina.get("detail", "high"))
+            for pagina in paginas
+        )
+
+    def extrair(self, prompt: str, paginas: List[Dict[str, str]], campos: List[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        texto, motivo_fim, uso = self.completar(prompt, paginas, campos)
+        dados = interpretar_resposta(extrair_objeto_json(texto), motivo_fim=motivo_fim)
+        if "erro" not in dados and campos is not None:
+            # Modelos sem esquema estrito podem devolver chaves a mais
+            dados = {campo: dados.get(campo, VALOR_AUSENTE) for campo in campos}
+        return dados, uso
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.nome!r}, {self.modelo!r})"
+
+class ProvedorOpenAI(Provedor):
+    """GPT-4o pela SDK da OpenAI, com structured outputs (ver `modelo_curriculo`)."""
+
+    def __init__(self, nome: str = "openai"):
+        super().__init__(nome, MODELO)
+
+    def extrair(self, prompt, paginas, campos=None):
+        return consultar_openai(prompt, paginas, campos)
+
+class ProvedorBedrock(Provedor):
+    """Claude pelo Amazon Bedrock (API de mensagens da Anthropic, imagens em base64)."""
+
+    def __init__(
+        self,
+        modelo: str = MODELO_BEDROCK,
+        cliente=None,
+        nome: str = "bedrock",
+        max_tokens: int = 4000,
+        temperatura: float = 0
+    ):
+        super().__init__(nome, modelo)
+        if cliente is None:
+            import boto3
+            cliente = boto3.client("bedrock-runtime")
+        self.cliente = cliente
+        self.max_tokens = max_tokens
+        self.temperatura = temperatura
+
+    def montar_conteudo(self, prompt: str, paginas: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        conteudo = []
+        for i, pagina in enumerate(paginas):
+            if "texto" in pagina:
+                conteudo.append({"type": "text", "text": f"--- Página {i+1} (texto extraído) ---\n{pagina['texto']}"})
+            else:
+                imagem, mime_type = bytes_imagem(pagina["imagem_url"])
+                conteudo.append({
+                    "type": "image",
+                    "source": {"type": "base64", "media_type": mime_type, "data": base64.b64encode(imagem).decode("utf-8")}
+                })
+        conteudo.append({"type": "text", "text": prompt})
+        return conteudo
+
+    def completar(self, prompt, paginas, campos=None):
+        corpo = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperatura,
+            "messages": [{"role": "user", "content": self.montar_conteudo(prompt, paginas)}]
+        }
+        def invocar():
+            resposta = self.cliente.invoke_model(
+                modelId=self.modelo,
+                body=json.dumps(corpo),
+                contentType="application/json",
+                accept="application/json"
+            )
+            return json.loads(resposta["body"].read())
+
+        with medir("chamada_llm", modelo=self.modelo, provedor=self.nome) as info:
+            resultado, info["retentativas"] = obter_agendador(self.modelo).executar(
+                invocar,
+                self.estimar_tokens(prompt, paginas, self.max_tokens),
+                tokens_usados=lambda resultado: sum((resultado.get("usage") or {}).get(chave, 0) for chave in ("input_tokens", "output_tokens")) or None
+            )
+            uso_bedrock = resultado.get("usage") or {}
+            entrada = uso_bedrock.get("input_tokens", 0)
+            saida = uso_bedrock.get("output_tokens", 0)
+            uso = {"tokens_entrada": entrada, "tokens_saida": saida, "total_tokens": entrada + saida,
+                   "custo_usd": calcular_custo(self.modelo, entrada, saida)}
+            info.update(uso)
+
+        texto = "".join(parte.get("text", "") for parte in resultado.get("content", []))
+        motivo_fim = "length" if resultado.get("stop_reason") == "max_tokens" else "stop"
+        return texto, motivo_fim, uso
+
+class ProvedorLangChain(Provedor):
+    """Modelos da OpenAI via LangChain `ChatOpenAI` (como no notebook de testes)."""
+
+    def __init__(self, modelo: str = MODELO_LANGCHAIN, llm=None, nome: str = "langchain"):
+        super().__init__(nome, modelo)
+        if llm is None:
+            from langchain_openai import ChatOpenAI
+            from modelo_curriculo import obter_api_key
+            llm = ChatOpenAI(api_key=obter_api_key(), model=modelo, temperature=0, max_tokens=MAX_TOKENS_LANGCHAIN, max_retries=0)
+        self.llm = llm
+
+    def completar(self, prompt, paginas, campos=None):
+        from langchain_core.messages import HumanMessage
+
+        conteudo = [{"type": "text", "text": prompt}]
+        for i, pagina in enumerate(paginas):
+            if "texto" in pagina:
+                conteudo.append({"type": "text", "text": f"--- Página {i+1} (texto extraído) ---\n{pagina['texto']}"})
+            else:
+                conteudo.append({"type": "image_url", "image_url": {"url": pagina["imagem_url"], "detail": pagina.get("detail", "high")}})
+
+        with medir("chamada_llm", modelo=self.modelo, provedor=self.nome) as info:
+            resposta, info["retentativas"] = obter_agendador(self.modelo).executar(
+                lambda: self.llm.invoke([HumanMessage(content=conteudo)]),
+                self.estimar_tokens(prompt, paginas, MAX_TOKENS_LANGCHAIN),
+                tokens_usados=lambda resposta: (getattr(resposta, "usage_metadata", None) or {}).get("total_tokens")
+            )
+            uso_langchain = getattr(resposta, "usage_metadata", None) or {}
+            entrada = uso_langchain.get("input_tokens", 0)
+            saida = uso_langchain.get("output_tokens", 0)
+            uso = {"tokens_entrada": entrada, "tokens_saida": saida, "total_tokens": entrada + saida,
+                   "custo_usd": calcular_custo(self.modelo, entrada, saida)}
+            info.update(uso)
+
+        metadados = getattr(resposta, "response_metadata", None) or {}
+        return resposta.content, metadados.get("finish_reason", "stop"), uso
+
+class ProvedorFalso(Provedor):
+    """
+    Provedor local para testes do roteamento: responde após uma latência
+    configurável (com cauda opcional) e falha com a probabilidade informada.
+    """
+
+    def __init__(
+        self,
+        nome: str = "falso",
+        latencia_ms: float = 100,
+        latencia_cauda_ms: float = None,
+        prob_cauda: float = 0.0,
+        prob_erro: float = 0.0,
+        dados: Dict[str, Any] = None,
+        semente: int = None
+    ):
+        super().__init__(nome, "falso")
+        self.latencia_ms = latencia_ms
+        self.latencia_cauda_ms = latencia_cauda_ms
+        self.prob_cauda = prob_cauda
+        self.prob_erro = prob_erro
+        self.dados = dados or {"nome": f"Candidato ({nome})"}
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.Lock()
+
+    def completar(self, prompt, paginas, campos=None):
+        with self._lock:
+            sorteio_cauda, sorteio_erro = self._aleatorio.random(), self._aleatorio.random()
+        cauda = self.latencia_cauda_ms is not None and sorteio_cauda < self.prob_cauda
+        time.sleep((self.latencia_cauda_ms if cauda else self.latencia_ms) / 1000)
+        if sorteio_erro < self.prob_erro:
+            raise RuntimeError(f"Falha simulada no provedor {self.nome}")
+
+        resposta = {campo: self.dados.get(campo, VALOR_AUSENTE) for campo in (CAMPOS_JSON if campos is None else campos)}
+        return json.dumps(resposta, ensure_ascii=False), "stop", uso_vazio()
+
+class EstatisticasProvedor:
+    """Latências recentes, média móvel e erros seguidos de um provedor (seguro entre threads)."""
+
+    def __init__(self, janela: int = JANELA_LATENCIAS):
+        self._lock = threading.Lock()
+        self.latencias = deque(maxlen=janela)
+        self.media_ms: Optional[float] = None
+        self.chamadas = 0
+        self.erros = 0
+        self.erros_seguidos = 0
+        self.pausado_ate = 0.0
+
+    def registrar(self, latencia_ms: float, sucesso: bool) -> None:
+        with self._lock:
+            self.chamadas += 1
+            if sucesso:
+                self.erros_seguidos = 0
+                self.latencias.append(latencia_ms)
+                # Média móvel exponencial: acompanha mudanças de latência do provedor
+                self.media_ms = latencia_ms if self.media_ms is None else 0.7 * self.media_ms + 0.3 * latencia_ms
+            else:
+                self.erros += 1
+                self.erros_seguidos += 1
+                if self.erros_seguidos >= MAX_ERROS_SEGUIDOS:
+                    self.pausado_ate = time.time() + PAUSA_PROVEDOR_SEGUNDOS
+
+    def saudavel(self) -> bool:
+        """Fora da pausa por erros seguidos (após a pausa, volta a receber requisições para ser testado)."""
+        return time.time() >= self.pausado_ate
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self.latencias) < AMOSTRAS_MINIMAS_P95:
+                return None
+            ordenadas = sorted(self.latencias)
+        return ordenadas[min(len(ordenadas) - 1, int(0.95 * len(ordenadas)))]
+
+    def resumo(self) -> Dict[str, Any]:
+        return {
+            "chamadas": self.chamadas,
+            "erros": self.erros,
+            "media_ms": self.media_ms,
+            "p95_ms": self.p95(),
+            "saudavel": self.saudavel()
+        }
+
+class Roteador:
+    """
+    Escolhe, a cada requisição, o provedor saudável mais rápido (média móvel
+    de latência; provedores ainda sem medição são testados primeiro) e passa
+    para o seguinte em caso de erro.
+
+    Com `hedge=True`, se o provedor escolhido não responder dentro do seu p95
+    (ou de `limiar_hedge_ms` enquanto não houver amostras), a mesma requisição
+    é enviada ao próximo provedor e vale a primeira resposta válida. A
+    requisição perdedora não é cancelada: termina em segundo plano e só
+    alimenta as estatísticas (seu custo não entra no uso retornado).
+    """
+
+    def __init__(
+        self,
+        provedores: List[Provedor],
+        hedge: bool = False,
+        limiar_hedge_ms: float = LIMIAR_HEDGE_PADRAO_MS,
+        max_requisicoes: int = MAX_REQUISICOES_ROTEADOR
+    ):
+        if not provedores:
+            raise ValueError("O roteador precisa de ao menos um provedor")
+        self.provedores = list(provedores)
+        self.hedge = hedge
+        self.limiar_hedge_ms = limiar_hedge_ms
+        self.estatisticas = {provedor.nome: EstatisticasProvedor() for provedor in self.provedores}
+        self._executor = ThreadPoolExecutor(max_workers=max_requisicoes)
+
+    def ordenar(self) -> List[Provedor]:
+        """Provedores saudáveis do mais rápido ao mais lento; os pausados ficam por último."""
+        def chave(provedor):
+            estatisticas = self.estatisticas[provedor.nome]
+            media = estatisticas.media_ms
+            return (not estatisticas.saudavel(), media is not None, media or 0.0)
+        return sorted(self.provedores, key=chave)
+
+    def limiar_hedge(self, provedor: Provedor) -> float:
+        p95 = self.estatisticas[provedor.nome].p95()
+        return p95 if p95 is not None else self.limiar_hedge_ms
+
+    def _executar(self, provedor: Provedor, prompt, paginas, campos) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Chama o provedor e registra latência e sucesso; erros viram dict de erro."""
+        inicio = time.perf_counter()
+        try:
+            dados, uso = provedor.extrair(prompt, paginas, campos)
+        except Exception as e:
+            print(f"Erro no provedor {provedor.nome}: {e}")
+            dados, uso = {"erro": f"Erro no provedor {provedor.nome}: {e}"}, uso_vazio()
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        self.estatisticas[provedor.nome].registrar(latencia_ms, "erro" not in dados)
+        return dados, dict(uso, provedor=provedor.nome, latencia_ms=latencia_ms)
+
+    def extrair(self, prompt: str, paginas: List[Dict[str, str]], campos: List[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Mesma assinatura e retorno de `consultar_modelo`: (dados ou dict de
+        erro, uso). O uso traz também o provedor que respondeu e a latência.
+        """
+        with medir("roteamento", hedge=self.hedge) as info:
+            candidatos = self.ordenar()
+            if self.hedge:
+                dados, uso = self._extrair_com_hedge(candidatos, prompt, paginas, campos, info)
+            else:
+                dados, uso = self._extrair_em_sequencia(candidatos, prompt, paginas, campos)
+            info["provedor"] = uso.get("provedor")
+            if "erro" in dados:
+                info["status"] = "erro"
+        return dados, uso
+
+    def _extrair_em_sequencia(self, candidatos, prompt, paginas, campos):
+        dados, uso = {"erro": "Nenhum provedor disponível"}, uso_vazio()
+        for provedor in candidatos:
+            dados, uso = self._executar(provedor, prompt, paginas, campos)
+            if "erro" not in dados:
+                break
+        return dados, uso
+
+    @staticmethod
+    def _registrar_descartado(uso: Dict[str, Any]) -> None:
+        # Chamada paga cuja resposta não foi usada: fica fora do uso retornado, mas entra nas métricas de custo
+        metricas.contar("roteamento.tokens_descartados", uso.get("total_tokens", 0))
+        metricas.contar("roteamento.custo_descartado", uso.get("custo_usd", 0.0))
+
+    def _extrair_com_hedge(self, candidatos, prompt, paginas, campos, info):
+        pendentes = list(candidatos)
+        em_voo = {}
+        ultimo = ({"erro": "Nenhum provedor disponível"}, uso_vazio())
+
+        def disparar():
+            provedor = pendentes.pop(0)
+            em_voo[self._executor.submit(self._executar, provedor, prompt, paginas, campos)] = provedor
+
+        disparar()
+        while em_voo:
+            # Enquanto houver reserva, espera só até o limiar do provedor mais antigo em voo
+            espera = self.limiar_hedge(next(iter(em_voo.values()))) / 1000 if pendentes else None
+            concluidos, _ = wait(list(em_voo), timeout=espera, return_when=FIRST_COMPLETED)
+            if not concluidos:
+                metricas.contar("roteamento.hedges")
+                info["hedges"] = info.get("hedges", 0) + 1
+                disparar()
+                continue
+
+            for futuro in concluidos:
+                em_voo.pop(futuro)
+                # Resposta com erro anterior (ou a inicial, sem uso): substituída pela nova
+                self._registrar_descartado(ultimo[1])
+                ultimo = futuro.result()
+                if "erro" not in ultimo[0]:
+                    # As chamadas perdedoras continuam (e são cobradas): contabiliza o uso quando terminarem
+                    for perdedor in em_voo:
+                        perdedor.add_done_callback(lambda f: self._registrar_descartado(f.result()[1]))
+                    info["chamadas_descartadas"] = len(em_voo)
+                    return ultimo
+            # Erro: passa para o próximo provedor sem esperar o limiar
+            if pendentes and not em_voo:
+                disparar()
+        return ultimo
+
+    def resumo(self) -> Dict[str, Dict[str, Any]]:
+        """Estatísticas por provedor (chamadas, erros, média, p95, saúde)."""
+        return {nome: estatisticas.resumo() for nome, estatisticas in self.estatisticas.items()}
+
+def criar_provedor(nome: str) -> Provedor:
+    """Provedor pelo nome usado nas linhas de comando: openai, bedrock, langchain ou falso."""
+    if nome == "openai":
+        return ProvedorOpenAI()
+    if nome == "bedrock":
+        return ProvedorBedrock()
+    if nome == "langchain":
+        return ProvedorLangChain()
+    if nome == "falso":
+        return ProvedorFalso()
+    raise ValueError(f"Provedor desconhecido: {nome}")
+
+def criar_roteador(nomes: List[str], hedge: bool = False) -> Roteador:
+    return Roteador([criar_provedor(nome) for nome in nomes], hedge=hedge)
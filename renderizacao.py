@@ -0,0 +1,211 @@
+import io
+import math
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from camada_texto import estimar_tokens_imagem
+from metricas import metricas
+
+# Opções padrão de renderização: 72 DPI equivale ao get_pixmap() sem matriz
+DPI_PADRAO = 72
+FORMATO_PADRAO = "png"
+QUALIDADE_PADRAO = 85  # JPEG/WebP
+
+MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+# Recorte de margens e escolha do detalhe da imagem (GPT-4o)
+DPI_ANALISE = 36  # Resolução da prévia usada para achar a área com conteúdo
+LIMIAR_BRANCO = 200  # Pixels (0-255) mais claros que isso contam como fundo
+MARGEM_RECORTE = 6  # Folga, em pontos, mantida ao redor do conteúdo
+DENSIDADE_MINIMA = 0.002  # Abaixo disso (fração de pixels com tinta) a página é considerada em branco
+TAMANHO_BLOCO = 512  # Lado do bloco cobrado no detalhe "high" e da imagem no detalhe "low"
+REDUCAO_MAXIMA_ALINHAMENTO = 0.85  # Menor fator aceito para encaixar a imagem em menos blocos
+
+def escala_renderizacao(page, dpi: float = DPI_PADRAO, lado_maximo: int = None) -> float:
+    """Fator de zoom que atinge o DPI pedido sem ultrapassar `lado_maximo` pixels."""
+    escala = dpi / 72
+    if lado_maximo:
+        maior_lado = max(page.rect.width, page.rect.height) * escala
+        if maior_lado > lado_maximo:
+            escala *= lado_maximo / maior_lado
+    return escala
+
+def codificar_pixmap(pix, formato: str = FORMATO_PADRAO, qualidade: int = QUALIDADE_PADRAO) -> bytes:
+    """Codifica um pixmap uma única vez no formato pedido (png, jpeg ou webp)."""
+    if formato == "png":
+        return pix.tobytes("png")
+    if formato == "jpeg":
+        return pix.tobytes("jpeg", jpg_quality=qualidade)
+    if formato == "webp":
+        # PyMuPDF não gera WebP: os pixels são repassados ao Pillow sem recodificar
+        modo = "L" if pix.n == 1 else "RGB"
+        imagem = Image.frombytes(modo, (pix.width, pix.height), pix.samples)
+        buffer = io.BytesIO()
+        imagem.save(buffer, format="WEBP", quality=qualidade)
+        return buffer.getvalue()
+    raise ValueError(f"Formato de imagem não suportado: {formato}")
+
+def analisar_conteudo(page, limiar: int = LIMIAR_BRANCO) -> Tuple[Optional[fitz.Rect], float]:
+    """
+    Localiza a área com conteúdo de uma página a partir de uma prévia em baixa resolução.
+
+    Returns:
+        Tupla contendo: (retângulo do conteúdo com margem, ou None se a página
+        estiver em branco; densidade de tinta dentro desse retângulo)
+    """
+    escala = DPI_ANALISE / 72
+    pix = page.get_pixmap(matrix=fitz.Matrix(escala, escala), colorspace=fitz.csGRAY, alpha=False)
+    tinta = Image.frombytes("L", (pix.width, pix.height), pix.samples).point(lambda v: 255 if v < limiar else 0)
+    caixa = tinta.getbbox()
+    if caixa is None:
+        return None, 0.0
+
+    x0, y0, x1, y1 = caixa
+    densidade = tinta.crop(caixa).histogram()[255] / ((x1 - x0) * (y1 - y0))
+    origem = page.rect.tl
+    rect = fitz.Rect(
+        x0 / escala - MARGEM_RECORTE, y0 / escala - MARGEM_RECORTE,
+        x1 / escala + MARGEM_RECORTE, y1 / escala + MARGEM_RECORTE
+    ) + (origem.x, origem.y, origem.x, origem.y)
+    return rect & page.rect, densidade
+
+def fator_alinhamento_blocos(largura: float, altura: float) -> float:
+    """
+    Fator de escala que leva a imagem ao tamanho usado pelo modelo no detalhe
+    "high" (cabe em 2048x2048, menor lado até 768) e, se uma redução de até
+    REDUCAO_MAXIMA_ALINHAMENTO evitar uma fileira ou coluna de blocos de 512 px,
+    encaixa a imagem no múltiplo de 512 abaixo.
+    """
+    escala = min(1.0, 2048 / max(largura, altura))
+    escala *= min(1.0, 768 / (min(largura, altura) * escala))
+    largura, altura = largura * escala, altura * escala
+
+    def blocos(fator):
+        return math.ceil(largura * fator / TAMANHO_BLOCO - 1e-9) * math.ceil(altura * fator / TAMANHO_BLOCO - 1e-9)
+
+    melhor = 1.0
+    for lado in (largura, altura):
+        fator = (math.ceil(lado / TAMANHO_BLOCO - 1e-9) - 1) * TAMANHO_BLOCO / lado
+        if REDUCAO_MAXIMA_ALINHAMENTO <= fator < 1.0 and (blocos(fator), -fator) < (blocos(melhor), -melhor):
+            melhor = fator
+    return escala * melhor
+
+def planejar_imagem(
+    page,
+    dpi: float = DPI_PADRAO,
+    lado_maximo: int = None,
+    recortar: bool = True,
+    detalhe_adaptativo: bool = True
+) -> Dict[str, Any]:
+    """
+    Decide o recorte, a escala e o detalhe ("low"/"high") de uma página antes de renderizar.
+
+    Páginas em branco, ou cujo conteúdo cabe em uma imagem de 512 px, vão em
+    "low" (custo fixo); as demais vão em "high" na resolução alinhada aos
+    blocos de 512 px.
+
+    Returns:
+        Dicionário com: clip, escala, detail, densidade, tokens_imagem_original
+        (página inteira em "high") e tokens_imagem (após o ajuste)
+    """
+    escala_original = escala_renderizacao(page, dpi, lado_maximo)
+    tokens_imagem_original = estimar_tokens_imagem(page.rect.width * escala_original, page.rect.height * escala_original)
+
+    rect_conteudo, densidade = analisar_conteudo(page)
+    clip = rect_conteudo if recortar and rect_conteudo is not None else page.rect
+
+    escala = dpi / 72
+    if lado_maximo:
+        escala = min(escala, lado_maximo / max(clip.width, clip.height))
+    largura, altura = clip.width * escala, clip.height * escala
+
+    detail = "high"
+    if detalhe_adaptativo:
+        if rect_conteudo is None or densidade < DENSIDADE_MINIMA or max(largura, altura) <= TAMANHO_BLOCO:
+            detail = "low"
+            # No detalhe "low" o modelo vê no máximo 512x512: pixels além disso são descartados
+            escala *= min(1.0, TAMANHO_BLOCO / max(largura, altura))
+        else:
+            escala *= fator_alinhamento_blocos(largura, altura)
+
+    return {
+        "clip": clip,
+        "escala": escala,
+        "detail": detail,
+        "densidade": densidade,
+        "tokens_imagem_original": tokens_imagem_original,
+        "tokens_imagem": estimar_tokens_imagem(clip.width * escala, clip.height * escala, detail)
+    }
+
+def renderizar_pagina(
+    page,
+    dpi: float = DPI_PADRAO,
+    lado_maximo: int = None,
+    escala_cinza: bool = False,
+    formato: str = FORMATO_PADRAO,
+    qualidade: int = QUALIDADE_PADRAO,
+    recortar: bool = False,
+    detalhe_adaptativo: bool = False
+) -> Dict[str, Any]:
+    """
+    Renderiza uma página do PyMuPDF direto na resolução final e codifica em memória.
+
+    Com `recortar` e/ou `detalhe_adaptativo` a página passa antes por
+    `planejar_imagem` (margens removidas, detalhe e resolução por página).
+
+    Returns:
+        Dicionário com: pagina, bytes, mime_type, largura, altura, detail,
+        tokens_imagem_original, tokens_imagem, tempo_renderizacao_ms e
+        tempo_codificacao_ms
+    """
+    inicio = time.perf_counter()
+    if recortar or detalhe_adaptativo:
+        plano = planejar_imagem(page, dpi, lado_maximo, recortar, detalhe_adaptativo)
+    else:
+        escala = escala_renderizacao(page, dpi, lado_maximo)
+        tokens = estimar_tokens_imagem(page.rect.width * escala, page.rect.height * escala)
+        plano = {"clip": None, "escala": escala, "detail": "high", "tokens_imagem_original": tokens, "tokens_imagem": tokens}
+    escala = plano["escala"]
+    colorspace = fitz.csGRAY if escala_cinza else fitz.csRGB
+    pix = page.get_pixmap(matrix=fitz.Matrix(escala, escala), colorspace=colorspace, alpha=False, clip=plano["clip"])
+    renderizado = time.perf_counter()
+
+    conteudo = codificar_pixmap(pix, formato, qualidade)
+    codificado = time.perf_counter()
+
+    resultado = {
+        "pagina": page.number + 1,
+        "bytes": conteudo,
+        "mime_type": MIME_TYPES[formato],
+        "largura": pix.width,
+        "altura": pix.height,
+        "detail": plano["detail"],
+        "tokens_imagem_original": plano["tokens_imagem_original"],
+        "tokens_imagem": plano["tokens_imagem"],
+        "tempo_renderizacao_ms": (renderizado - inicio) * 1000,
+        "tempo_codificacao_ms": (codificado - renderizado) * 1000
+    }
+    metricas.registrar_etapa("renderizacao", (codificado - inicio) * 1000, {
+        "status": "ok",
+        "formato": formato,
+        "bytes": len(conteudo),
+        **{chave: valor for chave, valor in resultado.items() if chave not in ("bytes", "mime_type")}
+    })
+    return resultado
+
+def renderizar_paginas(pdf_document, numeros_paginas: List[int] = None, **opcoes) -> Iterator[Dict[str, Any]]:
+    """
+    Gera as páginas renderizadas (ver `renderizar_pagina`) uma a uma, sem
+    arquivos temporários. `numeros_paginas` (base 1) limita as páginas.
+    """
+    if numeros_paginas is None:
+        numeros_paginas = range(1, len(pdf_document) + 1)
+    for numero in numeros_paginas:
+        yield renderizar_pagina(pdf_document.load_page(numero - 1), **opcoes)
@@ -0,0 +1,188 @@
+"""
+Serviço de OCR (EasyOCR) com processos aquecidos e inferência em lote.
+
+Carregar o `easyocr.Reader` (modelos de detecção e reconhecimento) custa mais
+que o OCR de uma imagem; por isso cada processo do pool carrega o leitor uma
+única vez, na inicialização, e o reaproveita em todas as imagens. O pool tem
+um processo por núcleo, cada um limitado a uma thread do PyTorch (várias
+threads por processo só disputariam a CPU). As imagens são enviadas aos
+processos em lotes, e as de mesmo tamanho (ex.: páginas renderizadas com o
+mesmo DPI) passam juntas pelo `readtext_batched`.
+
+    with ServicoOCR() as ocr:
+        for resultado in ocr.ler(["pagina1.png", "pagina2.png"]):
+            print(resultado["texto"], resultado["tempo_ms"])
+"""
+import io
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Tuple, Union
+
+from metricas import metricas
+
+IDIOMAS_PADRAO = ("pt",)
+
+# Imagens enviadas a um processo por tarefa
+TAMANHO_LOTE = 8
+
+# Regiões de texto reconhecidas por chamada ao modelo de reconhecimento
+TAMANHO_LOTE_RECONHECIMENTO = 16
+
+# Threads do PyTorch por processo (o paralelismo vem dos processos)
+THREADS_POR_PROCESSO = 1
+
+# Espera máxima pelo carregamento dos leitores em `aquecer` (inclui o download dos modelos)
+TEMPO_AQUECIMENTO_SEGUNDOS = 600
+
+Imagem = Union[str, bytes]
+
+# Estado do processo trabalhador (preenchido uma vez em `_inicializar_processo`)
+_leitor = None
+_tempo_carregamento_ms = 0.0
+_barreira = None
+
+def _inicializar_processo(idiomas: Tuple[str, ...], gpu: bool, threads: int, barreira) -> None:
+    global _leitor, _tempo_carregamento_ms, _barreira
+    import easyocr
+    import torch
+
+    _barreira = barreira
+    torch.set_num_threads(threads)
+    inicio = time.perf_counter()
+    _leitor = easyocr.Reader(list(idiomas), gpu=gpu, verbose=False)
+    _tempo_carregamento_ms = (time.perf_counter() - inicio) * 1000
+
+def _aquecido(_=None) -> Tuple[int, float]:
+    # Cada processo segura sua tarefa até todos chegarem à barreira: as tarefas
+    # caem em processos distintos e todos os leitores ficam carregados
+    _barreira.wait(TEMPO_AQUECIMENTO_SEGUNDOS)
+    return os.getpid(), _tempo_carregamento_ms
+
+def _tamanho_imagem(imagem: Imagem) -> Tuple[int, int]:
+    from PIL import Image
+
+    with Image.open(io.BytesIO(imagem) if isinstance(imagem, bytes) else imagem) as img:
+        return img.size
+
+def _texto(resultado: List) -> str:
+    # Cada item do EasyOCR é (caixa, texto, confiança)
+    return " ".join(item[1] for item in resultado)
+
+def _ler_lote(imagens: List[Imagem]) -> List[Dict[str, Any]]:
+    """
+    OCR de um lote de imagens no processo trabalhador. Imagens de mesmo
+    tamanho vão juntas ao `readtext_batched` (o tempo do grupo é dividido
+    entre elas); as demais, uma a uma. Falhas ficam no resultado da imagem.
+    """
+    resultados: List[Dict[str, Any]] = [None] * len(imagens)
+    grupos: Dict[Tuple[int, int], List[int]] = {}
+    for i, imagem in enumerate(imagens):
+        try:
+            grupos.setdefault(_tamanho_imagem(imagem), []).append(i)
+        except Exception as e:
+            resultados[i] = {"texto": "", "tempo_ms": 0.0, "lote": 1, "erro": f"Imagem inválida: {e}"}
+
+    for indices in grupos.values():
+        inicio = time.perf_counter()
+        try:
+            if len(indices) > 1:
+                saidas = _leitor.readtext_batched([imagens[i] for i in indices], batch_size=TAMANHO_LOTE_RECONHECIMENTO)
+            else:
+                saidas = [_leitor.readtext(imagens[indices[0]], batch_size=TAMANHO_LOTE_RECONHECIMENTO)]
+        except Exception as e:
+            if len(indices) == 1:
+                resultados[indices[0]] = {"texto": "", "tempo_ms": (time.perf_counter() - inicio) * 1000, "lote": 1, "erro": str(e)}
+                continue
+            # Uma imagem ruim não derruba o grupo: refaz uma a uma
+            for i in indices:
+                resultados[i] = _ler_lote([imagens[i]])[0]
+            continue
+        tempo_ms = (time.perf_counter() - inicio) * 1000 / len(indices)
+        for i, saida in zip(indices, saidas):
+            resultados[i] = {"texto": _texto(saida), "tempo_ms": tempo_ms, "lote": len(indices)}
+    return resultados
+
+class ServicoOCR:
+    """
+    Pool de processos com o leitor EasyOCR já carregado em cada um.
+
+    Args:
+        processos: Número de processos (padrão: núcleos da CPU)
+        idiomas: Idiomas do EasyOCR
+        gpu: Usa a GPU, se disponível (com GPU, prefira `processos=1`)
+        tamanho_lote: Imagens enviadas a um processo por tarefa
+    """
+
+    def __init__(
+        self,
+        processos: int = None,
+        idiomas: Tuple[str, ...] = IDIOMAS_PADRAO,
+        gpu: bool = False,
+        tamanho_lote: int = TAMANHO_LOTE
+    ):
+        self.processos = processos or os.cpu_count() or 1
+        self.tamanho_lote = tamanho_lote
+        contexto = multiprocessing.get_context()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processos,
+            mp_context=contexto,
+            initializer=_inicializar_processo,
+            initargs=(tuple(idiomas), gpu, THREADS_POR_PROCESSO, contexto.Barrier(self.processos))
+        )
+
+    def aquecer(self) -> None:
+        """Sobe todos os processos e só retorna com o leitor carregado em cada um."""
+        for _, tempo_carregamento_ms in self._executor.map(_aquecido, range(self.processos)):
+            metricas.observar("ocr.carregamento.ms", tempo_carregamento_ms)
+
+    def ler(self, imagens: List[Imagem], nomes: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        OCR das imagens (caminhos ou bytes), distribuídas em lotes pelos processos.
+
+        Returns:
+            Um dicionário por imagem, na ordem recebida: imagem (nome ou caminho),
+            texto, tempo_ms (da inferência, por imagem), lote (imagens que
+            passaram juntas pelo modelo) e, em caso de falha, erro
+        """
+        if nomes is None:
+            nomes = [imagem if isinstance(imagem, str) else f"imagem_{i + 1}" for i, imagem in enumerate(imagens)]
+        # Lotes menores quando há poucas imagens, para ocupar todos os processos
+        tamanho = max(1, min(self.tamanho_lote, -(-len(imagens) // self.processos)))
+        lotes = [imagens[i:i + tamanho] for i in range(0, len(imagens), tamanho)]
+
+        resultados = []
+        for resultados_lote in self._executor.map(_ler_lote, lotes):
+            resultados.extend(resultados_lote)
+        for nome, resultado in zip(nomes, resultados):
+            resultado["imagem"] = nome
+            metricas.observar("ocr.imagem.ms", resultado["tempo_ms"])
+            if "erro" in resultado:
+                metricas.contar("ocr.erros")
+        return resultados
+
+    def ler_imagem(self, imagem: Imagem) -> Dict[str, Any]:
+        return self.ler([imagem])[0]
+
+    def fechar(self) -> None:
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+_servico_ocr = None
+_servico_ocr_lock = threading.Lock()
+
+def obter_servico_ocr() -> ServicoOCR:
+    """Retorna o ServicoOCR único do processo (criado e aquecido na primeira chamada)."""
+    global _servico_ocr
+    with _servico_ocr_lock:
+        if _servico_ocr is None:
+            _servico_ocr = ServicoOCR()
+            _servico_ocr.aquecer()
+        return _servico_ocr